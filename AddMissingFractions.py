@@ -2,6 +2,8 @@ import ifcopenshell
 from ifcopenshell.util.element import get_type, get_psets
 from ifcopenshell.util.unit import calculate_unit_scale
 from ifcopenshell.util.placement import get_local_placement
+from material_index import MaterialIndex
+from quantity_index import QuantityIndex
 
 def assign_constituent_fractions(input_file, output_file):
     """
@@ -21,59 +23,23 @@ def assign_constituent_fractions(input_file, output_file):
     # Calculate the unit scale for length units to millimeters
     unit_scale_to_mm = calculate_unit_scale(model) * 1000.0
 
-    # Iterate through each IfcMaterialConstituentSet in the model
-    for constituent_set in model.by_type('IfcMaterialConstituentSet'):
+    # Resolve the elements of every constituent set once, including sets inherited from types
+    material_index = MaterialIndex(model)
+    quantity_index = QuantityIndex(model)
+
+    # Iterate through each IfcMaterialConstituentSet and all elements using it
+    for constituent_set, associated_elements in material_index.elements_per_constituent_set().items():
         constituents = constituent_set.MaterialConstituents or []
         if not constituents:
             continue  # Skip if no constituents found
 
-        # Find elements associated with this constituent set via IfcRelAssociatesMaterial
-        associated_relations = model.get_inverse(constituent_set)
-        associated_elements = [
-            rel.RelatedObjects[0] for rel in associated_relations
-            if rel.is_a('IfcRelAssociatesMaterial') and rel.RelatedObjects
-        ]
-        if not associated_elements:
-            continue  # Skip if no associated elements found
-
-        # Collect quantities associated with the elements
-        quantities = []
-        for element in associated_elements:
-            for rel in getattr(element, 'IsDefinedBy', []):
-                if rel.is_a('IfcRelDefinesByProperties'):
-                    prop_def = rel.RelatingPropertyDefinition
-                    if prop_def.is_a('IfcElementQuantity'):
-                        quantities.extend(prop_def.Quantities)
-
-        # Build a mapping of quantity names to quantities
-        quantity_name_map = {}
-        for q in quantities:
-            if q.is_a('IfcPhysicalComplexQuantity'):
-                q_name = (q.Name or '').strip().lower()
-                quantity_name_map.setdefault(q_name, []).append(q)
-
-        # Handle constituents with duplicate names by order of appearance
-        constituent_indices = {}
+        # Match constituents to the complex quantities of the elements, duplicate names by order of appearance
+        widths = quantity_index.constituent_widths(associated_elements, constituents)
         constituent_widths = {}
         total_width_mm = 0.0
 
-        for constituent in constituents:
-            constituent_name = (constituent.Name or "Unnamed Constituent").strip().lower()
-            count = constituent_indices.get(constituent_name, 0)
-            constituent_indices[constituent_name] = count + 1
-
-            width_mm = 0.0
-            quantities_with_name = quantity_name_map.get(constituent_name, [])
-
-            if count < len(quantities_with_name):
-                matched_quantity = quantities_with_name[count]
-                # Extract 'Width' sub-quantity
-                for sub_q in matched_quantity.HasQuantities:
-                    if sub_q.is_a('IfcQuantityLength') and (sub_q.Name or '').strip().lower() == 'width':
-                        raw_length_value = sub_q.LengthValue or 0.0
-                        width_mm = raw_length_value * unit_scale_to_mm
-                        break
-
+        for constituent, width in zip(constituents, widths):
+            width_mm = (width or 0.0) * unit_scale_to_mm
             constituent_widths[constituent] = width_mm
             total_width_mm += width_mm
 
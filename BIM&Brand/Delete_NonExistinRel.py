@@ -1,38 +1,97 @@
+import os
+import sys
 import ifcopenshell
 
-def find_invalid_entities(ifc_file_path):
-    ifc_file = ifcopenshell.open(ifc_file_path)
-    invalid_entities = []
-
-    for rel_defines in ifc_file.by_type("IfcRelDefinesByProperties"):
-        try:
-            # Check if RelatingPropertyDefinition exists
-            _ = rel_defines.RelatingPropertyDefinition
-            # Ensure all related objects exist
-            for related_obj in rel_defines.RelatedObjects:
-                if related_obj not in ifc_file:
-                    raise RuntimeError
-        except RuntimeError:
-            invalid_entities.append(rel_defines.id())
-    
-    return invalid_entities
-
-def remove_entities_from_ifc(source_ifc_path, cleaned_ifc_path, invalid_entities):
-    with open(source_ifc_path, 'r') as source, open(cleaned_ifc_path, 'w') as cleaned:
-        for line in source:
-            # Only write lines that don't declare an invalid entity
-            if not any(f"#{entity_id}=" in line for entity_id in invalid_entities):
-                cleaned.write(line)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from step_stream import iter_records, record_params, split_attributes
+
+def collect_entity_ids(ifc_file_path):
+    # First pass: remember every #id that is actually declared in the file
+    return {record.id for record in iter_records(ifc_file_path) if record.id is not None}
+
+def is_dangling(value, entity_ids):
+    return value.startswith(b"#") and int(value[1:]) not in entity_ids
+
+def clean_relationship(raw, entity_ids):
+    """
+    Returns the relationship record with dead references removed from its aggregate
+    lists, or None if a single-valued reference is dead or a list ends up empty.
+    """
+    params = record_params(raw)
+    attributes = split_attributes(params)
+    changed = False
+
+    for index, value in enumerate(attributes):
+        if is_dangling(value, entity_ids):
+            return None
+        if value.startswith(b"("):
+            items = split_attributes(value[1:-1])
+            kept = [item for item in items if not is_dangling(item, entity_ids)]
+            if len(kept) != len(items):
+                if not kept:
+                    return None
+                attributes[index] = b"(" + b",".join(kept) + b")"
+                changed = True
+
+    if not changed:
+        return raw
+    params_start = raw.index(b"(") + 1
+    return raw[:params_start] + b",".join(attributes) + raw[params_start + len(params):]
 
 def clean_ifc_file(source_ifc_path, cleaned_ifc_path):
-    invalid_entities = find_invalid_entities(source_ifc_path)
-    print(f"Invalid entity IDs: {invalid_entities}")
-    remove_entities_from_ifc(source_ifc_path, cleaned_ifc_path, invalid_entities)
+    entity_ids = collect_entity_ids(source_ifc_path)
+    removed_entities = []
+    rewritten_entities = []
+
+    # Second pass: stream the file again and fix relationships on the way through
+    with open(cleaned_ifc_path, 'wb') as cleaned:
+        for record in iter_records(source_ifc_path):
+            if record.id is not None and record.type.startswith("IFCREL"):
+                cleaned_raw = clean_relationship(record.raw, entity_ids)
+                if cleaned_raw is None:
+                    removed_entities.append(record.id)
+                    continue
+                if cleaned_raw is not record.raw:
+                    rewritten_entities.append(record.id)
+                cleaned.write(cleaned_raw)
+            else:
+                cleaned.write(record.raw)
+
+    print(f"Removed relationship IDs: {removed_entities}")
+    print(f"Rewritten relationship IDs: {rewritten_entities}")
     print(f"Cleaned IFC file saved as: {cleaned_ifc_path}")
+    return removed_entities, rewritten_entities
+
+def remove_invalid_relationships(ifc_file):
+    """
+    In-memory variant for models that are already loaded. ifcopenshell reads dead
+    references as None and leaves them out of aggregates, so a relationship is invalid
+    when one of its mandatory Relating*/Related* attributes ended up empty.
+    """
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(ifc_file.schema)
+    endpoints = {}  # relationship class -> indices of its mandatory endpoint attributes
+    removed_entities = []
+
+    for rel in ifc_file.by_type("IfcRelationship"):
+        ifc_class = rel.is_a()
+        if ifc_class not in endpoints:
+            attributes = schema.declaration_by_name(ifc_class).all_attributes()
+            endpoints[ifc_class] = [
+                index for index, attribute in enumerate(attributes)
+                if attribute.name().startswith(("Relating", "Related")) and not attribute.optional()
+            ]
+        if any(rel[index] is None or rel[index] == () for index in endpoints[ifc_class]):
+            removed_entities.append(rel.id())
+
+    for entity_id in removed_entities:
+        ifc_file.remove(ifc_file.by_id(entity_id))
+    print(f"Removed relationship IDs: {removed_entities}")
+    return removed_entities
 
-# Define your source and destination file paths
-ifc_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.3.ifc"
-output_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.4.ifc"
+if __name__ == "__main__":
+    # Define your source and destination file paths
+    ifc_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.3.ifc"
+    output_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.4.ifc"
 
-# Clean the IFC file
-clean_ifc_file(ifc_file_path, output_file_path)
+    # Clean the IFC file
+    clean_ifc_file(ifc_file_path, output_file_path)
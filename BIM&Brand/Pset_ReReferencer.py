@@ -1,8 +1,11 @@
+import os
+import sys
 import ifcopenshell
 
-def update_chibb_spatial_zone_common(ifc_file_path, output_file_path):
-    ifc_file = ifcopenshell.open(ifc_file_path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pset_index import PropertyIndex
 
+def rereference_zone_psets(ifc_file, index, pset_name='CHIBB_SpatialZoneCommon'):
     # Dictionary to hold space to zone mappings
     space_to_zone = {}
     
@@ -22,32 +25,42 @@ def update_chibb_spatial_zone_common(ifc_file_path, output_file_path):
             # If the space instance is not found, skip further processing for it
             continue
 
-        # Check relationships defined by properties for the space
-        for relDefinesByProperties in list(space.IsDefinedBy):
-            if relDefinesByProperties.is_a('IfcRelDefinesByProperties'):
-                property_set = relDefinesByProperties.RelatingPropertyDefinition
-                if property_set.Name == 'CHIBB_SpatialZoneCommon':
-                    # Check if the zone is a valid instance before proceeding
-                    if zone not in ifc_file or property_set.GlobalId in processed_property_sets:
-                        # Delete the relationship if the zone is not found or if already processed
-                        ifc_file.remove(relDefinesByProperties)
-                        print(f'Removed invalid or duplicate IfcRelDefinesByProperties {relDefinesByProperties.GlobalId}')
-                        continue
-
-                    # Mark this property set as processed to avoid duplicate handling
-                    processed_property_sets.add(property_set.GlobalId)
-
-                    # Update the relationship to point to the zone instead of the space
-                    relDefinesByProperties.RelatedObjects = [zone]
-                    print(f'Updated IfcRelDefinesByProperties for zone {zone.Name} to use CHIBB_SpatialZoneCommon')
+        # Look up the relationships attaching the zone pset to the space
+        for relDefinesByProperties in index.get_relations(space, pset_name):
+            # The index is not updated while the loop edits the model: a relationship shared by
+            # several spaces may already be re-pointed to a zone or removed as a duplicate
+            if relDefinesByProperties not in ifc_file or space not in relDefinesByProperties.RelatedObjects:
+                continue
+            property_set = relDefinesByProperties.RelatingPropertyDefinition
+            # Check if the zone is a valid instance before proceeding
+            if zone not in ifc_file or property_set.GlobalId in processed_property_sets:
+                # Delete the relationship if the zone is not found or if already processed
+                rel_global_id = relDefinesByProperties.GlobalId
+                ifc_file.remove(relDefinesByProperties)
+                print(f'Removed invalid or duplicate IfcRelDefinesByProperties {rel_global_id}')
+                continue
+
+            # Mark this property set as processed to avoid duplicate handling
+            processed_property_sets.add(property_set.GlobalId)
+
+            # Update the relationship to point to the zone instead of the space
+            relDefinesByProperties.RelatedObjects = [zone]
+            print(f'Updated IfcRelDefinesByProperties for zone {zone.Name} to use {pset_name}')
+
+    return len(processed_property_sets)
+
+def update_chibb_spatial_zone_common(ifc_file_path, output_file_path):
+    ifc_file = ifcopenshell.open(ifc_file_path)
+    rereference_zone_psets(ifc_file, PropertyIndex(ifc_file))
 
     # Save the updated IFC file
     ifc_file.write(output_file_path)
     print(f'IFC file has been updated. File saved as: {output_file_path}')
 
 
+if __name__ == "__main__":
+    ifc_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.4.ifc"
+    output_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.5.ifc"
 
-ifc_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.4.ifc"
-output_file_path = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2356_BUSA\240330_Diamant V3.5.ifc"
+    update_chibb_spatial_zone_common(ifc_file_path, output_file_path)
 
-update_chibb_spatial_zone_common(ifc_file_path, output_file_path)
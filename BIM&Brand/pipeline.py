@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import time
+import ifcopenshell
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pset_index import PropertyIndex
+from SpaceRenamer import rename_spaces
+from RoomObjectType import update_space_object_types
+from ZoneCreator import create_zones
+from Delete_NonExistinRel import remove_invalid_relationships
+from Pset_ReReferencer import rereference_zone_psets
+
+def clean_relationships(ifc_file, index):
+    return remove_invalid_relationships(ifc_file)
+
+# Step name -> (function(ifc_file, index, **options), whether it edits property relationships)
+STEPS = {
+    "rename_spaces": (rename_spaces, False),
+    "update_object_types": (update_space_object_types, False),
+    "create_zones": (create_zones, False),
+    "clean_relationships": (clean_relationships, True),
+    "rereference_zone_psets": (rereference_zone_psets, True),
+}
+
+def load_pipeline(pipeline_path):
+    """
+    Reads a pipeline definition from JSON (or YAML if PyYAML is installed):
+
+    {"input": "V3.2.ifc", "output": "V3.5.ifc",
+     "steps": [{"step": "rename_spaces"}, {"step": "create_zones", "checkpoint": "V3.3.ifc"}, ...]}
+
+    Any other keys of a step are passed to the step function as keyword arguments.
+    Relative paths are resolved against the folder of the pipeline file.
+    """
+    with open(pipeline_path, 'r', encoding='utf-8') as file:
+        if pipeline_path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required for YAML pipelines: pip install pyyaml")
+            pipeline = yaml.safe_load(file)
+        else:
+            pipeline = json.load(file)
+
+    base_dir = os.path.dirname(os.path.abspath(pipeline_path))
+    pipeline["input"] = os.path.join(base_dir, pipeline["input"])
+    pipeline["output"] = os.path.join(base_dir, pipeline["output"])
+    for step in pipeline["steps"]:
+        if step.get("checkpoint"):
+            step["checkpoint"] = os.path.join(base_dir, step["checkpoint"])
+        if step["step"] not in STEPS:
+            raise ValueError(f"Unknown pipeline step '{step['step']}'. Available steps: {', '.join(STEPS)}")
+    return pipeline
+
+def run_pipeline(pipeline):
+    # Load the model once; every step works on the same in-memory file
+    start = time.time()
+    ifc_file = ifcopenshell.open(pipeline["input"])
+    print(f"Loaded {pipeline['input']} in {time.time() - start:.1f}s")
+
+    index = None
+    for number, step in enumerate(pipeline["steps"], 1):
+        options = dict(step)
+        name = options.pop("step")
+        checkpoint = options.pop("checkpoint", None)
+        function, edits_property_relations = STEPS[name]
+
+        # The property index is shared between steps and only rebuilt after a step changed it
+        if index is None:
+            index = PropertyIndex(ifc_file)
+
+        step_start = time.time()
+        result = function(ifc_file, index, **options)
+        print(f"Step {number} '{name}' finished in {time.time() - step_start:.1f}s (result: {result})")
+
+        if edits_property_relations:
+            index = None
+        if checkpoint:
+            ifc_file.write(checkpoint)
+            print(f"Checkpoint saved as: {checkpoint}")
+
+    ifc_file.write(pipeline["output"])
+    print(f"Pipeline finished in {time.time() - start:.1f}s. File saved as: {pipeline['output']}")
+    return ifc_file
+
+if __name__ == "__main__":
+    pipeline_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline.json")
+    run_pipeline(load_pipeline(pipeline_path))
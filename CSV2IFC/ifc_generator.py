@@ -1,14 +1,33 @@
-import csv
+import itertools
+import json
+import os
+import sys
 import ifcopenshell
 from ifcopenshell import api
 import time
 import uuid
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import tkinter as tk
 from tkinter import filedialog
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instancing import ShapeLibrary
+from bulk_pset import assign_properties
+from step_stream import StepWriter, Enum, Raw, Typed
+
 # Constants
 O, X, Y, Z = (0., 0., 0.), (1., 0., 0.), (0., 1., 0.), (0., 0., 1.)
+PALETTE_BINS = 32  # Number of shared colour styles the values are quantized into
+SCHEMA = "IFC4X3"
+WRITER_BACKEND = "api"  # "api" builds the model with ifcopenshell, "stream" writes STEP records straight to disk
+STREAM_CHUNK_ROWS = 100000  # CSV rows held in memory at once by the streaming writer
+OUTPUT_MODE = "elements"  # "elements": one proxy per row, "pointcloud": one mesh per XY tile
+POINT_CLOUD_TILE = 50.0  # Tile edge length of the point cloud mode
+POINT_SIZE = 0.25  # Edge length of the square drawn for every measurement
+SHARD_TILE = None  # Edge length of the XY tiles written as separate files, None writes a single file
+SHARD_PROCESSES = None  # Worker processes for the tiles, None uses all cores
 
 # Utility functions
 def create_guid():
@@ -38,26 +57,34 @@ def create_ifcextrudedareasolid(ifcfile, point_list, point=(0., 0., 0.), dir1=(0
     return solid
 
 def normalize(value, min_value, max_value):
+    # Works on single values and NumPy arrays; a constant column maps to 0
+    if max_value == min_value:
+        return value * 0.0
     return (value - min_value) / (max_value - min_value)
 
 def get_color(value):
     return [int(255 * (1 - value)), 0, int(255 * value)]
 
+def quantize(normalized_values, bins=PALETTE_BINS):
+    # Bin index per value, bin 0 is the minimum and bins - 1 the maximum
+    return np.clip(np.rint(normalized_values * (bins - 1)), 0, bins - 1).astype(int)
 
-def assign_color_to_element(ifc_file, representation, value):
-    # Create a blank style
-    style = ifcopenshell.api.run("style.add_style", ifc_file, name="DynamicStyle")
-    
-    # Determine the color based on the value
-    color = get_color(value)
-    
-    # Add surface style shading with color
-    ifcopenshell.api.run("style.add_surface_style", ifc_file, style=style, ifc_class="IfcSurfaceStyleShading", attributes={
-        "SurfaceColour": { "Name": None, "Red": color[0]/255.0, "Green": color[1]/255.0, "Blue": color[2]/255.0 }
-    })
-    
-    # Assign the style to the element's representation
-    ifcopenshell.api.run("style.assign_representation_styles", ifc_file, shape_representation=representation, styles=[style])
+def create_palette(ifc_file, bins=PALETTE_BINS):
+    # One shared surface style per bin instead of one per element
+    palette = []
+    for index in range(bins):
+        color = get_color(index / max(bins - 1, 1))
+        style = ifcopenshell.api.run("style.add_style", ifc_file, name=f"DynamicStyle {index}")
+        ifcopenshell.api.run("style.add_surface_style", ifc_file, style=style, ifc_class="IfcSurfaceStyleShading", attributes={
+            "SurfaceColour": { "Name": None, "Red": color[0]/255.0, "Green": color[1]/255.0, "Blue": color[2]/255.0 }
+        })
+        palette.append(style)
+    return palette
+
+def load_csv(input_file):
+    # Single pass over the file: x, y, z and value columns as NumPy arrays
+    data = np.loadtxt(input_file, delimiter=',', skiprows=1, usecols=(0, 1, 2, 3), ndmin=2)
+    return data[:, 0], data[:, 1], data[:, 2], data[:, 3]
 
 
 def open_file_dialog():
@@ -70,36 +97,36 @@ def open_file_dialog():
 def save_file_dialog(input_file):
     root = tk.Tk()
     root.withdraw()
-    filePath = filedialog.asksaveasfilename(defaultextension=".ifc")
+    filePath = filedialog.asksaveasfilename(defaultextension=".ifc", filetypes=[("IFC", "*.ifc"), ("Zipped IFC", "*.ifczip")])
     if filePath:
-        create_ifc(input_file, filePath)
+        if SHARD_TILE:
+            create_tiled_ifc(input_file, filePath)
+        else:
+            create_ifc(input_file, filePath)
 
-def create_shape(ifc_file, element, width, height, depth, context, normalized_value):
+def create_shape(ifc_file, library, element, width, height, depth, color_bin, palette):
     try:
-        point_list = [
-            (0.0, 0.0),
-            (0.25, 0.0),
-            (0.25, 0.25),
-            (0.0, 0.25),
-            (0.0, 0.0)
-        ]
-        print(f"Debug: Point List: {point_list}, Depth: {depth}")
-        solid = create_ifcextrudedareasolid(ifc_file, point_list, depth=float(depth))
-        body_representation = ifc_file.createIfcShapeRepresentation(context, "Body", "SweptSolid", [solid])
-        product_shape = ifc_file.createIfcProductDefinitionShape(None, None, [body_representation])
+        # Elements with the same depth and color bin share one representation map and style
+        key = ("Measurement", float(depth), int(color_bin))
+        if key not in library:
+            point_list = [
+                (0.0, 0.0),
+                (0.25, 0.0),
+                (0.25, 0.25),
+                (0.0, 0.25),
+                (0.0, 0.0)
+            ]
+            solid = create_ifcextrudedareasolid(ifc_file, point_list, depth=float(depth))
+            library.add_shape(key, [solid], "SweptSolid", style=palette[int(color_bin)])
+
+        product_shape = library.instance(key)
         element.Representation = product_shape
-
-        # Assign color to the element
-        assign_color_to_element(ifc_file, body_representation, normalized_value)
         
         return product_shape, 0.25 * 0.25  # Adjust area calculation for the new square size
     except Exception as e:
         print(f"TypeError in create_shape: {e}, Args: {e.args}, Argument types: {[(str(arg), type(arg)) for arg in e.args]}")
         return None, None  # Returning None for both to handle the error outside
 
-def normalize(value, min_value, max_value):
-    return (value - min_value) / (max_value - min_value)
-
 def create_ifc_hierarchy(ifc_file, owner_history):
     site_placement = create_ifclocalplacement(ifc_file)
     site = ifc_file.createIfcSite(create_guid(), owner_history, "Site", None, None, site_placement, None, None, "ELEMENT", None, None, None, None, None)
@@ -119,40 +146,31 @@ def create_and_link_containers(ifc_file, owner_history, site, building, building
     project = ifc_file.by_type("IfcProject")[0]  #fetch the IfcProject entity
     ifc_file.createIfcRelAggregates(create_guid(), owner_history, "Project Container", None, project, [site])
 
-def process_elements_from_csv(input_file, ifc_file, owner_history, context, building_storey):
+def process_elements_from_csv(input_file, ifc_file, owner_history, context, building_storey, bins=PALETTE_BINS, value_limits=None):
     created_elements = []
-    min_value, max_value = float("inf"), float("-inf")
-
-    # Find the min and max values for normalization
-    with open(input_file, mode='r') as file:
-        reader = csv.reader(file)
-        next(reader, None)  # Skip the header
-        for row in reader:
-            value = float(row[3])
-            min_value = min(min_value, value)
-            max_value = max(max_value, value)
+    library = ShapeLibrary(ifc_file, context)
+    palette = create_palette(ifc_file, bins)
 
     try:
-        with open(input_file, mode='r') as file:
-            reader = csv.reader(file)
-            next(reader, None)  # Skip the header
-            for row in reader:
-                x, y, z, value = map(float, row)
-                normalized_value = normalize(value, min_value, max_value)
-                rounded_value = round(value)
-
-                element_guid = create_guid()
-                element_placement = create_ifclocalplacement(ifc_file, point=(x, y, z), relative_to=building_storey.ObjectPlacement)
-                element = ifc_file.createIfcBuildingElementProxy(element_guid, owner_history, "Element", None, None, element_placement, None, None)
-
-                # Pass the normalized_value for colorization
-                product_shape, area = create_shape(ifc_file, element, 1.0, 1.0, 0.001, context, normalized_value)
-             
-                # Add custom properties to 'element'
-                pset = api.run("pset.add_pset", ifc_file, product=element, name="UEP")
-                api.run("pset.edit_pset", ifc_file, pset=pset, properties={"Potentialmessung": str(rounded_value)})
-                
-                created_elements.append(element)
+        xs, ys, zs, values = load_csv(input_file)
+
+        # Normalization and color bins for all rows at once
+        min_value, max_value = value_limits or (values.min(), values.max())
+        color_bins = quantize(normalize(values, min_value, max_value), bins)
+        rounded_values = np.rint(values).astype(int)
+
+        for x, y, z, color_bin in zip(xs.tolist(), ys.tolist(), zs.tolist(), color_bins.tolist()):
+            element_guid = create_guid()
+            element_placement = create_ifclocalplacement(ifc_file, point=(x, y, z), relative_to=building_storey.ObjectPlacement)
+            element = ifc_file.createIfcBuildingElementProxy(element_guid, owner_history, "Element", None, None, element_placement, None, None)
+
+            # Pass the color bin for colorization
+            product_shape, area = create_shape(ifc_file, library, element, 1.0, 1.0, 0.001, color_bin, palette)
+            
+            created_elements.append(element)
+
+        # Add custom properties, elements with the same value share one property set
+        assign_properties(ifc_file, created_elements, "UEP", {"Potentialmessung": [str(value) for value in rounded_values.tolist()]}, owner_history=owner_history)
 
         return created_elements
         
@@ -160,7 +178,73 @@ def process_elements_from_csv(input_file, ifc_file, owner_history, context, buil
         print(f"An error occurred while populating the IFC file: {e}")
         return []
 
-def create_ifc(input_file, output_file):
+# Point cloud mode: all measurements of an XY tile are packed into one triangulated face set. Colors
+# are carried by an IfcIndexedColourMap over the shared palette, values by a table property.
+def point_cloud_mesh(xs, ys, zs, size=POINT_SIZE):
+    # Every point becomes a flat square of two triangles
+    corners = np.array([(0.0, 0.0), (size, 0.0), (size, size), (0.0, size)])
+    vertices = np.empty((len(xs), 4, 3))
+    vertices[:, :, 0] = xs[:, None] + corners[:, 0]
+    vertices[:, :, 1] = ys[:, None] + corners[:, 1]
+    vertices[:, :, 2] = zs[:, None]
+    base = np.arange(len(xs))[:, None] * 4 + 1  # CoordIndex is 1-based
+    faces = (base + np.array([0, 1, 2, 0, 2, 3])).reshape(-1, 3)
+    return vertices.reshape(-1, 3), faces
+
+def tile_groups(xs, ys, tile_size=POINT_CLOUD_TILE):
+    # Yields ((tile x, tile y), row indices) for every occupied tile
+    tiles = np.column_stack([np.floor(xs / tile_size), np.floor(ys / tile_size)]).astype(np.int64)
+    keys, inverse = np.unique(tiles, axis=0, return_inverse=True)
+    order = np.argsort(inverse.ravel(), kind='stable')
+    bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(keys)))[:-1]
+    for key, rows in zip(keys.tolist(), np.split(order, bounds)):
+        yield tuple(key), rows
+
+def create_point_cloud_tile(ifc_file, owner_history, context, building_storey, colour_list, key, xs, ys, zs, values, color_bins, tile_size=POINT_CLOUD_TILE):
+    # Coordinates are stored relative to the tile corner to keep them small
+    origin = (key[0] * tile_size, key[1] * tile_size, 0.0)
+    vertices, faces = point_cloud_mesh(xs - origin[0], ys - origin[1], zs)
+    point_list = ifc_file.createIfcCartesianPointList3D(vertices.tolist())
+    face_set = ifc_file.create_entity("IfcTriangulatedFaceSet", Coordinates=point_list, Closed=False, CoordIndex=faces.tolist())
+    ifc_file.create_entity("IfcIndexedColourMap", MappedTo=face_set, Colours=colour_list,
+                           ColourIndex=np.repeat(color_bins + 1, 2).tolist())  # two triangles per point
+    representation = ifc_file.createIfcShapeRepresentation(context, "Body", "Tessellation", [face_set])
+    product_shape = ifc_file.createIfcProductDefinitionShape(None, None, [representation])
+
+    placement = create_ifclocalplacement(ifc_file, point=origin, relative_to=building_storey.ObjectPlacement)
+    element = ifc_file.createIfcBuildingElementProxy(create_guid(), owner_history, f"Tile {key[0]} {key[1]}", None, None, placement, product_shape, None)
+
+    # Point number -> measurement, in the order of the squares in the mesh
+    table = ifc_file.create_entity("IfcPropertyTableValue", Name="Potentialmessung",
+                                   DefiningValues=[ifc_file.createIfcInteger(index) for index in range(len(values))],
+                                   DefinedValues=[ifc_file.createIfcReal(value) for value in values.tolist()])
+    pset = ifc_file.createIfcPropertySet(create_guid(), owner_history, "UEP", None, [table])
+    ifc_file.createIfcRelDefinesByProperties(create_guid(), owner_history, None, None, [element], pset)
+    return element
+
+def process_point_cloud_from_csv(input_file, ifc_file, owner_history, context, building_storey, bins=PALETTE_BINS, tile_size=POINT_CLOUD_TILE, value_limits=None):
+    created_elements = []
+    try:
+        xs, ys, zs, values = load_csv(input_file)
+        min_value, max_value = value_limits or (values.min(), values.max())
+        color_bins = quantize(normalize(values, min_value, max_value), bins)
+        colours = [[channel / 255.0 for channel in get_color(index / max(bins - 1, 1))] for index in range(bins)]
+        colour_list = ifc_file.createIfcColourRgbList(colours)
+
+        for key, rows in tile_groups(xs, ys, tile_size):
+            created_elements.append(create_point_cloud_tile(ifc_file, owner_history, context, building_storey, colour_list, key,
+                                                            xs[rows], ys[rows], zs[rows], values[rows], color_bins[rows], tile_size))
+        return created_elements
+
+    except Exception as e:
+        print(f"An error occurred while populating the IFC file: {e}")
+        return []
+
+def create_ifc(input_file, output_file, value_limits=None):
+    # value_limits: (min, max) for the colors, e.g. of the whole survey when writing a single tile
+    if OUTPUT_MODE == "elements" and (WRITER_BACKEND == "stream" or output_file.lower().endswith(".ifczip")):
+        return create_ifc_streaming(input_file, output_file, value_limits=value_limits)
+
     # Create IFC using a template
     timestamp = int(time.time())
     timestring = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp))
@@ -173,7 +257,7 @@ def create_ifc(input_file, output_file):
     HEADER;
     FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');
     FILE_NAME('{output_file}','{timestring}',('{creator}'),('{organization}'),'{application}','{application}','');
-    FILE_SCHEMA(('IFC4X3'));
+    FILE_SCHEMA(('{SCHEMA}'));
     ENDSEC;
     DATA;
     #1=IFCPERSON($,$,'{creator}',$,$,$,$,$);
@@ -220,15 +304,191 @@ def create_ifc(input_file, output_file):
     create_and_link_containers(ifc_file, owner_history, site, building, building_storey)
 
     # Process elements
-    created_elements = process_elements_from_csv(input_file, ifc_file, owner_history, context, building_storey)
+    if OUTPUT_MODE == "pointcloud":
+        created_elements = process_point_cloud_from_csv(input_file, ifc_file, owner_history, context, building_storey, value_limits=value_limits)
+    else:
+        created_elements = process_elements_from_csv(input_file, ifc_file, owner_history, context, building_storey, value_limits=value_limits)
 
     # Finalize IFC file
     ifc_file.createIfcRelContainedInSpatialStructure(create_guid(), owner_history, "Building Storey Container", None, created_elements, building_storey)
     ifc_file.write(output_file)
 
 
+# Streaming backend: records are written directly while the CSV is read in chunks, so memory
+# stays constant regardless of the number of rows.
+def read_csv_chunks(input_file, chunk_size=STREAM_CHUNK_ROWS):
+    with open(input_file, mode='r') as file:
+        next(file, None)  # Skip the header
+        while True:
+            lines = list(itertools.islice(file, chunk_size))
+            if not lines:
+                break
+            yield np.loadtxt(lines, delimiter=',', usecols=(0, 1, 2, 3), ndmin=2)
+
+def value_range(input_file, chunk_size=STREAM_CHUNK_ROWS):
+    # The palette needs the value range before the first element is written
+    min_value, max_value = float("inf"), float("-inf")
+    for chunk in read_csv_chunks(input_file, chunk_size):
+        min_value = min(min_value, chunk[:, 3].min())
+        max_value = max(max_value, chunk[:, 3].max())
+    return min_value, max_value
+
+def write_stream_hierarchy(writer, owner_history, world, context, units):
+    project = writer.add("IfcProject", create_guid(), owner_history, "Template Project", None, None, None, None, (context,), units)
+    site_placement = writer.add("IfcLocalPlacement", None, world)
+    site = writer.add("IfcSite", create_guid(), owner_history, "Site", None, None, site_placement, None, None, Enum("ELEMENT"), None, None, None, None, None)
+    building_placement = writer.add("IfcLocalPlacement", site_placement, world)
+    building = writer.add("IfcBuilding", create_guid(), owner_history, "Building", None, None, building_placement, None, None, Enum("ELEMENT"), None, None, None)
+    storey_placement = writer.add("IfcLocalPlacement", building_placement, world)
+    building_storey = writer.add("IfcBuildingStorey", create_guid(), owner_history, "Storey", None, None, storey_placement, None, None, Enum("ELEMENT"), 0.0)
+    writer.add("IfcRelAggregates", create_guid(), owner_history, "Building Storey Container", None, building, (building_storey,))
+    writer.add("IfcRelAggregates", create_guid(), owner_history, "Site Container", None, site, (building,))
+    writer.add("IfcRelAggregates", create_guid(), owner_history, "Project Container", None, project, (site,))
+    return building_storey, storey_placement
+
+def write_stream_palette(writer, context, origin, world, depth, bins=PALETTE_BINS):
+    # One styled solid, representation map and product shape per color bin
+    points = [writer.add("IfcCartesianPoint", point) for point in [(0.0, 0.0), (0.25, 0.0), (0.25, 0.25), (0.0, 0.25)]]
+    polyline = writer.add("IfcPolyLine", points + points[:1])
+    profile = writer.add("IfcArbitraryClosedProfileDef", Enum("AREA"), None, polyline)
+    extrude_direction = writer.add("IfcDirection", Z)
+    operator = writer.add("IfcCartesianTransformationOperator3D", None, None, origin, None, None)
+    shapes = []
+    for index in range(bins):
+        color = get_color(index / max(bins - 1, 1))
+        colour = writer.add("IfcColourRgb", None, color[0]/255.0, color[1]/255.0, color[2]/255.0)
+        shading = writer.add("IfcSurfaceStyleShading", colour, None)
+        style = writer.add("IfcSurfaceStyle", f"DynamicStyle {index}", Enum("BOTH"), (shading,))
+        solid = writer.add("IfcExtrudedAreaSolid", profile, world, extrude_direction, float(depth))
+        writer.add("IfcStyledItem", solid, (style,), None)
+        representation = writer.add("IfcShapeRepresentation", context, "Body", "SweptSolid", (solid,))
+        representation_map = writer.add("IfcRepresentationMap", world, representation)
+        mapped_item = writer.add("IfcMappedItem", representation_map, operator)
+        mapped_representation = writer.add("IfcShapeRepresentation", context, "Body", "MappedRepresentation", (mapped_item,))
+        shapes.append(writer.add("IfcProductDefinitionShape", None, None, (mapped_representation,)))
+    return shapes
+
+def create_ifc_streaming(input_file, output_file, bins=PALETTE_BINS, chunk_size=STREAM_CHUNK_ROWS, value_limits=None):
+    timestamp = int(time.time())
+    creator = "LT"
+    organization = "LT+"
+    application, application_version = "IfcOpenShell", "0.5"
+    min_value, max_value = value_limits or value_range(input_file, chunk_size)
+
+    with StepWriter(output_file, SCHEMA, author=creator, organization=organization, application=application) as writer, \
+            tempfile.TemporaryFile(mode='w+') as spool:
+        person = writer.add("IfcPerson", None, None, creator, None, None, None, None, None)
+        organisation = writer.add("IfcOrganization", None, organization, None, None, None)
+        person_and_organization = writer.add("IfcPersonAndOrganization", person, organisation, None)
+        ifc_application = writer.add("IfcApplication", organisation, application_version, application, "")
+        owner_history = writer.add("IfcOwnerHistory", person_and_organization, ifc_application, None, Enum("ADDED"), None, person_and_organization, ifc_application, timestamp)
+        x_direction = writer.add("IfcDirection", X)
+        z_direction = writer.add("IfcDirection", Z)
+        origin = writer.add("IfcCartesianPoint", O)
+        world = writer.add("IfcAxis2Placement3D", origin, z_direction, x_direction)
+        true_north = writer.add("IfcDirection", (0., 1.))
+        context = writer.add("IfcGeometricRepresentationContext", None, "Model", 3, 1.E-05, world, true_north)
+        exponents = writer.add("IfcDimensionalExponents", 0, 0, 0, 0, 0, 0, 0)
+        length = writer.add("IfcSIUnit", Raw("*"), Enum("LENGTHUNIT"), None, Enum("METRE"))
+        area = writer.add("IfcSIUnit", Raw("*"), Enum("AREAUNIT"), None, Enum("SQUARE_METRE"))
+        volume = writer.add("IfcSIUnit", Raw("*"), Enum("VOLUMEUNIT"), None, Enum("CUBIC_METRE"))
+        radian = writer.add("IfcSIUnit", Raw("*"), Enum("PLANEANGLEUNIT"), None, Enum("RADIAN"))
+        degree_factor = writer.add("IfcMeasureWithUnit", Typed("IfcPlaneAngleMeasure", 0.017453292519943295), radian)
+        degree = writer.add("IfcConversionBasedUnit", exponents, Enum("PLANEANGLEUNIT"), "DEGREE", degree_factor)
+        units = writer.add("IfcUnitAssignment", (length, area, volume, degree))
+
+        building_storey, storey_placement = write_stream_hierarchy(writer, owner_history, world, context, units)
+        shapes = write_stream_palette(writer, context, origin, world, 0.001, bins)
+
+        properties = {}  # rounded value -> IfcPropertySingleValue, shared by all psets with that value
+        count = 0
+        for chunk in read_csv_chunks(input_file, chunk_size):
+            color_bins = quantize(normalize(chunk[:, 3], min_value, max_value), bins)
+            rounded_values = np.rint(chunk[:, 3]).astype(int)
+            elements_per_value = {}
+            for (x, y, z), color_bin, rounded_value in zip(chunk[:, :3].tolist(), color_bins.tolist(), rounded_values.tolist()):
+                point = writer.add("IfcCartesianPoint", (x, y, z))
+                axis = writer.add("IfcAxis2Placement3D", point, z_direction, x_direction)
+                element_placement = writer.add("IfcLocalPlacement", storey_placement, axis)
+                element = writer.add("IfcBuildingElementProxy", create_guid(), owner_history, "Element", None, None, element_placement, shapes[color_bin], None, None)
+                elements_per_value.setdefault(rounded_value, []).append(element)
+                spool.write(f"{element}\n")
+
+            # A property set may only be related once, so every chunk gets its own pset per value
+            for rounded_value, elements in elements_per_value.items():
+                if rounded_value not in properties:
+                    properties[rounded_value] = writer.add("IfcPropertySingleValue", "Potentialmessung", None, Typed("IfcLabel", str(rounded_value)), None)
+                pset = writer.add("IfcPropertySet", create_guid(), owner_history, "UEP", None, (properties[rounded_value],))
+                writer.add("IfcRelDefinesByProperties", create_guid(), owner_history, None, None, elements, pset)
+            count += len(chunk)
+            print(f"{count} rows written")
+
+        # The containment list is read back from the spool file instead of being kept in memory
+        spool.seek(0)
+        writer.add_with_list("IfcRelContainedInSpatialStructure", (create_guid(), owner_history, "Building Storey Container", None),
+                             (int(line) for line in spool), (building_storey,))
+
+
+# Tiled output: the CSV is split into XY tiles, every tile is written as its own IFC by a worker
+# process and an index file lists the tiles with their bounding boxes.
+def split_csv_into_tiles(input_file, folder, tile_size=SHARD_TILE, chunk_size=STREAM_CHUNK_ROWS):
+    # Returns {tile: {"csv", "count", "bbox"}} and the value range of the whole file
+    tiles = {}
+    min_value, max_value = float("inf"), float("-inf")
+    for chunk in read_csv_chunks(input_file, chunk_size):
+        min_value = min(min_value, chunk[:, 3].min())
+        max_value = max(max_value, chunk[:, 3].max())
+        for key, rows in tile_groups(chunk[:, 0], chunk[:, 1], tile_size):
+            part = chunk[rows]
+            tile = tiles.get(key)
+            if tile is None:
+                tile = tiles[key] = {"csv": os.path.join(folder, f"tile_{key[0]}_{key[1]}.csv"), "count": 0,
+                                     "bbox": [float("inf")] * 3 + [float("-inf")] * 3}
+                with open(tile["csv"], "w") as file:
+                    file.write("x,y,z,value\n")
+            with open(tile["csv"], "a") as file:
+                np.savetxt(file, part, delimiter=",", fmt="%.17g")
+            tile["count"] += len(part)
+            tile["bbox"] = np.minimum(tile["bbox"][:3], part[:, :3].min(axis=0)).tolist() + \
+                np.maximum(tile["bbox"][3:], part[:, :3].max(axis=0)).tolist()
+    return tiles, (min_value, max_value)
+
+def tile_path(output_file, key):
+    base, extension = os.path.splitext(output_file)
+    return f"{base}_{key[0]}_{key[1]}{extension}"
+
+def create_tiled_ifc(input_file, output_file, tile_size=SHARD_TILE, processes=SHARD_PROCESSES):
+    with tempfile.TemporaryDirectory() as folder:
+        tiles, value_limits = split_csv_into_tiles(input_file, folder, tile_size)
+        print(f"{sum(tile['count'] for tile in tiles.values())} rows in {len(tiles)} tiles")
+
+        # All tiles use the value range of the whole survey so the colors match across files
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {key: executor.submit(create_ifc, tile["csv"], tile_path(output_file, key), value_limits) for key, tile in tiles.items()}
+            for key, future in futures.items():
+                future.result()
+                print(f"Tile {key[0]} {key[1]} written to {tile_path(output_file, key)}")
+
+    index = {
+        "tile_size": tile_size,
+        "value_range": [float(value) for value in value_limits],
+        "tiles": [{"tile": list(key), "file": os.path.basename(tile_path(output_file, key)), "count": tile["count"], "bbox": tile["bbox"]}
+                  for key, tile in sorted(tiles.items())],
+    }
+    index_file = os.path.splitext(output_file)[0] + "_tiles.json"
+    with open(index_file, "w") as file:
+        json.dump(index, file, indent=2)
+    print(f"Tile index written to {index_file}")
+    return index_file
+
+
 def main():
-    open_file_dialog()
+    if len(sys.argv) > 2 and SHARD_TILE:
+        create_tiled_ifc(sys.argv[1], sys.argv[2])
+    elif len(sys.argv) > 2:
+        create_ifc(sys.argv[1], sys.argv[2])
+    else:
+        open_file_dialog()
 
 if __name__ == "__main__":
     main()
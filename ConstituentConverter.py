@@ -0,0 +1,188 @@
+import ifcopenshell
+import ifcopenshell.guid
+import logging
+import os
+import sys
+from ifcopenshell.util.element import get_type
+from ifcopenshell.util.unit import calculate_unit_scale
+from material_index import MaterialIndex
+from quantity_index import QuantityIndex
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,  # Set to DEBUG for detailed logs
+    format='%(levelname)s: %(message)s'
+)
+
+# Define a reasonable default thickness (in meters)
+DEFAULT_THICKNESS = 0.1  # Adjust as necessary
+
+# Layers of horizontal elements are stacked along the extrusion axis, walls along their thickness
+AXIS3_CLASSES = ('IfcSlab', 'IfcRoof', 'IfcCovering', 'IfcPlate')
+
+def layer_set_direction(element):
+    return "AXIS3" if any(element.is_a(ifc_class) for ifc_class in AXIS3_CLASSES) else "AXIS2"
+
+def create_layer_set(model, constituent_set, constituents, widths):
+    """Creates an IfcMaterialLayerSet with one layer per constituent and copies the constituent properties."""
+    material_layers = []
+    for constituent, width in zip(constituents, widths):
+        constituent_name = constituent.Name.strip() if constituent.Name else "Unnamed Constituent"
+        material_layer = model.create_entity(
+            'IfcMaterialLayer',
+            Material=constituent.Material,
+            LayerThickness=width,
+            IsVentilated=None,
+            Name=constituent_name,
+            Description=constituent.Description,
+            Category=constituent.Category
+        )
+        material_layers.append(material_layer)
+
+        # Transfer material properties from the constituent to the layer, sharing the property entities
+        for material_properties in getattr(constituent, 'HasProperties', None) or ():
+            model.create_entity(
+                'IfcMaterialProperties',
+                Name=material_properties.Name,
+                Description=material_properties.Description,
+                Properties=material_properties.Properties,
+                Material=material_layer
+            )
+
+    return model.create_entity(
+        'IfcMaterialLayerSet',
+        MaterialLayers=material_layers,
+        LayerSetName=constituent_set.Name,
+        Description='Generated Layer Set'
+    )
+
+def convert_constituent_sets(model):
+    """
+    Converts every IfcMaterialConstituentSet used by elements into layer sets, in one pass.
+
+    Layer widths come from the element's IfcPhysicalComplexQuantity with the constituent's name.
+    Elements with the same set and the same widths share one layer set, and elements with the
+    same layer set and direction share one usage and one IfcRelAssociatesMaterial.
+    """
+    length_scale = calculate_unit_scale(model)
+    default_thickness = DEFAULT_THICKNESS / length_scale
+    material_index = MaterialIndex(model)
+    quantity_index = QuantityIndex(model)
+
+    layer_sets = {}  # (constituent set id, widths) -> IfcMaterialLayerSet
+    usage_elements = {}  # (layer set id, direction) -> [elements]
+    converted = set()
+    processed_sets = []
+
+    constituent_sets = material_index.elements_per_constituent_set()
+    logging.info(f"Found {len(constituent_sets)} IfcMaterialConstituentSet entities used by elements.")
+
+    for constituent_set, elements in constituent_sets.items():
+        constituents = constituent_set.MaterialConstituents or []
+        if not constituents:
+            logging.warning(f"No constituents found in set '{constituent_set.Name}'. Skipping.")
+            continue
+        processed_sets.append(constituent_set)
+
+        for element in elements:
+            widths = quantity_index.constituent_widths(element, constituents)
+            if all(width is None for width in widths):
+                # Fall back to the quantities of the type, if any
+                element_type = get_type(element)
+                if element_type is not None:
+                    widths = quantity_index.constituent_widths(element_type, constituents)
+            missing = sum(width is None for width in widths)
+            if missing:
+                logging.debug(f"{missing} constituents of '{constituent_set.Name}' without width on element #{element.id()}. Using {DEFAULT_THICKNESS} meters.")
+            widths = tuple(round(width if width is not None and width > 0 else default_thickness, 6) for width in widths)
+
+            key = (constituent_set.id(), widths)
+            if key not in layer_sets:
+                layer_sets[key] = create_layer_set(model, constituent_set, constituents, widths)
+                logging.info(f"Created IfcMaterialLayerSet '{constituent_set.Name}' with layers {widths}.")
+            usage_elements.setdefault((layer_sets[key].id(), layer_set_direction(element)), []).append(element)
+            converted.add(element.id())
+
+    # One usage and one association per layer set and direction
+    owner_history = model.by_type('IfcOwnerHistory')
+    owner_history = owner_history[0] if owner_history else None
+    for (layer_set_id, direction), elements in usage_elements.items():
+        material_layer_set_usage = model.create_entity(
+            'IfcMaterialLayerSetUsage',
+            ForLayerSet=model.by_id(layer_set_id),
+            LayerSetDirection=direction,
+            DirectionSense="POSITIVE",
+            OffsetFromReferenceLine=0.0
+        )
+        model.create_entity(
+            'IfcRelAssociatesMaterial',
+            GlobalId=ifcopenshell.guid.new(),
+            OwnerHistory=owner_history,
+            RelatedObjects=elements,
+            RelatingMaterial=material_layer_set_usage
+        )
+    logging.info(f"Associated {len(converted)} elements with {len(usage_elements)} layer set usages.")
+
+    # Detach the converted elements from their old associations; keep types and other users untouched
+    for constituent_set in processed_sets:
+        still_used = False
+        for rel in [rel for rel in model.get_inverse(constituent_set) if rel.is_a('IfcRelAssociatesMaterial')]:
+            remaining = [obj for obj in rel.RelatedObjects if obj.id() not in converted]
+            if not remaining:
+                model.remove(rel)
+            elif len(remaining) != len(rel.RelatedObjects):
+                rel.RelatedObjects = remaining
+                still_used = True
+            else:
+                still_used = True
+        if not still_used and not model.get_inverse(constituent_set):
+            # Optionally, remove the old constituent set to prevent clutter
+            constituents = constituent_set.MaterialConstituents or []
+            model.remove(constituent_set)
+            for constituent in constituents:
+                if not model.get_inverse(constituent):
+                    model.remove(constituent)
+            logging.info(f"Removed old IfcMaterialConstituentSet '{constituent_set.Name}'.")
+
+    return len(converted)
+
+def convert_file(input_file, output_file):
+    # Open the IFC model
+    try:
+        model = ifcopenshell.open(input_file)
+        logging.info(f"Successfully opened IFC file: '{input_file}'")
+    except Exception as e:
+        logging.error(f"Failed to open IFC file '{input_file}': {e}")
+        return False
+
+    convert_constituent_sets(model)
+
+    # Save the modified IFC model
+    try:
+        model.write(output_file)
+        logging.info(f"Modified IFC file has been saved as '{output_file}'.")
+    except Exception as e:
+        logging.error(f"Failed to write the modified IFC file: {e}")
+        return False
+    return True
+
+def convert_batch(input_path, output_path):
+    """Converts a single file, or every .ifc file in a folder into an output folder."""
+    if not os.path.isdir(input_path):
+        return convert_file(input_path, output_path)
+    os.makedirs(output_path, exist_ok=True)
+    results = []
+    for file_name in sorted(os.listdir(input_path)):
+        if file_name.lower().endswith('.ifc'):
+            results.append(convert_file(os.path.join(input_path, file_name), os.path.join(output_path, file_name)))
+    logging.info(f"Converted {sum(results)} of {len(results)} files.")
+    return all(results)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        input_file, output_file = sys.argv[1], sys.argv[2]
+    else:
+        # Paths to input and output IFC files (or folders)
+        input_file = r"C:\Users\LouisTrümpler\Documents\GitHub\NHMzh\tests\SampleIfc\4_RV_Str.ifc"
+        output_file = r"C:\Users\LouisTrümpler\Documents\GitHub\NHMzh\tests\SampleIfc\4_RV_Str_OUT.ifc"
+    sys.exit(0 if convert_batch(input_file, output_file) else 1)
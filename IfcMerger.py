@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QLa
 from PyQt5.QtCore import Qt
 import ifcopenshell
 from ifcopenshell import api
+from qt_jobs import JobRunner, JobPanel
 
 class IFCMergeGUI(QWidget):
     def __init__(self):
@@ -27,6 +28,11 @@ class IFCMergeGUI(QWidget):
         self.merge_button.clicked.connect(self.prepare_merge)
         main_layout.addWidget(self.merge_button)
 
+        # Merging runs in the background, the panel shows progress and allows cancelling
+        self.job_panel = JobPanel(self)
+        main_layout.addWidget(self.job_panel)
+        self.runner = JobRunner(self.job_panel, self)
+
         self.setLayout(main_layout)
 
         self.ifc_files = []
@@ -45,20 +51,40 @@ class IFCMergeGUI(QWidget):
     def prepare_merge(self):
         if self.ifc_files:
             dominant_ifc_path = self.ifc_files[0]  # Assuming the first selected file is the dominant one
-            merged_ifc = self.merge_ifc_files(dominant_ifc_path, self.ifc_files)
-            if merged_ifc:
-                output_file_path, _ = QFileDialog.getSaveFileName(self, "Save Merged IFC File", "", "IFC Files (*.ifc)")
-                if output_file_path:
-                    ifcopenshell.file.write(merged_ifc, output_file_path)
-                    print(f"Merged IFC saved to {output_file_path}")
-            else:
-                print("Merge operation failed.")
+            output_file_path, _ = QFileDialog.getSaveFileName(self, "Save Merged IFC File", "", "IFC Files (*.ifc)")
+            if output_file_path:
+                self.merge_button.setEnabled(False)
+                self.runner.start(self.merge_and_write, dominant_ifc_path, list(self.ifc_files), output_file_path,
+                                  on_result=self.merge_done, on_finished=lambda: self.merge_button.setEnabled(True))
         else:
             print("No IFC files selected")
 
     @staticmethod
-    def merge_ifc_files(dominant_ifc_path, ifc_files, copy_all_levels=True):
+    def merge_and_write(job, dominant_ifc_path, ifc_files, output_file_path):
+        # Runs on a worker thread
+        merged_ifc = IFCMergeGUI.merge_ifc_files(dominant_ifc_path, ifc_files, job=job)
+        if not merged_ifc:
+            return None
+        job.report(None, None, "Writing merged file")
+        ifcopenshell.file.write(merged_ifc, output_file_path)
+        return output_file_path
+
+    def merge_done(self, output_file_path):
+        if output_file_path:
+            print(f"Merged IFC saved to {output_file_path}")
+            self.job_panel.status_label.setText(f"Saved to {output_file_path}")
+        else:
+            print("Merge operation failed.")
+
+    @staticmethod
+    def merge_ifc_files(dominant_ifc_path, ifc_files, copy_all_levels=True, job=None):
+        # job: optional qt_jobs.Job for progress and cancellation
+        def report(done, total, message):
+            if job is not None:
+                job.report(done, total, message)
+
         # Load the dominant IFC file
+        report(None, None, f"Loading {dominant_ifc_path}")
         dominant_ifc = ifcopenshell.open(dominant_ifc_path)
         new_ifc_file = ifcopenshell.file(schema=dominant_ifc.schema)
         levels_mapping = {}
@@ -107,9 +133,13 @@ class IFCMergeGUI(QWidget):
             handle_levels(dominant_ifc, new_ifc_file, levels_mapping)
 
         # Merge entities from all files, adjusting containment and skipping as necessary
-        for ifc_path in ifc_files:
+        for file_number, ifc_path in enumerate(ifc_files):
+            report(file_number, len(ifc_files), f"Merging {ifc_path}")
             current_ifc = ifcopenshell.open(ifc_path)
-            for entity in current_ifc:
+            for entity_number, entity in enumerate(current_ifc):
+                if entity_number % 10000 == 0:
+                    report(file_number, len(ifc_files), f"Merging {ifc_path}")
+
                 # Skip levels if not copying from all files and entity is a storey
                 if entity.is_a('IfcBuildingStorey') and not copy_all_levels:
                     continue
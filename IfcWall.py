@@ -1,81 +1,159 @@
+import csv
+import sys
+import time
+import numpy as np
 import ifcopenshell
-import uuid
-
-# Create a new IFC model with the IFC4 schema
-model = ifcopenshell.file(schema="IFC4")
-
-# Define a function to generate a new GUID
-def new_guid():
-    return str(uuid.uuid4())
-
-# Define the major components of the IFC model
-project = model.createIfcProject(
-    globalid=new_guid(),
-    owner_history=None,
-    name="Project",
-    description="A sample project",
-    units_in_context=None  # Provide appropriate units or None if not applicable
-)
-site = model.createIfcSite(
-    globalid=new_guid(),
-    owner_history=None,
-    name="Site",
-    description="A sample site",
-    site_address=None  # Provide site address if available, otherwise None
-)
-building = model.createIfcBuilding(
-    globalid=new_guid(),
-    owner_history=None,
-    name="Building",
-    description="A sample building",
-    building_address=None  # Provide building address if available, otherwise None
-)
-
-# Define a local placement for the wall
-location = model.createIfcCartesianPoint((0, 0, 0))
-axis = model.createIfcDirection((0, 0, 1))
-ref_direction = model.createIfcDirection((1, 0, 0))
-placement = model.createIfcLocalPlacement(None, location, axis, ref_direction)
-
-# Define the geometry for the wall: a rectangle profile extruded along the Z-axis
-wall_profile = model.createIfcRectangleProfileDef("AREA", "WallProfile", model.createIfcAxis2Placement2D(), 5.0, 0.4)
-extrude_direction = model.createIfcDirection((0, 0, 1))
-solid = model.createIfcExtrudedAreaSolid(wall_profile, model.createIfcAxis2Placement3D(), extrude_direction, 3.0)
-
-# Create the wall product with the defined geometry
-wall = model.createIfcWallStandardCase(
-    globalid=new_guid(),
-    owner_history=None,
-    name="Wall",
-    object_placement=placement,
-    representation=model.createIfcProductDefinitionShape(
-        representations=[model.createIfcShapeRepresentation("Body", "SweptSolid", [solid])]
-    )
-)
-
-# Aggregate the structure elements into a hierarchy
-model.createIfcRelAggregates(new_guid(), relating_object=project, related_objects=[site])
-model.createIfcRelAggregates(new_guid(), relating_object=site, related_objects=[building])
-model.createIfcRelContainedInSpatialStructure(new_guid(), relating_structure=building, related_elements=[wall])
-
-# Create a custom property set with properties
-property_set = model.createIfcPropertySet(
-    globalid=new_guid(),
-    name="Custom",
-    properties=[
-        model.createIfcPropertySingleValue(name="IsExternal", nominal_value=model.createIfcBoolean(True)),
-        model.createIfcPropertySingleValue(name="Hello IFC", nominal_value=model.createIfcText("Hello IFC"))
-    ]
-)
-
-# Assign the property set to the wall
-model.createIfcRelDefinesByProperties(
-    globalid=new_guid(),
-    related_objects=[wall],
-    relating_property_definition=property_set
-)
-
-# Save the model to a file
-model.write('your_model.ifc')
-
-print("IFC model has been successfully created and saved.")
+import ifcopenshell.api
+import ifcopenshell.guid
+from instancing import ShapeLibrary
+from bulk_pset import assign_properties
+
+# Builds walls from a table of axis lines. Columns:
+#   start_x, start_y, end_x, end_y, thickness, height   (meters)
+#   storey, elevation, is_external                      (optional)
+# Every unique (thickness, height) becomes one IfcWallType holding a wall of length 1 as its
+# representation map. Occurrences map it with a non-uniform scale along the axis, so the geometry
+# of thousands of walls is stored once per type.
+
+NUMERIC_COLUMNS = ["start_x", "start_y", "end_x", "end_y", "thickness", "height"]
+DEFAULT_STOREY = "Ground Floor"
+LENGTH_PRECISION = 4  # Decimals of the wall length, walls of equal rounded length share one shape
+
+
+def read_walls(file_path):
+    """Returns the table as {column: array}. Excel files need pandas."""
+    if file_path.lower().endswith((".xlsx", ".xls")):
+        import pandas as pd
+        frame = pd.read_excel(file_path)
+        rows = frame.to_dict("list")
+    else:
+        with open(file_path, newline='', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file)
+            rows = {name.strip(): [] for name in reader.fieldnames}
+            for row in reader:
+                for name, value in row.items():
+                    rows[name.strip()].append(value)
+
+    missing = [name for name in NUMERIC_COLUMNS if name not in rows]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    walls = {name: np.asarray(rows[name], dtype=float) for name in NUMERIC_COLUMNS}
+    count = len(walls["start_x"])
+    walls["storey"] = [str(value) for value in rows.get("storey", [DEFAULT_STOREY] * count)]
+    walls["elevation"] = np.asarray(rows.get("elevation", [0.0] * count), dtype=float)
+    if "is_external" in rows:
+        walls["is_external"] = [str(value).strip().lower() in ("1", "true", "yes") for value in rows["is_external"]]
+    return walls
+
+
+def create_project(name="Project"):
+    model = ifcopenshell.api.run("project.create_file", version="IFC4")
+    project = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcProject", name=name)
+    ifcopenshell.api.run("unit.assign_unit", model, length={"is_metric": True, "raw": "METERS"})
+    model_context = ifcopenshell.api.run("context.add_context", model, context_type="Model")
+    body = ifcopenshell.api.run("context.add_context", model, context_type="Model", context_identifier="Body", target_view="MODEL_VIEW", parent=model_context)
+    site = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcSite", name="Site")
+    building = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcBuilding", name="Building")
+    ifcopenshell.api.run("aggregate.assign_object", model, products=[site], relating_object=project)
+    ifcopenshell.api.run("aggregate.assign_object", model, products=[building], relating_object=site)
+    ifcopenshell.api.run("geometry.edit_object_placement", model, product=site)
+    ifcopenshell.api.run("geometry.edit_object_placement", model, product=building)
+    return model, body, building
+
+
+def create_storeys(model, building, names, elevations):
+    """One IfcBuildingStorey per unique name, placed at its (first) elevation."""
+    storeys = {}
+    for name, elevation in zip(names, elevations.tolist()):
+        if name in storeys:
+            continue
+        storey = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcBuildingStorey", name=name)
+        storey.Elevation = elevation
+        matrix = np.eye(4)
+        matrix[2, 3] = elevation
+        ifcopenshell.api.run("geometry.edit_object_placement", model, product=storey, matrix=matrix)
+        storeys[name] = storey
+    ifcopenshell.api.run("aggregate.assign_object", model, products=list(storeys.values()), relating_object=building)
+    return storeys
+
+
+def unit_wall_items(model, thickness, height):
+    # A wall of length 1 along X, centered on its axis
+    position = model.createIfcAxis2Placement2D(model.createIfcCartesianPoint((0.5, 0.0)), None)
+    profile = model.createIfcRectangleProfileDef("AREA", None, position, 1.0, float(thickness))
+    return [model.createIfcExtrudedAreaSolid(profile, None, model.createIfcDirection((0.0, 0.0, 1.0)), float(height))]
+
+
+def build_walls(model, body, building, walls):
+    library = ShapeLibrary(model, body)
+    storeys = create_storeys(model, building, walls["storey"], walls["elevation"])
+
+    # Axis direction and length of all walls at once
+    delta = np.column_stack([walls["end_x"] - walls["start_x"], walls["end_y"] - walls["start_y"]])
+    lengths = np.hypot(delta[:, 0], delta[:, 1])
+    valid = lengths > 1e-9
+    directions = np.zeros_like(delta)
+    directions[valid] = delta[valid] / lengths[valid, None]
+    if not valid.all():
+        print(f"Skipping {int((~valid).sum())} walls with zero length.")
+
+    wall_types = {}  # (thickness, height) -> IfcWallType
+    occurrences_per_type = {}
+    occurrences_per_storey = {}
+    z_axis = library.direction((0.0, 0.0, 1.0))
+    created = []
+    rows = np.flatnonzero(valid)
+    for index, x, y, dx, dy, length, thickness, height in zip(
+            rows.tolist(), walls["start_x"][rows].tolist(), walls["start_y"][rows].tolist(),
+            directions[rows, 0].tolist(), directions[rows, 1].tolist(), lengths[rows].tolist(),
+            walls["thickness"][rows].tolist(), walls["height"][rows].tolist()):
+        key = (thickness, height)
+        if key not in wall_types:
+            representation_map = library.add_shape(key, lambda: unit_wall_items(model, thickness, height))
+            name = f"Wall {thickness * 1000:g}x{height * 1000:g}"
+            wall_types[key] = model.createIfcWallType(ifcopenshell.guid.new(), None, name, None, None, None,
+                                                      [representation_map], None, None, "STANDARD")
+            occurrences_per_type[key] = []
+
+        # Points and directions shared by walls starting at the same corner or running in parallel are reused
+        storey = storeys[walls["storey"][index]]
+        axis = model.createIfcAxis2Placement3D(library.point((x, y, 0.0)), z_axis, library.direction((dx, dy, 0.0)))
+        placement = model.createIfcLocalPlacement(storey.ObjectPlacement, axis)
+        wall = model.createIfcWall(ifcopenshell.guid.new(), None, wall_types[key].Name, None, None, placement,
+                                   library.instance(key, scale=(round(length, LENGTH_PRECISION), 1.0, 1.0)), None, "STANDARD")
+        occurrences_per_type[key].append(wall)
+        occurrences_per_storey.setdefault(storey, []).append(wall)
+        created.append(wall)
+
+    # One type and one containment relation per type and storey instead of one per wall
+    for key, occurrences in occurrences_per_type.items():
+        model.createIfcRelDefinesByType(ifcopenshell.guid.new(), None, None, None, occurrences, wall_types[key])
+    for storey, occurrences in occurrences_per_storey.items():
+        model.createIfcRelContainedInSpatialStructure(ifcopenshell.guid.new(), None, None, None, occurrences, storey)
+
+    if "is_external" in walls:
+        assign_properties(model, created, "Pset_WallCommon", {"IsExternal": [walls["is_external"][index] for index in rows.tolist()]})
+
+    print(f"Created {len(created)} walls of {len(wall_types)} types on {len(storeys)} storeys.")
+    return created
+
+
+def example_walls():
+    # The single 5 m wall, 0.4 m thick and 3 m high
+    return {"start_x": np.array([0.0]), "start_y": np.array([0.0]), "end_x": np.array([5.0]), "end_y": np.array([0.0]),
+            "thickness": np.array([0.4]), "height": np.array([3.0]), "storey": [DEFAULT_STOREY], "elevation": np.array([0.0]),
+            "is_external": [True]}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        walls, output_path = read_walls(sys.argv[1]), sys.argv[2]
+    else:
+        print("Usage: python IfcWall.py <walls.csv|walls.xlsx> <output.ifc>, building the example wall.")
+        walls, output_path = example_walls(), "your_model.ifc"
+
+    start = time.time()
+    model, body, building = create_project()
+    build_walls(model, body, building, walls)
+    model.write(output_path)
+    print(f"IFC model has been successfully created and saved as {output_path} in {time.time() - start:.1f} s.")
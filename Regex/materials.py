@@ -1,44 +1,78 @@
 import re
+import sys
+
+entity_regex = re.compile(r'#(\d+)\s*=\s*(IFC\w+)\s*\(')
+rel_associates_material_regex = re.compile(
+    r'#(\d+)\s*=\s*IFCRELASSOCIATESMATERIAL\([^,]*,[^,]*,(?:\'(?:[^\']|\'\')*\'|\$),(?:\'(?:[^\']|\'\')*\'|\$),\(([^)]*)\),#(\d+)\);')
+rel_defines_by_type_regex = re.compile(
+    r'#(\d+)\s*=\s*IFCRELDEFINESBYTYPE\([^,]*,[^,]*,(?:\'(?:[^\']|\'\')*\'|\$),(?:\'(?:[^\']|\'\')*\'|\$),\(([^)]*)\),#(\d+)\);')
+rel_contained_regex = re.compile(
+    r'#(\d+)\s*=\s*IFCRELCONTAINEDINSPATIALSTRUCTURE\([^,]*,[^,]*,(?:\'(?:[^\']|\'\')*\'|\$),(?:\'(?:[^\']|\'\')*\'|\$),\(([^)]*)\),#(\d+)\);')
+element_regex = re.compile(r'#(\d+)')
+
+def get_entity_types(ifc_content):
+    # One pass over the file: entity id -> entity type
+    return {match.group(1): match.group(2) for match in entity_regex.finditer(ifc_content)}
+
+def get_elements_with_material_associations(ifc_content, entity_types=None):
+    if entity_types is None:
+        entity_types = get_entity_types(ifc_content)
 
-def get_elements_with_material_associations(ifc_content):
-    rel_associates_material_regex = re.compile(
-        r'(#\d+)=IFCRELASSOCIATESMATERIAL\([^,]*,[^,]*,.*?,\(([^)]*)\),#(\d+)\);', re.MULTILINE)
-    element_regex = re.compile(r'#(\d+)')
-    
     element_to_material = {}
-    
+    type_to_material = {}
+
     matches = rel_associates_material_regex.findall(ifc_content)
     print(f"Found {len(matches)} material associations.")
-    
-    element_ids = set(re.findall(r'#\d+', ifc_content))
-    
-    for match in matches:
-        rel_id = match[0]
-        material_id = match[2]
-        for element_id in element_regex.findall(match[1]):
-            full_id = f'#{element_id}'
-            if full_id in element_ids and "TYPE" not in ifc_content.split(full_id, 1)[1][:50]:
+
+    for rel_id, related, material_id in matches:
+        for element_id in element_regex.findall(related):
+            if "TYPE" in entity_types.get(element_id, ""):
+                type_to_material[element_id] = material_id
+            elif element_id in entity_types:
                 element_to_material[element_id] = material_id
                 print(f"Added element ID {element_id} with material ID {material_id}")
-    
+
+    # Elements without a direct association inherit the material of their type
+    for rel_id, related, type_id in rel_defines_by_type_regex.findall(ifc_content):
+        if type_id not in type_to_material:
+            continue
+        for element_id in element_regex.findall(related):
+            if element_id not in element_to_material:
+                element_to_material[element_id] = type_to_material[type_id]
+                print(f"Added element ID {element_id} with material ID {type_to_material[type_id]} (from type #{type_id})")
+
     return element_to_material
 
 def get_elements_with_material_assignments(ifc_content):
     element_to_material = get_elements_with_material_associations(ifc_content)
     return set(element_to_material.keys())
 
+def get_contained_elements(ifc_content):
+    contained = set()
+    for rel_id, related, structure_id in rel_contained_regex.findall(ifc_content):
+        contained.update(element_regex.findall(related))
+    return contained
+
 def debug_ifc_file(ifc_file_path):
     with open(ifc_file_path, 'r', encoding='utf-8') as file:
         ifc_content = file.read()
-    
-    elements_with_material_assignments = get_elements_with_material_assignments(ifc_content)
-    
+
+    entity_types = get_entity_types(ifc_content)
+    element_to_material = get_elements_with_material_associations(ifc_content, entity_types)
+
     print("Elements with material assignment:")
-    for element_id in elements_with_material_assignments:
+    for element_id in element_to_material:
         print(f"Element ID: {element_id}, Material Assignment: Yes")
 
+    # QA: contained elements that have neither a direct nor an inherited material
+    missing = sorted(get_contained_elements(ifc_content) - set(element_to_material), key=int)
+    print(f"Elements without material assignment: {len(missing)}")
+    for element_id in missing:
+        print(f"Element ID: {element_id} ({entity_types.get(element_id, 'unknown')}), Material Assignment: No")
 
-
-# Provide the path to the IFC file
-ifc_file_path = 
-debug_ifc_file(ifc_file_path)
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python materials.py <file.ifc>")
+        sys.exit(1)
+    # Provide the path to the IFC file
+    debug_ifc_file(sys.argv[1])
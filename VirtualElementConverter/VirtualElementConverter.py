@@ -1,19 +1,32 @@
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QListWidget, QListWidgetItem, QFileDialog
 from PyQt5.QtCore import Qt
 import ifcopenshell
+import os
 import sys
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qt_jobs import JobRunner, JobPanel
+
 # Initialize the IFC file variable
 ifc_file = None
 
 # Function to load the IFC file
 def load_ifc_file():
-    global ifc_file
     options = QFileDialog.Options()
     filePath, _ = QFileDialog.getOpenFileName(None, "Open IFC File", "", "IFC Files (*.ifc);;All Files (*)", options=options)
     if filePath:
-        ifc_file = ifcopenshell.open(filePath)
-        update_class_list()
+        runner.start(open_model, filePath, on_result=model_loaded)
+
+# Runs on a worker thread: open the file and count its classes
+def open_model(job, filePath):
+    job.report(None, None, f"Loading {os.path.basename(filePath)}")
+    model = ifcopenshell.open(filePath)
+    return model, count_classes(job, model)
+
+def model_loaded(result):
+    global ifc_file
+    ifc_file, classes = result
+    update_class_list(classes)
 
 # Function to save the IFC file
 def save_as_function():
@@ -21,12 +34,16 @@ def save_as_function():
     options = QFileDialog.Options()
     filePath, _ = QFileDialog.getSaveFileName(None, "Save As", "", "IFC Files (*.ifc);;All Files (*)", options=options)
     if filePath:
-        ifc_file.write(filePath)
+        runner.start(write_model, ifc_file, filePath, on_result=job_panel.status_label.setText)
+
+def write_model(job, model, filePath):
+    job.report(None, None, f"Writing {os.path.basename(filePath)}")
+    model.write(filePath)
+    return f"Saved to {filePath}"
 
 # Function to convert a given entity to IfcVirtualElement
-def convert_entity_to_virtual_element(entity):
-    global ifc_file
-    virtual_element = ifc_file.createEntity(
+def convert_entity_to_virtual_element(model, entity):
+    virtual_element = model.create_entity(
         "IfcVirtualElement",
         *[
             entity.get_info()[attribute_name]
@@ -39,7 +56,7 @@ def convert_entity_to_virtual_element(entity):
             ]
         ],
     )
-    ifc_file.remove(entity)
+    model.remove(entity)
     return virtual_element
 
 # Function to convert selected items to IfcVirtualElement
@@ -50,23 +67,37 @@ def convert_to_virtual_element():
         return
 
     selected_class = selected_items[0].text().split(" ")[0]
-
-    for entity in ifc_file.by_type(selected_class):
-        convert_entity_to_virtual_element(entity)
-
-    update_class_list()
-
-# Function to update the list of IFC classes
-def update_class_list():
-    global ifc_file
-    if ifc_file is None:
-        return
-
+    runner.start(convert_class, ifc_file, selected_class, on_result=update_class_list)
+
+# Runs on a worker thread: convert all entities of a class, then recount.
+# Conversion and count are one transaction, cancelling rolls the model back to its state before.
+def convert_class(job, model, selected_class):
+    entities = model.by_type(selected_class)
+    model.begin_transaction()
+    try:
+        for number, entity in enumerate(entities):
+            if number % 1000 == 0:
+                job.report(number, len(entities), f"Converting {selected_class} {number}/{len(entities)}")
+            convert_entity_to_virtual_element(model, entity)
+        classes = count_classes(job, model)
+    except BaseException:
+        model.discard_transaction()
+        raise
+    model.end_transaction()
+    return classes
+
+def count_classes(job, model):
+    job.report(None, None, "Counting classes")
     classes = {}
-    for entity in ifc_file:
+    for number, entity in enumerate(model):
+        if number % 10000 == 0:
+            job.check_cancelled()
         ifc_class = entity.is_a()
         classes[ifc_class] = classes.get(ifc_class, 0) + 1
+    return classes
 
+# Function to update the list of IFC classes
+def update_class_list(classes):
     list_widget.clear()
     for ifc_class, count in classes.items():
         item = QListWidgetItem(f"{ifc_class} ({count})")
@@ -95,6 +126,17 @@ save_as_button = QPushButton("Save As")
 save_as_button.clicked.connect(save_as_function)
 layout.addWidget(save_as_button)
 
+# Loading, converting and saving run in the background, one job at a time
+job_panel = JobPanel()
+layout.addWidget(job_panel)
+runner = JobRunner(job_panel)
+
+def set_buttons_enabled(running):
+    for button in (load_button, convert_button, save_as_button):
+        button.setEnabled(not running)
+
+runner.running_changed.connect(set_buttons_enabled)
+
 # Set up the main window
 window.setLayout(layout)
 window.setWindowTitle("VirtualElementConverter")
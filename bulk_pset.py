@@ -0,0 +1,71 @@
+import ifcopenshell
+import ifcopenshell.guid
+import numpy as np
+
+# Bulk property sets for generators: instead of one pset.add_pset / pset.edit_pset call per element,
+# elements with equal values share one IfcPropertySet and one IfcRelDefinesByProperties.
+
+
+def nominal_value(model, value):
+    """Wraps a plain (or NumPy) value in the matching IfcValue type."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool):
+        return model.createIfcBoolean(value)
+    if isinstance(value, int):
+        return model.createIfcInteger(value)
+    if isinstance(value, float):
+        return model.createIfcReal(value)
+    return model.createIfcLabel(str(value))
+
+
+def default_owner_history(model):
+    owner_history = model.by_type("IfcOwnerHistory")
+    return owner_history[0] if owner_history else None
+
+
+def assign_properties(model, elements, pset_name, properties, per_element=False, owner_history=None):
+    """
+    Adds the property set pset_name to elements. properties maps a property name to a sequence
+    (list or array) with one value per element; None leaves the property out for that element.
+
+    Elements with the same values share one IfcPropertySet related to all of them by a single
+    IfcRelDefinesByProperties. With per_element=True every element gets its own property set,
+    which is what editing tools expect if the values are changed later. Property entities are
+    shared either way. Returns the number of property sets created.
+    """
+    if owner_history is None:
+        owner_history = default_owner_history(model)
+    names = list(properties)
+    columns = [properties[name].tolist() if isinstance(properties[name], np.ndarray) else list(properties[name]) for name in names]
+    if any(len(column) != len(elements) for column in columns):
+        raise ValueError("Every property needs one value per element")
+
+    # Group elements by their values, so equal elements share one property set
+    groups = {}
+    for index, element in enumerate(elements):
+        key = tuple(column[index] for column in columns)
+        groups.setdefault(key, []).append(element)
+
+    single_values = {}  # (name, value) -> IfcPropertySingleValue
+
+    def property_values(key):
+        values = []
+        for name, value in zip(names, key):
+            if value is None:
+                continue
+            if (name, value) not in single_values:
+                single_values[(name, value)] = model.createIfcPropertySingleValue(name, None, nominal_value(model, value), None)
+            values.append(single_values[(name, value)])
+        return values
+
+    count = 0
+    for key, group in groups.items():
+        values = property_values(key)
+        if not values:
+            continue
+        for related in ([element] for element in group) if per_element else [group]:
+            pset = model.createIfcPropertySet(ifcopenshell.guid.new(), owner_history, pset_name, None, values)
+            model.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), owner_history, None, None, related, pset)
+            count += 1
+    return count
@@ -1,10 +1,14 @@
 import ifcopenshell
 import os
+from ifc_delta import track_changes, write_patch
 
 # Define the directory with IFC files
 ifc_folder = r'C:\Users\LouisTrümpler\Dropbox\01_Projekte\119_Lignum\Fassadensysteme 3D in llinumdata\Ifc - Renamed'
 log_file_path = os.path.join(ifc_folder, "ifccovering_renamer_log.txt")
 
+# Write only the changed entities as "_<name>.ifcdelta" instead of a full copy of every model
+write_patches = False
+
 # The copyright statement to be added to IfcProject.Description
 copyright_statement = (
     "Copyright Statement: All rights reserved.All intellectual property rights are owned by Lignum- Holzwirtschaft Schweiz, Muehlebachstrasse 8, 8008 Zuerich, Switzerland and is protected by copyright and other protective laws. The contents of this file are to be used only in accordance with the following Digital regulations.Digital regulations: This file may be downloaded for personal use only. Without the explicit written permission of Lignum- Holzwirtschaft Schweiz, it is prohibited to integrate this file in whole, in part, modified or transformed into other BIM Libraries, web sites or to distribute them by any commercial means in software and storage media. Liability: Lignum- Holzwirtschaft Schweiz has carefully compiled the contents of this Information in accordance with their current state of knowledge. Damage and warranty claims arising from missing or incorrect data are excluded. Lignum- Holzwirtschaft Schweiz bears no responsibility or liability for damage of any kind, also for indirect or consequential damages resulting from use of this file or websites related or connected to this by links."
@@ -19,6 +23,8 @@ with open(log_file_path, 'w') as log_file:
 
             # Load the IFC file
             model = ifcopenshell.open(ifc_file_path)
+            if write_patches:
+                track_changes(model)
 
             updated = False  # Track if we made any updates
 
@@ -45,8 +51,12 @@ with open(log_file_path, 'w') as log_file:
 
             if updated:
                 # Save the modified IFC file only if any update was made
-                new_ifc_file_path = os.path.join(ifc_folder, f"_{filename}")
-                model.write(new_ifc_file_path)
+                if write_patches:
+                    new_ifc_file_path = os.path.join(ifc_folder, f"_{os.path.splitext(filename)[0]}.ifcdelta")
+                    write_patch(model, ifc_file_path, new_ifc_file_path)
+                else:
+                    new_ifc_file_path = os.path.join(ifc_folder, f"_{filename}")
+                    model.write(new_ifc_file_path)
                 log_file.write(f"Processed and saved: {new_ifc_file_path}\n")
             else:
                 log_file.write(f"No IFCCOVERING elements updated in: {filename}\n")
@@ -1,17 +1,456 @@
 import sys
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.guid
+import ifcopenshell.util.element
+from bulk_pset import assign_properties
+from pset_index import property_definitions
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
-    QTableWidgetItem, QHeaderView, QLabel, QLineEdit, QCheckBox, QAbstractItemView
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView,
+    QHeaderView, QLabel, QLineEdit, QAbstractItemView
 )
 
+# The editor keeps the export as columns (one array per field) instead of one widget per cell.
+# Only the rows scrolled into view are ever turned into text by the table model.
+
+FIXED_COLUMNS = ['Select', 'GUID', 'Name']
+DEFAULT_PSET = 'Custom'  # Property set for columns without a "Pset." prefix
+
+
+def flatten_properties(properties):
+    # {"Pset": {"Prop": value}} becomes {"Pset.Prop": value}; flat dicts are kept as they are
+    flat = {}
+    for name, value in (properties or {}).items():
+        if isinstance(value, dict):
+            for prop_name, prop_value in value.items():
+                flat[f"{name}.{prop_name}"] = prop_value
+        else:
+            flat[name] = value
+    return flat
+
+
+class ColumnarData:
+    """Rows of the export as arrays: file index, GUID and name plus one array per property."""
+
+    def __init__(self):
+        self.file_keys = []
+        self.file_index = np.zeros(0, dtype=np.int32)
+        self.guids = np.zeros(0, dtype=object)
+        self.names = np.zeros(0, dtype=object)
+        self.properties = {}  # property name -> object array, None where the element has no value
+        self.edited = {}  # property name -> bool array of changed cells
+
+    def __len__(self):
+        return len(self.guids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: iterable of (file key, entry dict) as found in combined_data.json."""
+        data = cls()
+        file_positions = {}
+        file_index, guids, names = [], [], []
+        properties = {}
+        for row, (file_key, entry) in enumerate(rows):
+            if file_key not in file_positions:
+                file_positions[file_key] = len(data.file_keys)
+                data.file_keys.append(file_key)
+            file_index.append(file_positions[file_key])
+            guids.append('' if entry.get('guid') is None else str(entry['guid']))
+            names.append('' if entry.get('name') is None else str(entry['name']))
+            # Skip last column which seems to be unnecessary based on your requirement
+            entry_properties = list((entry.get('properties') or {}).items())[:-1]
+            for prop_name, prop_value in flatten_properties(dict(entry_properties)).items():
+                # Sparse until all rows are read: property -> [(row, value)]
+                properties.setdefault(prop_name, []).append((row, prop_value))
+        data.file_index = np.asarray(file_index, dtype=np.int32)
+        data.guids = np.asarray(guids, dtype=object)
+        data.names = np.asarray(names, dtype=object)
+        for prop_name, values in properties.items():
+            column = data.add_column(prop_name)
+            for row, value in values:
+                column[row] = value
+        return data
+
+    @classmethod
+    def from_columns(cls, columns):
+        """columns: {'file_key', 'guid', 'name', property...: sequence}, e.g. read from Parquet."""
+        data = cls()
+        file_keys = np.asarray(columns['file_key']).astype(str)
+        unique_keys, file_index = np.unique(file_keys, return_inverse=True)
+        data.file_keys = unique_keys.tolist()
+        data.file_index = file_index.astype(np.int32)
+        data.guids = np.asarray(columns['guid'], dtype=object)
+        data.names = np.asarray(columns.get('name', [''] * len(data.guids)), dtype=object)
+        for prop_name, values in columns.items():
+            if prop_name not in ('file_key', 'guid', 'name'):
+                data.properties[prop_name] = np.asarray(values, dtype=object)
+        return data
+
+    def add_column(self, prop_name):
+        if prop_name not in self.properties:
+            self.properties[prop_name] = np.full(len(self), None, dtype=object)
+        return self.properties[prop_name]
+
+    def set_values(self, rows, prop_name, value):
+        self.add_column(prop_name)[rows] = value
+        self.edited.setdefault(prop_name, np.zeros(len(self), dtype=bool))[rows] = True
+
+    def file_key(self, row):
+        return self.file_keys[self.file_index[row]]
+
+
+def iter_json_rows(json_file):
+    """
+    Yields (file key, entry) from combined_data.json. With ijson installed the file is parsed
+    incrementally, one entry at a time, otherwise it is loaded with json.load.
+    """
+    try:
+        import ijson
+    except ImportError:
+        with open(json_file, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        for file_key, entries in data.items():
+            for entry in entries:
+                yield file_key, entry
+        return
+
+    with open(json_file, 'rb') as file:
+        file_key, builder, depth = None, None, 0
+        for prefix, event, value in ijson.parse(file, use_float=True):
+            if event in ('start_map', 'start_array'):
+                depth += 1
+                if depth == 3 and event == 'start_map':  # {file_key: [ {entry} ]}
+                    builder = ijson.ObjectBuilder()
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+            elif depth == 1 and event == 'map_key':
+                file_key = value
+            if builder is not None:
+                builder.event(event, value)
+                if depth == 2:
+                    yield file_key, builder.value
+                    builder = None
+
+
+def load_data(path):
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        return ColumnarData.from_columns({name: table.column(name).to_pylist() for name in table.column_names})
+    return ColumnarData.from_rows(iter_json_rows(path))
+
+
+# Write-back: edited cells are grouped by source file, every file is opened and written once and
+# the files are processed in parallel.
+def split_column_name(column_name):
+    if '.' in column_name:
+        pset_name, prop_name = column_name.split('.', 1)
+        return pset_name, prop_name
+    return DEFAULT_PSET, column_name
+
+
+def collect_changes(data):
+    """Returns {file key: {guid: {pset name: {property: value}}}} for all edited cells."""
+    changes = {}
+    for column_name, edited in data.edited.items():
+        pset_name, prop_name = split_column_name(column_name)
+        values = data.properties[column_name]
+        for row in np.flatnonzero(edited).tolist():
+            file_changes = changes.setdefault(data.file_key(row), {})
+            file_changes.setdefault(data.guids[row], {}).setdefault(pset_name, {})[prop_name] = values[row]
+    return changes
+
+
+def resolve_ifc_path(file_key, json_file):
+    # file_key is a path or a file name next to the export, with or without extension
+    folder = os.path.dirname(os.path.abspath(json_file))
+    for candidate in (file_key, os.path.join(folder, file_key), os.path.join(folder, file_key + '.ifc')):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def parse_value(value, value_type):
+    """
+    Parses cell text into the type of the existing value ('BOOL', 'LOGICAL', 'INT' or 'DOUBLE' as
+    given by attribute_type). Other types and values that are not text are returned unchanged.
+    Raises ValueError for text that does not fit the type.
+    """
+    if not isinstance(value, str) or value_type not in ('BOOL', 'LOGICAL', 'INT', 'DOUBLE'):
+        return value
+    text = value.strip()
+    if value_type in ('BOOL', 'LOGICAL'):
+        if text.lower() not in ('true', 'false'):
+            raise ValueError(f"'{value}' is not true or false")
+        return text.lower() == 'true'
+    return int(text) if value_type == 'INT' else float(text)
+
+
+def typed_properties(model, definition, properties):
+    """
+    Parses the values of properties that already exist in the set into their current types.
+    Returns (typed properties, names of the properties whose value could not be parsed).
+    """
+    if definition.is_a('IfcElementQuantity'):
+        current = {quantity.Name: quantity for quantity in definition.Quantities or ()}
+    else:
+        current = {prop.Name: prop for prop in definition.HasProperties or ()}
+    typed, invalid = {}, []
+    for name, value in properties.items():
+        prop = current.get(name)
+        try:
+            if prop is None:
+                typed[name] = value
+            elif prop.is_a('IfcPhysicalSimpleQuantity'):
+                typed[name] = parse_value(value, prop.attribute_type(3))
+            elif prop.is_a('IfcPropertySingleValue') and prop.NominalValue is not None:
+                value_type = prop.NominalValue.attribute_type(0)
+                typed[name] = parse_value(value, value_type)
+                if value_type == 'LOGICAL':
+                    # edit_pset casts logicals to text, so the value is passed as an entity
+                    typed[name] = model.create_entity(prop.NominalValue.is_a(), typed[name])
+            else:
+                typed[name] = value
+        except ValueError:
+            invalid.append(name)
+    return typed, invalid
+
+
+def own_definition(model, definition, elements):
+    """
+    Returns a property set only related to elements. A set shared with other elements (or an
+    element type) is copied and the elements are moved over to the copy, so editing it leaves the
+    others unchanged. Other sets attached together with it in an IfcPropertySetDefinitionSet stay
+    attached to the elements.
+    """
+    rels = [rel for rel in model.get_inverse(definition) if rel.is_a('IfcRelDefinesByProperties')]
+    users = {related for rel in rels for related in rel.RelatedObjects}
+    used_by_types = any(not inverse.is_a('IfcRelDefinesByProperties') for inverse in model.get_inverse(definition))
+    copy = definition
+    if users != set(elements) or used_by_types:
+        copy = ifcopenshell.util.element.copy(model, definition)
+        moved = set(elements)
+        for rel in rels:
+            moving = [related for related in rel.RelatedObjects if related in moved]
+            if not moving:
+                continue
+            remaining = [related for related in rel.RelatedObjects if related not in moved]
+            owner_history = rel.OwnerHistory
+            others = [other for other in property_definitions(rel) if other != definition]
+            if remaining:
+                rel.RelatedObjects = remaining
+            else:
+                model.remove(rel)
+            for other in others:
+                model.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), owner_history, None, None, moving, other)
+        model.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), copy.OwnerHistory, None, None, list(elements), copy)
+    if copy.is_a('IfcElementQuantity'):
+        # edit_qto changes quantities in place, quantities shared with other sets are copied first
+        copy.Quantities = [ifcopenshell.util.element.copy(model, quantity) if model.get_total_inverses(quantity) > 1 else quantity
+                           for quantity in copy.Quantities]
+    return copy
+
+
+def write_changes(ifc_path, element_changes, output_path=None):
+    """
+    Applies {guid: {pset: {property: value}}} to one model and writes it once.
+    Returns (edited, missing, rejected) with rejected as [(guid, pset, property, value)] of cell
+    texts that do not fit the type of the existing property; those are not written.
+    """
+    model = ifcopenshell.open(ifc_path)
+    # GUID and property set lookups are built once for the whole file
+    by_guid = {entity.GlobalId: entity for entity in model.by_type('IfcRoot')}
+    elements = {guid: by_guid.get(guid) for guid in element_changes}
+    wanted = {element.id() for element in elements.values() if element is not None}
+    definitions = {}  # (element id, pset name) -> IfcPropertySet / IfcElementQuantity of the occurrence
+    for rel in model.by_type('IfcRelDefinesByProperties'):
+        for definition in property_definitions(rel):
+            if not definition.is_a('IfcPropertySetDefinition'):
+                continue
+            for related in rel.RelatedObjects:
+                if related.id() in wanted:
+                    definitions[(related.id(), definition.Name)] = definition
+
+    missing = [guid for guid, element in elements.items() if element is None]
+    rejected = []
+    new_psets = {}  # (pset name, properties) -> elements, so equal new psets are shared
+    edits = {}  # existing set -> {properties: elements}, elements getting the same values keep sharing a set
+    edited = 0
+    for guid, pset_changes in element_changes.items():
+        element = elements[guid]
+        if element is None:
+            continue
+        for pset_name, properties in pset_changes.items():
+            definition = definitions.get((element.id(), pset_name))
+            if definition is None:
+                new_psets.setdefault((pset_name, tuple(sorted(properties.items()))), []).append(element)
+                continue
+            typed, invalid = typed_properties(model, definition, properties)
+            rejected.extend((guid, pset_name, name, properties[name]) for name in invalid)
+            if typed:
+                key = tuple(sorted(typed.items(), key=lambda item: item[0]))
+                edits.setdefault(definition, {}).setdefault(key, []).append(element)
+        edited += 1
+
+    for definition, groups in edits.items():
+        for properties, group in groups.items():
+            target = own_definition(model, definition, group)
+            if target.is_a('IfcElementQuantity'):
+                ifcopenshell.api.run('pset.edit_qto', model, qto=target, properties=dict(properties))
+            else:
+                # All properties of the set in one call
+                ifcopenshell.api.run('pset.edit_pset', model, pset=target, properties=dict(properties))
+
+    for (pset_name, properties), group in new_psets.items():
+        assign_properties(model, group, pset_name, {name: [value] * len(group) for name, value in properties})
+
+    model.write(output_path or ifc_path)
+    return edited, missing, rejected
+
+
+def resolve_file_paths(data, json_file):
+    """Absolute IFC path (or None) per file key of data, every file key is looked up once."""
+    paths = [resolve_ifc_path(file_key, json_file) for file_key in data.file_keys]
+    return [None if path is None else os.path.abspath(path) for path in paths]
+
+
+def write_back(json_file, data, processes=None, paths=None):
+    """
+    Writes all edits in data back to the IFC files listed as file keys.
+    Returns {path: (edited, missing, rejected)}, see write_changes.
+    """
+    if paths is None:
+        paths = resolve_file_paths(data, json_file)
+    key_paths = dict(zip(data.file_keys, paths))
+    # File keys naming the same file are merged, so every file is opened and written by one worker
+    changes_per_path = {}
+    for file_key, element_changes in collect_changes(data).items():
+        path = key_paths[file_key]
+        if path is None:
+            print(f"IFC file for '{file_key}' not found, skipping {len(element_changes)} elements.")
+            continue
+        merged = changes_per_path.setdefault(path, {})
+        for guid, pset_changes in element_changes.items():
+            for pset_name, properties in pset_changes.items():
+                merged.setdefault(guid, {}).setdefault(pset_name, {}).update(properties)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {path: executor.submit(write_changes, path, changes) for path, changes in changes_per_path.items()}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+                edited, missing, rejected = results[path]
+                print(f"{path}: {edited} elements updated, {len(missing)} GUIDs not found.")
+                for guid, pset_name, prop_name, value in rejected:
+                    print(f"  {guid}: '{value}' does not fit the type of {pset_name}.{prop_name}, not written.")
+            except Exception as e:
+                print(f"Failed to write {path}: {e}")
+    return results
+
+
+def clear_saved_edits(data, paths, results):
+    """Returns data.edited without the cells written to a file. Rejected cells stay edited."""
+    row_paths = np.asarray(paths, dtype=object)[data.file_index]
+    saved = np.array([path in results for path in paths], dtype=bool)[data.file_index]
+    remaining = {}
+    for column_name, edited in data.edited.items():
+        pset_name, prop_name = split_column_name(column_name)
+        edited = edited & ~saved
+        for path, (_, _, rejected) in results.items():
+            for guid, rejected_pset, rejected_prop, _ in rejected:
+                if (rejected_pset, rejected_prop) == (pset_name, prop_name):
+                    edited[(row_paths == path) & (data.guids == guid)] = True
+        if edited.any():
+            remaining[column_name] = edited
+    return remaining
+
+
+class EntityTableModel(QAbstractTableModel):
+    """Table model over ColumnarData. Check boxes are a bool array, not widgets."""
+
+    def __init__(self, data, parent=None):
+        super().__init__(parent)
+        self.columns = data
+        self.selected = np.zeros(len(data), dtype=bool)
+        self.property_names = list(data.properties)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(FIXED_COLUMNS) + len(self.property_names)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return (FIXED_COLUMNS + self.property_names)[section]
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        row, column = index.row(), index.column()
+        if column == 0:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.selected[row] else Qt.Unchecked
+            return None
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        if column == 1:
+            return self.columns.guids[row]
+        if column == 2:
+            return self.columns.names[row]
+        value = self.columns.properties[self.property_names[column - len(FIXED_COLUMNS)]][row]
+        return '' if value is None else str(value)
+
+    def flags(self, index):
+        if index.column() == 0:
+            return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+        if index.column() >= len(FIXED_COLUMNS):
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        row, column = index.row(), index.column()
+        if column == 0 and role == Qt.CheckStateRole:
+            self.selected[row] = value == Qt.Checked
+        elif column >= len(FIXED_COLUMNS) and role == Qt.EditRole:
+            self.columns.set_values([row], self.property_names[column - len(FIXED_COLUMNS)], value)
+        else:
+            return False
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def set_selected(self, rows, checked=True):
+        self.selected[rows] = checked
+        self.dataChanged.emit(self.index(0, 0), self.index(len(self.columns) - 1, 0), [Qt.CheckStateRole])
+
+    def selected_rows(self):
+        return np.flatnonzero(self.selected)
+
+    def set_property(self, rows, prop_name, value):
+        # One bulk assignment and one change notification for all rows
+        if prop_name not in self.property_names:
+            column = len(FIXED_COLUMNS) + len(self.property_names)
+            self.beginInsertColumns(QModelIndex(), column, column)
+            self.columns.add_column(prop_name)
+            self.property_names.append(prop_name)
+            self.endInsertColumns()
+        self.columns.set_values(rows, prop_name, value)
+        column = len(FIXED_COLUMNS) + self.property_names.index(prop_name)
+        self.dataChanged.emit(self.index(0, column), self.index(len(self.columns) - 1, column), [Qt.DisplayRole])
+
+
 class DataEditor(QWidget):
     def __init__(self, json_file):
         super().__init__()
         self.json_file = json_file
-        self.data = self.load_data()
-        self.property_columns = {}
+        self.data = load_data(json_file)
         self.initUI()
 
     def initUI(self):
@@ -24,83 +463,67 @@ class DataEditor(QWidget):
         self.prop_value_input = QLineEdit()
         self.apply_button = QPushButton('Apply to Selected')
         self.apply_button.clicked.connect(self.apply_properties)
+        self.select_button = QPushButton('Check Highlighted')
+        self.select_button.clicked.connect(self.check_highlighted)
 
         prop_layout.addWidget(QLabel('Property Name:'))
         prop_layout.addWidget(self.prop_name_input)
         prop_layout.addWidget(QLabel('Property Value:'))
         prop_layout.addWidget(self.prop_value_input)
         prop_layout.addWidget(self.apply_button)
+        prop_layout.addWidget(self.select_button)
 
         layout.addLayout(prop_layout)
 
-        # Table for data display and editing
-        self.table = QTableWidget()
-        self.table.setColumnCount(3)  # Start with three columns for 'Select', 'GUID', and 'Name'
-        self.table.setHorizontalHeaderLabels(['Select', 'GUID', 'Name'])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Table for data display and editing, rows are only rendered when visible
+        self.model = EntityTableModel(self.data, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         layout.addWidget(self.table)
 
+        self.status_label = QLabel(f'{len(self.data)} elements from {len(self.data.file_keys)} files')
+        layout.addWidget(self.status_label)
+
         # Save button
         save_button = QPushButton('Save Changes')
         save_button.clicked.connect(self.save_changes)
         layout.addWidget(save_button)
 
         self.setLayout(layout)
-        self.populate_table()
-
-    def load_data(self):
-        with open(self.json_file, 'r') as file:
-            data = json.load(file)
-        return data
 
-    def populate_table(self):
-        row_count = sum(len(items) for items in self.data.values())
-        self.table.setRowCount(row_count)
-        row_idx = 0
-        for file_key, entries in self.data.items():
-            for entry in entries:
-                chk_box = QCheckBox()
-                self.table.setCellWidget(row_idx, 0, chk_box)
-
-                guid_str = str(entry.get('guid', '')) if entry.get('guid') is not None else ''
-                self.table.setItem(row_idx, 1, QTableWidgetItem(guid_str))
-                
-                name_str = str(entry.get('name', '')) if entry.get('name') is not None else ''
-                self.table.setItem(row_idx, 2, QTableWidgetItem(name_str))
-
-                # Skip last column which seems to be unnecessary based on your requirement
-                for i, (prop_name, prop_value) in enumerate(entry['properties'].items()):
-                    if i < len(entry['properties']) - 1:  # Skip last column
-                        col_idx = 3 + i
-                        while col_idx >= self.table.columnCount():
-                            self.table.insertColumn(self.table.columnCount())
-                        self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(prop_value)))
-                        self.property_columns[prop_name] = col_idx
-                row_idx += 1
+    def check_highlighted(self):
+        rows = [index.row() for index in self.table.selectionModel().selectedRows()]
+        self.model.set_selected(rows, True)
 
     def apply_properties(self):
         prop_name = self.prop_name_input.text().strip()
         prop_value = self.prop_value_input.text().strip()
         if prop_name and prop_value:
-            if prop_name not in self.property_columns:
-                col_idx = self.table.columnCount()
-                self.property_columns[prop_name] = col_idx
-                self.table.insertColumn(col_idx)
-                self.table.setHorizontalHeaderLabels(self.table.horizontalHeaderLabels() + [prop_name])
-            else:
-                col_idx = self.property_columns[prop_name]
-            for row in range(self.table.rowCount()):
-                if self.table.cellWidget(row, 0).isChecked():
-                    self.table.setItem(row, col_idx, QTableWidgetItem(prop_value))
+            rows = self.model.selected_rows()
+            self.model.set_property(rows, prop_name, prop_value)
+            self.status_label.setText(f'{prop_name} set on {len(rows)} elements')
 
     def save_changes(self):
-        # Logic to save changes back to files
-        pass
+        if not self.data.edited:
+            self.status_label.setText('No changes to save')
+            return
+        paths = resolve_file_paths(self.data, self.json_file)
+        results = write_back(self.json_file, self.data, paths=paths)
+        self.data.edited = clear_saved_edits(self.data, paths, results)
+        rejected = sum(len(cells) for _, _, cells in results.values())
+        message = f'Saved changes to {len(results)} files'
+        if rejected:
+            message += f', {rejected} values do not fit the property type and were not saved'
+        self.status_label.setText(message)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     data_folder = r"C:\Users\LouisTrümpler\Dropbox\01_Projekte\2309 Pi\240423_Excel Attribut export test\240423_Excel Attribut export test\combined_data.json" # replace with your actual data folder path
+    if len(sys.argv) > 1:
+        data_folder = sys.argv[1]
     ex = DataEditor(data_folder)
     ex.show()
     sys.exit(app.exec_())
@@ -1,21 +1,30 @@
 import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.guid
 from ifcopenshell import geom
-import math
+from instancing import ShapeLibrary
+from mesh_quantities import geometry_quantities
 
-# Function to create a basic shape and apply transformations
-def create_transformed_shape(settings, file, shape, scale, rotation, translation):
-    # Create a cube with transformations
-    matrix = ifcopenshell.geom.utils.scale(scale, scale, scale)
-    matrix = ifcopenshell.geom.utils.rotate(matrix, (1, 0, 0), math.radians(rotation[0]))
-    matrix = ifcopenshell.geom.utils.rotate(matrix, (0, 1, 0), math.radians(rotation[1]))
-    matrix = ifcopenshell.geom.utils.rotate(matrix, (0, 0, 1), math.radians(rotation[2]))
-    matrix = ifcopenshell.geom.utils.translate(matrix, translation[0], translation[1], translation[2])
-    return ifcopenshell.geom.create_shape(settings, shape).transform(matrix)
+# Function to place a copy of a shape with transformations
+def create_transformed_shape(file, library, storey, key, scale, rotation, translation):
+    # The cube geometry is stored once; the copy only carries a transformation operator
+    element = file.createIfcBuildingElementProxy(ifcopenshell.guid.new(), None, f"Copy of {key}", None, None,
+                                                 storey.ObjectPlacement, None, None, None)
+    element.Representation = library.instance(key, translation=translation, scale=scale, rotation=rotation)
+    return element
 
 # Initialize a new IFC project
 
-file = ifcopenshell.file()
-project = file.createIfcProject()
+file = ifcopenshell.api.run("project.create_file", version="IFC4")
+project = ifcopenshell.api.run("root.create_entity", file, ifc_class="IfcProject", name="Parametric Geometry")
+ifcopenshell.api.run("unit.assign_unit", file, length={"is_metric": True, "raw": "METERS"})
+model_context = ifcopenshell.api.run("context.add_context", file, context_type="Model")
+body = ifcopenshell.api.run("context.add_context", file, context_type="Model", context_identifier="Body", target_view="MODEL_VIEW", parent=model_context)
+site = ifcopenshell.api.run("root.create_entity", file, ifc_class="IfcSite", name="Site")
+storey = ifcopenshell.api.run("root.create_entity", file, ifc_class="IfcBuildingStorey", name="Storey")
+ifcopenshell.api.run("aggregate.assign_object", file, products=[site], relating_object=project)
+ifcopenshell.api.run("aggregate.assign_object", file, products=[storey], relating_object=site)
+ifcopenshell.api.run("geometry.edit_object_placement", file, product=storey)
 
 # Create a basic cube
 def create_cube(file, width, height, depth):
@@ -38,32 +47,41 @@ def create_cube(file, width, height, depth):
     face_indices = [(0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7), (4, 5, 6, 7), (0, 3, 2, 1)]
     face_list = [file.createIfcFace([file.createIfcFaceOuterBound(
         file.createIfcPolyLoop([point_list[index] for index in face]), True)]) for face in face_indices]
-    shell = file.createIfcShellBasedSurfaceModel([file.createIfcOpenShell(face_list)])
-    return file.createIfcShapeRepresentation(shell)
+    return [file.createIfcShellBasedSurfaceModel([file.createIfcOpenShell(face_list)])]
 
 
 
 # Settings for geometry creation
 settings = ifcopenshell.geom.settings()
+settings.set("use-world-coords", True)
 
-
+# Shapes are stored once as representation maps and instanced per copy
+library = ShapeLibrary(file, body)
 
 # Parameters for generation
 num_copies = 10
 scale_factor = 1.1
 rotation_step = 15
 
-original_shape = create_cube(file, 1, 1, 1)
+library.add_shape("cube", create_cube(file, 1, 1, 1), "SurfaceModel")
 
 # Generate and transform copies of the cube
+copies = []
 for i in range(num_copies):
     scale = scale_factor ** i
     rotation = [rotation_step * i, rotation_step * i, rotation_step * i]
     translation = [i * 2, i * 2, 0]
-    create_transformed_shape(settings, file, original_shape, scale, rotation, translation)
+    copies.append(create_transformed_shape(file, library, storey, "cube", scale, rotation, translation))
+
+ifcopenshell.api.run("spatial.assign_container", file, products=copies, relating_structure=storey)
+
+# Measure the tessellated copies
+for i, element in enumerate(copies):
+    shape = ifcopenshell.geom.create_shape(settings, element)
+    quantities = geometry_quantities(shape.geometry)
+    print(f"Copy {i}: surface area {quantities['SurfaceArea']:.3f}, closed: {quantities['Closed']}")
 
 # Write to an IFC file
 filename = "parametric_geometry.ifc"
-with open(filename, "wb") as f:
-    f.write(file.to_string())
+file.write(filename)
 print(f"IFC file saved as {filename}")
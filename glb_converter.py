@@ -0,0 +1,264 @@
+import gzip
+import json
+import multiprocessing
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import ifcopenshell
+import ifcopenshell.geom
+
+from tessellation_cache import TessellationCache, material_colours, world_vertices
+
+# IFC -> GLB without Blender. Every file is tessellated by the geometry iterator in its own
+# worker process, triangles are merged into one primitive per material colour, and the GLB is
+# written straight from the NumPy buffers.
+
+DEFAULT_COLOUR = (0.8, 0.8, 0.8, 1.0)
+SKIPPED_CLASSES = ("IfcOpeningElement", "IfcSpace")
+GLB_MAGIC = 0x46546C67  # "glTF"
+JSON_CHUNK = 0x4E4F534A
+BIN_CHUNK = 0x004E4942
+
+# Export options. LOD_LEVELS are vertex clustering cell sizes relative to the model's bounding box
+# diagonal; level 0 is the full mesh, every further level is written as <name>_lod<n>.glb.
+LOD_LEVELS = (0.0, 0.005, 0.02)
+QUANTIZE = True  # 16 bit positions and indices (KHR_mesh_quantization)
+COMPRESS = False  # additionally write <name>.glb.gz for servers that send it with Content-Encoding: gzip
+
+# glTF is Y-up, IFC is Z-up: (x, y, z) -> (x, z, -y)
+Z_UP_TO_Y_UP = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, -1.0, 0.0]])
+
+
+class MeshBuckets:
+    """Collects triangles per material colour and merges them into one mesh per colour."""
+
+    def __init__(self):
+        self.buckets = {}  # rgba -> ([vertex arrays], [face arrays], vertex count)
+
+    def add(self, verts, faces, material_ids, colours):
+        verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        material_ids = np.asarray(material_ids, dtype=np.int64)
+        if not len(faces):
+            return
+        if len(material_ids) != len(faces):
+            material_ids = np.full(len(faces), -1)
+        for material_id in np.unique(material_ids).tolist():
+            colour = tuple(round(float(c), 4) for c in colours[material_id]) if 0 <= material_id < len(colours) else DEFAULT_COLOUR
+            material_faces = faces[material_ids == material_id]
+            # Keep only the vertices this material uses
+            used, remapped = np.unique(material_faces, return_inverse=True)
+            vertex_arrays, face_arrays, count = self.buckets.get(colour, ([], [], 0))
+            vertex_arrays.append(verts[used])
+            face_arrays.append(remapped.reshape(-1, 3) + count)
+            self.buckets[colour] = (vertex_arrays, face_arrays, count + len(used))
+
+    def meshes(self):
+        """Returns [(rgba, vertices, faces)] with Y-up float32 vertices and uint32 faces."""
+        meshes = []
+        for colour, (vertex_arrays, face_arrays, _) in self.buckets.items():
+            vertices = (np.concatenate(vertex_arrays) @ Z_UP_TO_Y_UP.T).astype(np.float32)
+            faces = np.concatenate(face_arrays).astype(np.uint32)
+            meshes.append((colour, vertices, faces))
+        return meshes
+
+
+def cluster_vertices(vertices, faces, cell_size):
+    """
+    Simplifies a mesh by vertex clustering: all vertices in a grid cell are merged into their mean,
+    then collapsed and duplicate triangles are dropped.
+    """
+    if cell_size <= 0 or not len(faces):
+        return vertices, faces
+    cells = np.floor(vertices / cell_size).astype(np.int64)
+    _, cluster, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+    clustered = np.zeros((len(counts), 3))
+    np.add.at(clustered, cluster, vertices)
+    clustered /= counts[:, None]
+
+    faces = cluster[faces]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+    # Drop triangles that now cover the same three vertices, keeping their winding
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    faces = faces[np.sort(first)]
+    used, remapped = np.unique(faces, return_inverse=True)
+    return clustered[used].astype(np.float32), remapped.reshape(-1, 3).astype(np.uint32)
+
+
+def level_of_detail(meshes, relative_cell_size):
+    """Returns a simplified copy of [(rgba, vertices, faces)]; cell size relative to the bounding box diagonal."""
+    if relative_cell_size <= 0 or not meshes:
+        return meshes
+    all_vertices = np.concatenate([vertices for _, vertices, _ in meshes])
+    diagonal = np.linalg.norm(all_vertices.max(axis=0) - all_vertices.min(axis=0))
+    simplified = []
+    for colour, vertices, faces in meshes:
+        vertices, faces = cluster_vertices(vertices, faces, relative_cell_size * diagonal)
+        if len(faces):
+            simplified.append((colour, vertices, faces))
+    return simplified
+
+
+def collect_meshes(model, threads=1, cache=None):
+    buckets = MeshBuckets()
+    if cache is not None:
+        for element, verts, faces, material_ids, matrix in cache.shapes(model, threads=threads):
+            if element.is_a() in SKIPPED_CLASSES:
+                continue
+            buckets.add(world_vertices(verts, matrix), faces, material_ids, cache.colours(cache.key(model, element)))
+        return buckets.meshes()
+
+    settings = ifcopenshell.geom.settings()
+    settings.set("use-world-coords", True)
+    iterator = ifcopenshell.geom.iterator(settings, model, threads)
+    if iterator.initialize():
+        while True:
+            shape = iterator.get()
+            geometry = shape.geometry
+            if shape.type not in SKIPPED_CLASSES:
+                buckets.add(geometry.verts, geometry.faces, geometry.material_ids, material_colours(geometry))
+            if not iterator.next():
+                break
+    return buckets.meshes()
+
+
+def write_glb(meshes, output_path, quantize=False, compress=False):
+    """
+    Writes [(rgba, vertices, faces)] as a binary glTF with one primitive per material.
+
+    quantize stores positions as unsigned 16 bit integers inside the model's bounding box
+    (KHR_mesh_quantization, dequantized by the node transform) and uses 16 bit indices where
+    possible. compress additionally writes a gzipped copy next to the file.
+    """
+    gltf = {
+        "asset": {"version": "2.0", "generator": "PythonForIFC glb_converter"},
+        "scene": 0, "scenes": [{"nodes": [0]}], "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": []}], "materials": [], "accessors": [], "bufferViews": [], "buffers": [],
+    }
+    binary = bytearray()
+
+    def add_view(data, target, stride=None):
+        while len(binary) % 4:
+            binary.append(0)
+        view = {"buffer": 0, "byteOffset": len(binary), "byteLength": len(data), "target": target}
+        if stride:
+            view["byteStride"] = stride
+        gltf["bufferViews"].append(view)
+        binary.extend(data)
+        return len(gltf["bufferViews"]) - 1
+
+    if quantize and meshes:
+        all_vertices = np.concatenate([vertices for _, vertices, _ in meshes])
+        offset = all_vertices.min(axis=0).astype(np.float64)
+        step = np.maximum(all_vertices.max(axis=0) - offset, 1e-9) / 65535.0
+        gltf["nodes"][0]["translation"] = offset.tolist()
+        gltf["nodes"][0]["scale"] = step.tolist()
+        gltf["extensionsUsed"] = gltf["extensionsRequired"] = ["KHR_mesh_quantization"]
+
+    for colour, vertices, faces in meshes:
+        if not len(faces):
+            continue
+        if quantize:
+            # Padded to 4 components, vertex attributes must be aligned to 4 bytes
+            quantized = np.zeros((len(vertices), 4), dtype=np.uint16)
+            quantized[:, :3] = np.round((vertices - offset) / step)
+            position_view = add_view(quantized.tobytes(), 34962, stride=8)
+            gltf["accessors"].append({"bufferView": position_view, "componentType": 5123, "count": len(vertices), "type": "VEC3",
+                                      "min": quantized[:, :3].min(axis=0).tolist(), "max": quantized[:, :3].max(axis=0).tolist()})
+        else:
+            position_view = add_view(vertices.tobytes(), 34962)
+            gltf["accessors"].append({"bufferView": position_view, "componentType": 5126, "count": len(vertices), "type": "VEC3",
+                                      "min": vertices.min(axis=0).tolist(), "max": vertices.max(axis=0).tolist()})
+        if quantize and len(vertices) <= 65535:
+            index_view = add_view(faces.astype(np.uint16).tobytes(), 34963)
+            gltf["accessors"].append({"bufferView": index_view, "componentType": 5123, "count": faces.size, "type": "SCALAR"})
+        else:
+            index_view = add_view(faces.tobytes(), 34963)
+            gltf["accessors"].append({"bufferView": index_view, "componentType": 5125, "count": faces.size, "type": "SCALAR"})
+        material = {"pbrMetallicRoughness": {"baseColorFactor": list(colour), "metallicFactor": 0.0, "roughnessFactor": 1.0},
+                    "doubleSided": True}
+        if colour[3] < 1.0:
+            material["alphaMode"] = "BLEND"
+        gltf["materials"].append(material)
+        gltf["meshes"][0]["primitives"].append({"attributes": {"POSITION": len(gltf["accessors"]) - 2},
+                                                "indices": len(gltf["accessors"]) - 1,
+                                                "material": len(gltf["materials"]) - 1})
+
+    while len(binary) % 4:
+        binary.append(0)
+    gltf["buffers"].append({"byteLength": len(binary)})
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+
+    with open(output_path, "wb") as output:
+        output.write(struct.pack("<III", GLB_MAGIC, 2, 12 + 8 + len(json_chunk) + 8 + len(binary)))
+        output.write(struct.pack("<II", len(json_chunk), JSON_CHUNK))
+        output.write(json_chunk)
+        output.write(struct.pack("<II", len(binary), BIN_CHUNK))
+        output.write(binary)
+
+    if compress:
+        with open(output_path, "rb") as source, gzip.open(output_path + ".gz", "wb", compresslevel=9) as target:
+            target.write(source.read())
+
+
+def lod_path(glb_path, level):
+    return glb_path if level == 0 else f"{os.path.splitext(glb_path)[0]}_lod{level}.glb"
+
+
+def convert_file(ifc_path, glb_path, threads=1, cache_directory=None, lod_levels=LOD_LEVELS, quantize=QUANTIZE, compress=COMPRESS):
+    """Converts one IFC file, writing every level of detail from a single tessellation. Runs in its own worker process."""
+    model = ifcopenshell.open(ifc_path)
+    cache = TessellationCache(cache_directory) if cache_directory else None
+    meshes = collect_meshes(model, threads, cache)
+    for level, relative_cell_size in enumerate(lod_levels):
+        write_glb(level_of_detail(meshes, relative_cell_size), lod_path(glb_path, level), quantize, compress)
+    return glb_path, sum(len(faces) for _, _, faces in meshes), len(meshes)
+
+
+def load_filenames_from_txt(file_path):
+    """Load filenames (without extension, e.g. FHG.001) from a text file like nr.txt."""
+    with open(file_path, 'r') as file:
+        return {line.strip() for line in file if line.strip()}
+
+
+def convert_folder(input_folder, output_folder, processes=None, names_file=None, cache_directory=None):
+    """Converts every .ifc file in a folder (optionally only those listed in names_file) in parallel."""
+    os.makedirs(output_folder, exist_ok=True)
+    names = load_filenames_from_txt(names_file) if names_file else None
+    jobs = []
+    for filename in sorted(os.listdir(input_folder)):
+        name, extension = os.path.splitext(filename)
+        if extension.lower() != ".ifc" or (names is not None and name not in names):
+            continue
+        jobs.append((os.path.join(input_folder, filename), os.path.join(output_folder, name + ".glb")))
+
+    processes = processes or multiprocessing.cpu_count()
+    converted = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(convert_file, ifc_path, glb_path, 1, cache_directory): ifc_path for ifc_path, glb_path in jobs}
+        for future in as_completed(futures):
+            try:
+                glb_path, triangles, materials = future.result()
+                converted += 1
+                print(f"Saved {glb_path} ({triangles} triangles, {materials} materials)")
+            except Exception as e:
+                print(f"Failed to convert {futures[future]}: {e}")
+
+    print(f"{converted} of {len(jobs)} files have been processed and saved as .glb files.")
+    return converted
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python glb_converter.py <input folder | file.ifc> <output folder | file.glb> [nr.txt] [cache directory]")
+        sys.exit(1)
+    if os.path.isdir(sys.argv[1]):
+        convert_folder(sys.argv[1], sys.argv[2], names_file=sys.argv[3] if len(sys.argv) > 3 else None,
+                       cache_directory=sys.argv[4] if len(sys.argv) > 4 else None)
+    else:
+        print(f"Saved {convert_file(sys.argv[1], sys.argv[2], multiprocessing.cpu_count())[0]}")
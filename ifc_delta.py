@@ -0,0 +1,129 @@
+import os
+import shutil
+import sys
+from step_stream import iter_records
+
+# Delta patches record only the entities a script touched, so small edits to very large
+# models don't have to rewrite the whole file through ifcopenshell.write.
+#
+# Patch file layout (one operation per line, sorted by offset in the source file):
+#   IFCDELTA 1 <source size in bytes> <source file name>
+#   M <start> <end> #12=IFCSPACE(...);   replace the record at [start, end)
+#   R <start> <end>                      remove the record at [start, end)
+#   A <offset> <offset> #901=IFCZONE(...);  insert a new record before the DATA section's ENDSEC
+PATCH_VERSION = "1"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def track_changes(ifc_file):
+    """Starts recording edits on a freshly opened model. Call before making any changes."""
+    ifc_file.begin_transaction()
+
+
+def collect_changes(ifc_file):
+    """Returns (modified, added, removed) entity ids from the recorded transaction."""
+    modified, created, deleted = set(), set(), set()
+    for operation in ifc_file.transaction.operations:
+        action = operation["action"]
+        if action == "edit":
+            modified.add(operation["id"])
+        elif action == "create":
+            created.add(operation["value"]["id"])
+        elif action == "delete":
+            deleted.add(operation["value"]["id"])
+        # Removing an entity also rewrites every entity that referenced it
+        if action in ("delete", "batch_delete"):
+            modified.update(operation["inverses"])
+    ifc_file.end_transaction()
+
+    added = {entity_id for entity_id in created if entity_id not in deleted}
+    removed = deleted - created
+    modified = modified - created - deleted
+    return modified, added, removed
+
+
+def write_patch(ifc_file, source_path, patch_path):
+    """Writes the tracked changes of ifc_file as a delta against the file it was opened from."""
+    modified, added, removed = collect_changes(ifc_file)
+    operations = []
+    data_end = None
+    in_data = False
+
+    # One read-only pass over the source to find the byte ranges of the touched records
+    for record in iter_records(source_path):
+        if record.id is None:
+            if record.type == "DATA":
+                in_data = True
+            elif record.type == "ENDSEC" and in_data:
+                data_end = record.end - len(record.raw.lstrip())
+                in_data = False
+            continue
+        if record.id in modified:
+            start = record.end - len(record.raw.lstrip())
+            operations.append(("M", start, record.end, ifc_file.by_id(record.id).to_string() + ";"))
+        elif record.id in removed:
+            operations.append(("R", record.start, record.end, None))
+
+    if data_end is None:
+        raise ValueError(f"No DATA section found in {source_path}")
+    for entity_id in sorted(added):
+        operations.append(("A", data_end, data_end, ifc_file.by_id(entity_id).to_string() + ";"))
+
+    operations.sort(key=lambda operation: operation[1])
+    with open(patch_path, 'w', encoding='utf-8') as patch:
+        patch.write(f"IFCDELTA {PATCH_VERSION} {os.path.getsize(source_path)} {os.path.basename(source_path)}\n")
+        for action, start, end, text in operations:
+            patch.write(f"{action} {start} {end} {text}\n" if text is not None else f"{action} {start} {end}\n")
+
+    print(f"Patch saved as: {patch_path} ({len(modified)} modified, {len(added)} added, {len(removed)} removed)")
+    return len(operations)
+
+
+def read_patch(patch_path):
+    with open(patch_path, 'r', encoding='utf-8') as patch:
+        header = patch.readline().split(" ", 3)
+        if header[0] != "IFCDELTA" or header[1] != PATCH_VERSION:
+            raise ValueError(f"{patch_path} is not an IFC delta patch")
+        operations = []
+        for line in patch:
+            parts = line.rstrip("\n").split(" ", 3)
+            text = parts[3].encode('utf-8') if len(parts) > 3 else None
+            operations.append((parts[0], int(parts[1]), int(parts[2]), text))
+    return int(header[2]), operations
+
+
+def copy_range(source, target, length):
+    while length > 0:
+        chunk = source.read(min(COPY_CHUNK_SIZE, length))
+        if not chunk:
+            break
+        target.write(chunk)
+        length -= len(chunk)
+
+
+def apply_patch(source_path, patch_path, output_path):
+    """Splices a delta patch into its source file, copying the untouched byte ranges as they are."""
+    source_size, operations = read_patch(patch_path)
+    if os.path.getsize(source_path) != source_size:
+        raise ValueError(f"{patch_path} was made for a {source_size} byte file, but {source_path} has {os.path.getsize(source_path)} bytes")
+
+    with open(source_path, 'rb') as source, open(output_path, 'wb') as output:
+        position = 0
+        for action, start, end, text in operations:
+            copy_range(source, output, start - position)
+            if action == "M":
+                output.write(text)
+            elif action == "A":
+                output.write(text + b"\n")
+            source.seek(end)
+            position = end
+        shutil.copyfileobj(source, output, COPY_CHUNK_SIZE)
+
+    print(f"Patched IFC file saved as: {output_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python ifc_delta.py <source.ifc> <patch.ifcdelta> <output.ifc>")
+        sys.exit(1)
+    apply_patch(sys.argv[1], sys.argv[2], sys.argv[3])
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import ifcopenshell.ifcopenshell_wrapper as wrapper
+
+from step_stream import iter_records, record_params, split_attributes
+
+# Streaming semantic diff between two versions of a model, keyed by GlobalId.
+#
+# Each file is indexed in one streaming pass (entity id -> byte range, kept in NumPy arrays),
+# then every rooted entity gets a digest per attribute. References to other rooted entities are
+# compared by GlobalId, references to anything else by the digest of the referenced sub-graph,
+# and property sets attached through IfcRelDefinesByProperties are folded into the element as
+# "<Pset>.<Property>" attributes. Only digests are kept in memory; values are re-read from disk
+# for the entities that actually changed.
+
+schema_regex = re.compile(r"'([A-Za-z0-9_]+)'")
+float_regex = re.compile(rb'^[+-]?\d+\.\d*(E[+-]?\d+)?$', re.IGNORECASE)
+typed_value_regex = re.compile(rb'^([A-Za-z0-9_]+)\((.*)\)$', re.DOTALL)
+guid_regex = re.compile(rb"^'(.*)'$", re.DOTALL)
+
+
+def digest(*parts):
+    return hashlib.blake2b(b"\x1f".join(parts), digest_size=8).digest()
+
+
+def load_schema(schema_name):
+    for name in (schema_name, schema_name + "_ADD2", "IFC4"):
+        try:
+            return wrapper.schema_by_name(name)
+        except Exception:
+            continue
+
+
+def index_model(file_path):
+    """First pass: entity id -> byte range of every record, sorted for binary search."""
+    ids, starts, ends = array('q'), array('q'), array('q')
+    schema_name = "IFC4"
+    for record in iter_records(file_path):
+        if record.id is None:
+            if record.type == "FILE_SCHEMA":
+                match = schema_regex.search(record.raw.decode('ascii', 'replace'))
+                if match:
+                    schema_name = match.group(1).upper()
+            continue
+        ids.append(record.id)
+        starts.append(record.start)
+        ends.append(record.end)
+
+    ids = np.frombuffer(ids, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    return {
+        "schema": schema_name,
+        "ids": ids[order],
+        "starts": np.frombuffer(starts, dtype=np.int64)[order],
+        "ends": np.frombuffer(ends, dtype=np.int64)[order],
+    }
+
+
+class ModelHasher:
+    def __init__(self, file_path, index):
+        self.file_path = file_path
+        self.ids = index["ids"]
+        self.starts = index["starts"]
+        self.ends = index["ends"]
+        self.schema = load_schema(index["schema"])
+        self.file = open(file_path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rooted_types = {}  # entity type -> attribute names, or None if not an IfcRoot
+        self.digests = {}  # non-rooted entity id -> digest of its sub-graph
+        self.guids = {}  # rooted entity id -> GlobalId
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def read(self, entity_id):
+        position = np.searchsorted(self.ids, entity_id)
+        if position >= len(self.ids) or self.ids[position] != entity_id:
+            return None
+        return int(self.starts[position]), self.data[int(self.starts[position]):int(self.ends[position])]
+
+    def attribute_names(self, entity_type):
+        if entity_type not in self.rooted_types:
+            names = None
+            try:
+                declaration = self.schema.declaration_by_name(entity_type)
+                entity = declaration
+                while entity is not None:
+                    if entity.name() == "IfcRoot":
+                        names = [attribute.name() for attribute in declaration.all_attributes()]
+                        break
+                    entity = entity.supertype()
+            except Exception:
+                pass
+            self.rooted_types[entity_type] = names
+        return self.rooted_types[entity_type]
+
+    def entity_type(self, raw):
+        return raw[raw.index(b"=") + 1:raw.index(b"(")].strip().upper().decode('ascii')
+
+    def reference_key(self, entity_id):
+        """Rooted entities are identified by GlobalId, everything else by its content."""
+        if entity_id in self.guids:
+            return b"G" + self.guids[entity_id]
+        if entity_id in self.digests:
+            return self.digests[entity_id]
+        found = self.read(entity_id)
+        if found is None:
+            return b"#missing"
+        raw = found[1]
+        entity_type = self.entity_type(raw)
+        attributes = split_attributes(record_params(raw))
+        if self.attribute_names(entity_type) is not None:
+            self.guids[entity_id] = guid_regex.match(attributes[0]).group(1)
+            return b"G" + self.guids[entity_id]
+        self.digests[entity_id] = b"#cycle"
+        key = digest(entity_type.encode('ascii'), *(self.canonical(value) for value in attributes))
+        self.digests[entity_id] = key
+        return key
+
+    def canonical(self, value):
+        if value.startswith(b"#"):
+            return self.reference_key(int(value[1:]))
+        if value.startswith(b"("):
+            return b"(" + b",".join(self.canonical(item) for item in split_attributes(value[1:-1]) if item) + b")"
+        if float_regex.match(value):
+            return repr(float(value)).encode('ascii')
+        match = typed_value_regex.match(value)
+        if match and not value.startswith(b"'"):
+            return match.group(1).upper() + b"(" + self.canonical(match.group(2)) + b")"
+        return value
+
+    def named_items(self, value):
+        """Expands a list of named, non-rooted entities (properties, quantities) into {name: id}."""
+        if not value.startswith(b"(#"):
+            return None
+        items = {}
+        for item in split_attributes(value[1:-1]):
+            if not item.startswith(b"#") or int(item[1:]) in self.guids:
+                return None
+            found = self.read(int(item[1:]))
+            if found is None:
+                continue
+            name = split_attributes(record_params(found[1]))[0]
+            match = guid_regex.match(name)
+            if not match:
+                return None
+            name = match.group(1).decode('utf-8', 'replace')
+            key, count = name, 1
+            while key in items:
+                count += 1
+                key = f"{name} #{count}"
+            items[key] = int(item[1:])
+        return items
+
+    def hash_entity(self, entity_id):
+        start, raw = self.read(entity_id)
+        entity_type = self.entity_type(raw)
+        names = self.attribute_names(entity_type)
+        attributes = split_attributes(record_params(raw))
+        result = {"type": entity_type, "name": None, "attributes": {}, "links": None}
+
+        for index, value in enumerate(attributes):
+            name = names[index] if index < len(names) else f"Attribute{index}"
+            if name == "GlobalId":
+                continue
+            if name == "Name":
+                match = guid_regex.match(value)
+                result["name"] = match.group(1).decode('utf-8', 'replace') if match else None
+            items = self.named_items(value) if name in ("HasProperties", "Quantities") else None
+            if items:
+                for item_name, item_id in items.items():
+                    found = self.read(item_id)
+                    result["attributes"][f"{name}[{item_name}]"] = (self.reference_key(item_id), found[0], -1)
+            else:
+                result["attributes"][name] = (self.canonical(value), start, index)
+
+        if entity_type == "IFCRELDEFINESBYPROPERTIES":
+            related = split_attributes(attributes[4][1:-1])
+            related_guids = [self.reference_key(int(item[1:]))[1:] for item in related if item.startswith(b"#")]
+            definition = self.reference_key(int(attributes[5][1:]))[1:] if attributes[5].startswith(b"#") else None
+            result["links"] = (related_guids, definition)
+        return result
+
+    def hash_all(self):
+        # Register every GlobalId first, so references to later records resolve to GlobalIds
+        rooted = []
+        for position, entity_id in enumerate(self.ids):
+            raw = self.data[int(self.starts[position]):int(self.ends[position])]
+            if self.attribute_names(self.entity_type(raw)) is not None:
+                self.guids[int(entity_id)] = guid_regex.match(split_attributes(record_params(raw))[0]).group(1)
+                rooted.append(int(entity_id))
+
+        entities = {}
+        for entity_id in rooted:
+            entities[self.guids[entity_id].decode('ascii')] = self.hash_entity(entity_id)
+        return entities
+
+
+def hash_model(file_path):
+    """Hashes one model. Runs in its own worker process."""
+    hasher = ModelHasher(file_path, index_model(file_path))
+    try:
+        entities = hasher.hash_all()
+    finally:
+        hasher.close()
+
+    # Fold property sets into the elements they are attached to
+    for entity in list(entities.values()):
+        if entity["links"] is None:
+            continue
+        related_guids, definition = entity["links"]
+        definition = entities.get(definition.decode('ascii')) if definition else None
+        if definition is None:
+            continue
+        for attribute, value in definition["attributes"].items():
+            if "[" not in attribute:
+                continue
+            property_name = attribute[attribute.index("[") + 1:-1]
+            for guid in related_guids:
+                element = entities.get(guid.decode('ascii'))
+                if element is not None:
+                    element["attributes"][f"{definition['name']}.{property_name}"] = value
+
+    # Keep only digests and the offsets needed to show values later
+    return {
+        guid: (entity["type"], entity["name"], digest(*sorted(name.encode('utf-8') + key for name, (key, _, _) in entity["attributes"].items())),
+               {name: (digest(key), start, index) for name, (key, start, index) in entity["attributes"].items()})
+        for guid, entity in entities.items()
+    }
+
+
+def describe(data, start, index):
+    """Re-reads an attribute value from disk: the attribute at index, or a property's value."""
+    end = data.find(b";", start)
+    while data[start:end].count(b"'") % 2:
+        end = data.find(b";", end + 1)
+    attributes = split_attributes(record_params(data[start:end + 1]))
+    if index >= 0:
+        return attributes[index].decode('utf-8', 'replace')
+    return ",".join(value.decode('utf-8', 'replace') for value in attributes[2:] if value != b"$")
+
+
+def diff_models(old_path, new_path, workers=2):
+    # Hash both files in parallel worker processes
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        old_entities, new_entities = executor.map(hash_model, [old_path, new_path])
+
+    added = sorted(set(new_entities) - set(old_entities))
+    removed = sorted(set(old_entities) - set(new_entities))
+    modified = sorted(guid for guid in set(old_entities) & set(new_entities) if old_entities[guid][2] != new_entities[guid][2])
+
+    report = {"added": [], "removed": [], "modified": []}
+    for guid in added:
+        report["added"].append({"GlobalId": guid, "type": new_entities[guid][0], "name": new_entities[guid][1]})
+    for guid in removed:
+        report["removed"].append({"GlobalId": guid, "type": old_entities[guid][0], "name": old_entities[guid][1]})
+
+    with open(old_path, 'rb') as old_file, open(new_path, 'rb') as new_file:
+        old_data = mmap.mmap(old_file.fileno(), 0, access=mmap.ACCESS_READ)
+        new_data = mmap.mmap(new_file.fileno(), 0, access=mmap.ACCESS_READ)
+        for guid in modified:
+            old_type, old_name, _, old_attributes = old_entities[guid]
+            new_type, new_name, _, new_attributes = new_entities[guid]
+            changes = {}
+            for attribute in sorted(set(old_attributes) | set(new_attributes)):
+                old_value = old_attributes.get(attribute)
+                new_value = new_attributes.get(attribute)
+                if old_value is not None and new_value is not None and old_value[0] == new_value[0]:
+                    continue
+                changes[attribute] = {
+                    "old": describe(old_data, old_value[1], old_value[2]) if old_value else None,
+                    "new": describe(new_data, new_value[1], new_value[2]) if new_value else None,
+                }
+            report["modified"].append({"GlobalId": guid, "type": new_type, "name": new_name, "changes": changes})
+        old_data.close()
+        new_data.close()
+
+    return report
+
+
+def print_report(report):
+    print(f"Added: {len(report['added'])}, removed: {len(report['removed'])}, modified: {len(report['modified'])}")
+    for entity in report["added"]:
+        print(f"+ {entity['type']} {entity['GlobalId']} '{entity['name']}'")
+    for entity in report["removed"]:
+        print(f"- {entity['type']} {entity['GlobalId']} '{entity['name']}'")
+    for entity in report["modified"]:
+        print(f"~ {entity['type']} {entity['GlobalId']} '{entity['name']}'")
+        for attribute, change in entity["changes"].items():
+            print(f"    {attribute}: {change['old']} -> {change['new']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python ifc_diff.py <old.ifc> <new.ifc> [report.json]")
+        sys.exit(1)
+    report = diff_models(sys.argv[1], sys.argv[2])
+    print_report(report)
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2, ensure_ascii=False)
+        print(f"Report saved as: {os.path.abspath(sys.argv[3])}")
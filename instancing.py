@@ -0,0 +1,103 @@
+import numpy as np
+
+# Instanced geometry: every unique shape is stored once as an IfcRepresentationMap and placed by
+# IfcMappedItems with an IfcCartesianTransformationOperator3D (or ...3DnonUniform for non-uniform
+# scaling). Operators and the resulting product shapes are shared between occurrences with the
+# same transformation, so a thousand identical boxes cost one solid and one shape.
+
+
+def rotation_axes(rotation):
+    """Returns the X and Z axes of a rotation given as Euler angles in degrees (applied X, Y, Z)."""
+    rx, ry, rz = np.radians(rotation)
+    cx, sx, cy, sy, cz, sz = np.cos(rx), np.sin(rx), np.cos(ry), np.sin(ry), np.cos(rz), np.sin(rz)
+    matrix = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]]) @ \
+        np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]]) @ \
+        np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    return tuple(matrix[:, 0].tolist()), tuple(matrix[:, 2].tolist())
+
+
+def box_items(model, x=1.0, y=1.0, z=1.0):
+    """A box from the origin to (x, y, z) as a single extrusion, for use with ShapeLibrary.add_shape."""
+    position = model.createIfcAxis2Placement2D(model.createIfcCartesianPoint((x / 2.0, y / 2.0)), None)
+    profile = model.createIfcRectangleProfileDef("AREA", None, position, float(x), float(y))
+    return [model.createIfcExtrudedAreaSolid(profile, None, model.createIfcDirection((0.0, 0.0, 1.0)), float(z))]
+
+
+class ShapeLibrary:
+    def __init__(self, model, context):
+        self.model = model
+        self.context = context
+        self.maps = {}  # shape key -> IfcRepresentationMap
+        self.operators = {}  # (translation, scale, axes) -> IfcCartesianTransformationOperator3D
+        self.shapes = {}  # (shape key, operator key) -> IfcProductDefinitionShape
+        self.directions = {}
+        self.points = {}
+        self.origin = model.createIfcAxis2Placement3D(model.createIfcCartesianPoint((0.0, 0.0, 0.0)), None, None)
+
+    def __contains__(self, key):
+        return key in self.maps
+
+    def add_shape(self, key, items, representation_type="SweptSolid", style=None):
+        """
+        Registers the geometry of a shape once. items may be a list of representation items or a
+        function creating them, which is only called the first time the key is seen.
+        style: an optional IfcSurfaceStyle (or other presentation style) for all items.
+        """
+        if key in self.maps:
+            return self.maps[key]
+        if callable(items):
+            items = items()
+        if style is not None:
+            for item in items:
+                self.model.createIfcStyledItem(item, [style], None)
+        representation = self.model.createIfcShapeRepresentation(self.context, "Body", representation_type, items)
+        self.maps[key] = self.model.createIfcRepresentationMap(self.origin, representation)
+        return self.maps[key]
+
+    def direction(self, ratios):
+        ratios = tuple(round(float(value), 9) for value in ratios)
+        if ratios not in self.directions:
+            self.directions[ratios] = self.model.createIfcDirection(ratios)
+        return self.directions[ratios]
+
+    def point(self, coordinates):
+        coordinates = tuple(round(float(value), 9) for value in coordinates)
+        if coordinates not in self.points:
+            self.points[coordinates] = self.model.createIfcCartesianPoint(coordinates)
+        return self.points[coordinates]
+
+    def operator(self, translation=(0.0, 0.0, 0.0), scale=None, x_axis=None, z_axis=None):
+        """Returns a shared transformation operator. scale is a number or (x, y, z) for non-uniform scaling."""
+        translation = tuple(round(float(value), 9) for value in translation)
+        if scale is not None and not np.isscalar(scale):
+            scale = tuple(float(value) for value in scale)
+            if scale[0] == scale[1] == scale[2]:
+                scale = scale[0]
+        key = (translation, scale, x_axis, z_axis)
+        if key not in self.operators:
+            axis1 = self.direction(x_axis) if x_axis is not None else None
+            axis3 = self.direction(z_axis) if z_axis is not None else None
+            axis2 = self.direction(np.cross(z_axis, x_axis)) if x_axis is not None and z_axis is not None else None
+            origin = self.point(translation)
+            if isinstance(scale, tuple):
+                self.operators[key] = self.model.createIfcCartesianTransformationOperator3DnonUniform(
+                    axis1, axis2, origin, scale[0], axis3, scale[1], scale[2])
+            else:
+                self.operators[key] = self.model.createIfcCartesianTransformationOperator3D(
+                    axis1, axis2, origin, None if scale is None else float(scale), axis3)
+        return key, self.operators[key]
+
+    def instance(self, key, translation=(0.0, 0.0, 0.0), scale=None, rotation=None):
+        """
+        Returns an IfcProductDefinitionShape placing the shape registered under key.
+        rotation: Euler angles in degrees. Products with the same key and transformation share
+        the returned shape.
+        """
+        x_axis, z_axis = rotation_axes(rotation) if rotation is not None else (None, None)
+        operator_key, operator = self.operator(translation, scale, x_axis, z_axis)
+        shape_key = (key, operator_key)
+        if shape_key not in self.shapes:
+            mapped_item = self.model.createIfcMappedItem(self.maps[key], operator)
+            representation = self.model.createIfcShapeRepresentation(self.context, "Body", "MappedRepresentation", [mapped_item])
+            self.shapes[shape_key] = self.model.createIfcProductDefinitionShape(None, None, [representation])
+        return self.shapes[shape_key]
@@ -1,26 +1,51 @@
+import sys
 import ifcopenshell
+import ifcopenshell.guid
 from ifcopenshell.api import run
 import numpy as np
-import math
+from instancing import ShapeLibrary, box_items
 
-def mandelbulb(x, y, z, max_iter, power):
-    dr = 1.0
-    r = 0.0
-    theta, phi, zr = 0, 0, 0
+def mandelbulb(points, max_iter, power):
+    """Distance estimator for an (n, 3) array of points, evaluated for all points at once."""
+    x, y, z = (points[:, i].astype(float) for i in range(3))
+    dr = np.ones(len(points))
+    r = np.zeros(len(points))
+    active = np.ones(len(points), dtype=bool)
     for i in range(max_iter):
-        r = math.sqrt(x**2 + y**2 + z**2)
-        if r > 2.0:
+        r = np.where(active, np.sqrt(x**2 + y**2 + z**2), r)
+        # Points that escaped keep their last radius and derivative
+        active &= r <= 2.0
+        if not active.any():
             break
-        theta = math.atan2(math.sqrt(x**2 + y**2), z)
-        phi = math.atan2(y, x)
+        theta = np.arctan2(np.sqrt(x**2 + y**2), z) * power
+        phi = np.arctan2(y, x) * power
         zr = r**power
-        theta *= power
-        phi *= power
-        x = zr * math.sin(theta) * math.cos(phi)
-        y = zr * math.sin(phi) * math.sin(theta)
-        z = zr * math.cos(theta)
-        dr = (r ** (power - 1)) * power * dr + 1.0
-    return 0.5 * math.log(r) * r / dr if r > 0 else float('inf')
+        dr = np.where(active, (r ** (power - 1)) * power * dr + 1.0, dr)
+        x = np.where(active, zr * np.sin(theta) * np.cos(phi), x)
+        y = np.where(active, zr * np.sin(phi) * np.sin(theta), y)
+        z = np.where(active, zr * np.cos(theta), z)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(r > 0, 0.5 * np.log(r) * r / dr, np.inf)
+
+def accepted_voxels(range_space, max_iter, power, threshold, chunk_size):
+    """Yields the grid points below the threshold, evaluating chunk_size points at a time."""
+    grid_size = len(range_space)
+    slab = max(1, chunk_size // (grid_size * grid_size))  # x slices per chunk
+    for start in range(0, grid_size, slab):
+        x, y, z = np.meshgrid(range_space[start:start + slab], range_space, range_space, indexing='ij')
+        points = np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+        yield points[mandelbulb(points, max_iter, power) < threshold]
+
+def emit_voxels(model, storey, representation, points, name="Fractal Point"):
+    """Bulk creation of one proxy per point, sharing a single product shape. Returns the proxies."""
+    relative_to = storey.ObjectPlacement
+    proxies = []
+    for x, y, z in points.tolist():
+        placement = model.createIfcLocalPlacement(relative_to, model.createIfcAxis2Placement3D(
+            model.createIfcCartesianPoint((x, y, z)), None, None))
+        proxies.append(model.createIfcBuildingElementProxy(
+            ifcopenshell.guid.new(), None, name, None, None, placement, representation, None, None))
+    return proxies
 
 model = ifcopenshell.file()
 
@@ -32,24 +57,32 @@ body = run("context.add_context", model, context_type="Model", context_identifie
 site = run("root.create_entity", model, ifc_class="IfcSite", name="Fractal Site")
 building = run("root.create_entity", model, ifc_class="IfcBuilding", name="Fractal Building")
 storey = run("root.create_entity", model, ifc_class="IfcBuildingStorey", name="Display Area")
+run("aggregate.assign_object", model, products=[site], relating_object=project)
+run("aggregate.assign_object", model, products=[building], relating_object=site)
+run("aggregate.assign_object", model, products=[storey], relating_object=building)
+run("geometry.edit_object_placement", model, product=storey)
 
-grid_size = 20
+grid_size = int(sys.argv[1]) if len(sys.argv) > 1 else 20  # e.g. 200 for a stress model with millions of elements
 max_iter = 3
 power = 3
+threshold = 10  # Threshold for escape
+chunk_size = 1_000_000  # grid points evaluated at once
+voxel_size = 0.1
 range_space = np.linspace(-1.5, 1.5, grid_size)
 
-for x in range_space:
-    for y in range_space:
-        for z in range_space:
-            fractal_value = mandelbulb(x, y, z, max_iter, power)
-            if fractal_value < 10:  # Threshold for escape
-                point = run("root.create_entity", model, ifc_class="IfcBuildingElementProxy", name="Fractal Point")
-                run("geometry.edit_object_placement", model, product=point, coords=(x, y, z))
-                representation = run("geometry.add_wall_representation", model, context=body, shape="Cube", coords=(x, y, z), length=0.1, height=0.1, thickness=0.1)
-                run("geometry.assign_representation", model, product=point, representation=representation)
-                run("aggregate.assign_object", model, relating_object=storey, product=point)
+# Every voxel is the same cube, stored once and placed through a mapped item
+library = ShapeLibrary(model, body)
+library.add_shape("voxel", lambda: box_items(model, voxel_size, voxel_size, voxel_size))
+representation = library.instance("voxel", translation=(-voxel_size / 2, -voxel_size / 2, -voxel_size / 2))
+
+points = []
+for accepted in accepted_voxels(range_space, max_iter, power, threshold, chunk_size):
+    points.extend(emit_voxels(model, storey, representation, accepted))
+
+# A single containment relation for all voxels
+model.createIfcRelContainedInSpatialStructure(ifcopenshell.guid.new(), None, None, None, points, storey)
 
 # Save the model
 filename = "mandelbulb_geometry.ifc"
 model.write(filename)
-print(f"Model saved successfully as '{filename}'.")
\ No newline at end of file
+print(f"Model saved successfully as '{filename}' with {len(points)} fractal points.")
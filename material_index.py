@@ -0,0 +1,154 @@
+import numpy as np
+
+# Kinds of effective material definitions, stored per element in MaterialIndex.kinds
+NO_MATERIAL = 0
+MATERIAL = 1
+MATERIAL_LIST = 2
+LAYER_SET = 3
+LAYER_SET_USAGE = 4
+CONSTITUENT_SET = 5
+PROFILE_SET = 6
+PROFILE_SET_USAGE = 7
+OTHER = 8
+
+material_kinds = {
+    "IfcMaterial": MATERIAL,
+    "IfcMaterialList": MATERIAL_LIST,
+    "IfcMaterialLayerSet": LAYER_SET,
+    "IfcMaterialLayerSetUsage": LAYER_SET_USAGE,
+    "IfcMaterialConstituentSet": CONSTITUENT_SET,
+    "IfcMaterialProfileSet": PROFILE_SET,
+    "IfcMaterialProfileSetUsage": PROFILE_SET_USAGE,
+}
+
+
+def material_kind(material):
+    return material_kinds.get(material.is_a(), OTHER)
+
+
+def underlying_set(material):
+    """Layer and profile set usages point at the set that actually carries the materials."""
+    if material.is_a("IfcMaterialLayerSetUsage"):
+        return material.ForLayerSet
+    if material.is_a("IfcMaterialProfileSetUsage"):
+        return material.ForProfileSet
+    return material
+
+
+def material_fractions(material):
+    """
+    Returns [(material name, fraction)] for a material definition. Constituent sets use their
+    Fraction (equal shares if none is set), layer sets the share of the total thickness.
+    """
+    material = underlying_set(material)
+    if material.is_a("IfcMaterial"):
+        return [(material.Name, 1.0)]
+    if material.is_a("IfcMaterialList"):
+        materials = material.Materials or ()
+        return [(item.Name, 1.0 / len(materials)) for item in materials]
+    if material.is_a("IfcMaterialLayerSet"):
+        layers = material.MaterialLayers or ()
+        total = sum(layer.LayerThickness or 0.0 for layer in layers)
+        return [(layer.Material.Name if layer.Material else layer.Name,
+                 (layer.LayerThickness or 0.0) / total if total else 1.0 / len(layers)) for layer in layers]
+    if material.is_a("IfcMaterialConstituentSet"):
+        constituents = material.MaterialConstituents or ()
+        if any(constituent.Fraction is None for constituent in constituents):
+            return [(constituent.Material.Name, 1.0 / len(constituents)) for constituent in constituents]
+        return [(constituent.Material.Name, constituent.Fraction) for constituent in constituents]
+    if material.is_a("IfcMaterialProfileSet"):
+        profiles = material.MaterialProfiles or ()
+        return [(profile.Material.Name if profile.Material else profile.Name, 1.0 / len(profiles)) for profile in profiles]
+    return []
+
+
+class MaterialIndex:
+    """
+    Effective material definition of every element, built once from IfcRelAssociatesMaterial
+    and IfcRelDefinesByType. A material associated with the occurrence wins; otherwise the
+    element inherits the material of its type.
+
+    The result is kept in parallel NumPy arrays sorted by element id:
+    element_ids, material_ids (-1 = none), set_ids (layer/profile set behind a usage),
+    kinds (see the constants above) and inherited (True if taken from the type).
+    """
+
+    def __init__(self, model, ifc_class="IfcElement"):
+        self.model = model
+
+        direct = {}
+        for rel in model.by_type("IfcRelAssociatesMaterial"):
+            material = rel.RelatingMaterial
+            if material is None:
+                continue
+            for related in rel.RelatedObjects:
+                direct[related.id()] = material
+
+        element_types = {}
+        for rel in model.by_type("IfcRelDefinesByType"):
+            for related in rel.RelatedObjects:
+                element_types[related.id()] = rel.RelatingType.id()
+
+        elements = {element.id() for element in model.by_type(ifc_class)}
+        elements.update(element_id for element_id in direct if not model.by_id(element_id).is_a("IfcTypeObject"))
+
+        self.element_ids = np.array(sorted(elements), dtype=np.int64)
+        count = len(self.element_ids)
+        self.material_ids = np.full(count, -1, dtype=np.int64)
+        self.set_ids = np.full(count, -1, dtype=np.int64)
+        self.kinds = np.zeros(count, dtype=np.int8)
+        self.inherited = np.zeros(count, dtype=bool)
+
+        resolved = {}  # material id -> (kind, set id)
+        for position, element_id in enumerate(self.element_ids.tolist()):
+            material = direct.get(element_id)
+            if material is None and element_id in element_types:
+                material = direct.get(element_types[element_id])
+                self.inherited[position] = material is not None
+            if material is None:
+                continue
+            if material.id() not in resolved:
+                resolved[material.id()] = (material_kind(material), underlying_set(material).id())
+            self.material_ids[position] = material.id()
+            self.kinds[position], self.set_ids[position] = resolved[material.id()]
+
+    def position(self, element):
+        element_id = element if isinstance(element, int) else element.id()
+        position = np.searchsorted(self.element_ids, element_id)
+        if position < len(self.element_ids) and self.element_ids[position] == element_id:
+            return position
+        return None
+
+    def material_of(self, element):
+        """Returns the effective material definition of an element, or None."""
+        position = self.position(element)
+        if position is None or self.material_ids[position] < 0:
+            return None
+        return self.model.by_id(int(self.material_ids[position]))
+
+    def elements(self, element_ids):
+        return [self.model.by_id(int(element_id)) for element_id in element_ids]
+
+    def elements_per_set(self, kinds=None):
+        """Returns {material or set: [elements]}, grouping usages under the set they use."""
+        mask = self.set_ids >= 0
+        if kinds is not None:
+            mask &= np.isin(self.kinds, kinds)
+        set_ids = self.set_ids[mask]
+        element_ids = self.element_ids[mask]
+        order = np.argsort(set_ids, kind="stable")
+        set_ids, element_ids = set_ids[order], element_ids[order]
+        unique_ids, starts = np.unique(set_ids, return_index=True)
+        groups = np.split(element_ids, starts[1:]) if len(unique_ids) else []
+        return {self.model.by_id(int(set_id)): self.elements(group) for set_id, group in zip(unique_ids, groups)}
+
+    def elements_per_constituent_set(self):
+        return self.elements_per_set([CONSTITUENT_SET])
+
+    def elements_without_material(self):
+        return self.elements(self.element_ids[self.kinds == NO_MATERIAL])
+
+    def summary(self):
+        """Returns {kind: number of elements}, e.g. for material QA reports."""
+        kinds, counts = np.unique(self.kinds, return_counts=True)
+        return dict(zip(kinds.tolist(), counts.tolist()))
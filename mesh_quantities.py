@@ -0,0 +1,125 @@
+import csv
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import ifcopenshell
+import ifcopenshell.geom
+
+from tessellation_cache import TessellationCache, world_vertices
+
+# Mesh-based quantities for bodies that cannot be computed analytically (breps, booleans, ...).
+# Elements are tessellated by the geometry iterator and measured one at a time, so only the
+# current mesh is held in memory. All values are in meters, in world coordinates.
+
+QUANTITY_NAMES = ("Volume", "SurfaceArea", "FootprintArea", "Closed")
+
+
+def mesh_quantities(vertices, faces):
+    """
+    Volume, surface area and footprint of a triangle mesh.
+
+    vertices: (n, 3) float array, faces: (m, 3) int array. The volume is the signed tetrahedron
+    sum and only meaningful for closed meshes; the footprint is the XY projection of the upward
+    facing triangles (exact for elements without overhangs).
+    """
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if not len(faces):
+        return {"Volume": 0.0, "SurfaceArea": 0.0, "FootprintArea": 0.0, "Closed": False}
+
+    v0, v1, v2 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    normals = np.cross(v1 - v0, v2 - v0)
+    volume = np.einsum("ij,ij->i", v0, np.cross(v1, v2)).sum() / 6.0
+    surface_area = np.linalg.norm(normals, axis=1).sum() / 2.0
+    footprint_area = normals[normals[:, 2] > 0, 2].sum() / 2.0
+    return {"Volume": abs(volume), "SurfaceArea": surface_area, "FootprintArea": footprint_area,
+            "Closed": is_closed(vertices, faces)}
+
+
+def is_closed(vertices, faces):
+    """A mesh is closed if every edge is shared by exactly two triangles (after welding vertices)."""
+    _, welded = np.unique(np.round(vertices, 6), axis=0, return_inverse=True)
+    welded = welded.reshape(-1)[faces]
+    edges = np.concatenate([welded[:, [0, 1]], welded[:, [1, 2]], welded[:, [2, 0]]])
+    edges.sort(axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    return bool(np.all(counts == 2))
+
+
+def geometry_quantities(geometry):
+    """Quantities of a triangulation returned by ifcopenshell.geom (create_shape or the iterator)."""
+    return mesh_quantities(geometry.verts, geometry.faces)
+
+
+def iterate_quantities(model, include=None, threads=None, cache=None):
+    """Yields (element id, GlobalId, quantities) per element, as the iterator produces the shapes."""
+    if cache is not None:
+        # Meshes of unchanged representations come from the tessellation cache
+        for element, verts, faces, _, matrix in cache.shapes(model, include, threads):
+            yield element.id(), element.GlobalId, mesh_quantities(world_vertices(verts, matrix), faces)
+        return
+    settings = ifcopenshell.geom.settings()
+    settings.set("use-world-coords", True)
+    threads = threads or multiprocessing.cpu_count()
+    if include is not None:
+        iterator = ifcopenshell.geom.iterator(settings, model, threads, include=include)
+    else:
+        iterator = ifcopenshell.geom.iterator(settings, model, threads)
+    if not iterator.initialize():
+        return
+    while True:
+        shape = iterator.get()
+        yield shape.id, shape.guid, geometry_quantities(shape.geometry)
+        if not iterator.next():
+            break
+
+
+def quantities_of_chunk(file_path, global_ids, threads, cache_directory=None):
+    """Worker process: opens the model and measures one chunk of elements."""
+    model = ifcopenshell.open(file_path)
+    elements = [model.by_guid(global_id) for global_id in global_ids]
+    cache = TessellationCache(cache_directory) if cache_directory else None
+    return list(iterate_quantities(model, elements, threads, cache))
+
+
+def parallel_quantities(file_path, ifc_class="IfcElement", processes=None, chunk_size=2000, cache_directory=None):
+    """
+    Yields (element id, GlobalId, quantities), measuring chunks of elements in separate worker
+    processes. Results are yielded chunk by chunk as the workers finish.
+    """
+    processes = processes or multiprocessing.cpu_count()
+    model = ifcopenshell.open(file_path)
+    global_ids = [element.GlobalId for element in model.by_type(ifc_class) if element.Representation]
+    del model
+    chunks = [global_ids[start:start + chunk_size] for start in range(0, len(global_ids), chunk_size)]
+    if len(chunks) <= 1 or processes <= 1:
+        yield from quantities_of_chunk(file_path, global_ids, multiprocessing.cpu_count(), cache_directory)
+        return
+    threads = max(1, multiprocessing.cpu_count() // processes)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(quantities_of_chunk, file_path, chunk, threads, cache_directory) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def write_quantities(file_path, output_path, processes=None, cache_directory=None):
+    """Streams the quantities of every element into a CSV file."""
+    count = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(("Id", "GlobalId") + QUANTITY_NAMES)
+        for element_id, global_id, quantities in parallel_quantities(file_path, processes=processes, cache_directory=cache_directory):
+            writer.writerow([element_id, global_id] + [quantities[name] for name in QUANTITY_NAMES])
+            count += 1
+    print(f"Quantities of {count} elements saved as: {output_path}")
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4, 5):
+        print("Usage: python mesh_quantities.py <file.ifc> <output.csv> [processes] [cache directory]")
+        sys.exit(1)
+    write_quantities(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else None,
+                     sys.argv[4] if len(sys.argv) > 4 else None)
@@ -1,6 +1,7 @@
 import ifcopenshell
 import pandas as pd
 import os
+from ifc_delta import track_changes, write_patch
 
 # Load Excel file with the mapping information
 excel_file_path = r'.xlsx'
@@ -24,6 +25,9 @@ for index, row in mapping_df.iterrows():
 ifc_folder = r'\Ifc'
 log_file_path = os.path.join(ifc_folder, "profile_renamer_log.txt")
 
+# Write only the changed entities as "profileName_<name>.ifcdelta" instead of a full copy of every model
+write_patches = False
+
 # Open the log file for writing
 with open(log_file_path, 'w') as log_file:
     # Iterate over all IFC files in the directory
@@ -38,6 +42,8 @@ with open(log_file_path, 'w') as log_file:
 
             # Load the IFC file
             model = ifcopenshell.open(ifc_file_path)
+            if write_patches:
+                track_changes(model)
 
             # Iterate over code_to_name_mapping to find a match in the filename
             for code, new_profile_name in code_to_name_mapping.items():
@@ -53,8 +59,12 @@ with open(log_file_path, 'w') as log_file:
 
             if updated:
                 # Save the modified IFC file only if any update was made
-                new_ifc_file_path = os.path.join(ifc_folder, f"profileName_{filename}")
-                model.write(new_ifc_file_path)
+                if write_patches:
+                    new_ifc_file_path = os.path.join(ifc_folder, f"profileName_{os.path.splitext(filename)[0]}.ifcdelta")
+                    write_patch(model, ifc_file_path, new_ifc_file_path)
+                else:
+                    new_ifc_file_path = os.path.join(ifc_folder, f"profileName_{filename}")
+                    model.write(new_ifc_file_path)
                 log_file.write(f"Processed and saved: {new_ifc_file_path}\n")
             else:
                 log_file.write(f"No matching or relevant ProfileName found to update in: {filename}\n")
@@ -0,0 +1,163 @@
+from collections import defaultdict
+
+
+def unwrap_property(prop):
+    """Returns the plain Python value of an IfcProperty or IfcPhysicalQuantity."""
+    if prop.is_a("IfcPropertySingleValue"):
+        return prop.NominalValue.wrappedValue if prop.NominalValue else None
+    if prop.is_a("IfcPropertyEnumeratedValue"):
+        return tuple(value.wrappedValue for value in prop.EnumerationValues or ())
+    if prop.is_a("IfcPropertyListValue"):
+        return tuple(value.wrappedValue for value in prop.ListValues or ())
+    if prop.is_a("IfcPropertyBoundedValue"):
+        lower = prop.LowerBoundValue.wrappedValue if prop.LowerBoundValue else None
+        upper = prop.UpperBoundValue.wrappedValue if prop.UpperBoundValue else None
+        return (lower, upper)
+    if prop.is_a("IfcPhysicalSimpleQuantity"):
+        return prop[3]
+    return None
+
+
+def read_property_definition(definition):
+    """Returns {property name: value} for an IfcPropertySet or IfcElementQuantity."""
+    if definition.is_a("IfcPropertySet"):
+        return {prop.Name: unwrap_property(prop) for prop in definition.HasProperties or ()}
+    if definition.is_a("IfcElementQuantity"):
+        return {quantity.Name: unwrap_property(quantity) for quantity in definition.Quantities or ()}
+    return {}
+
+
+def property_definitions(rel):
+    """
+    The definitions attached by an IfcRelDefinesByProperties. In IFC4 RelatingPropertyDefinition
+    may be an IfcPropertySetDefinitionSet, which ifcopenshell returns as a tuple of sets.
+    """
+    definition = rel.RelatingPropertyDefinition
+    if definition is None:
+        return ()
+    return definition if isinstance(definition, tuple) else (definition,)
+
+
+def entity_id(element):
+    return element if isinstance(element, int) else element.id()
+
+
+class PropertyIndex:
+    """
+    element id -> pset name -> property name -> unwrapped value, built in a single sweep over
+    IfcRelDefinesByType and IfcRelDefinesByProperties. Occurrence psets override the psets
+    inherited from the element type, property by property.
+
+    Each property set is read once, no matter how many elements share it.
+    """
+
+    def __init__(self, ifc_file):
+        self.ifc_file = ifc_file
+        self.definitions = {}  # pset id -> {property name: value}
+        self.occurrence_psets = defaultdict(dict)  # element id -> {pset name: pset id}
+        self.relations = defaultdict(lambda: defaultdict(list))  # element id -> pset name -> [IfcRelDefinesByProperties]
+        self.type_psets = {}  # type id -> {pset name: pset id}
+        self.element_types = {}  # element id -> type id
+        self.property_groups = {}  # (pset name, property name) -> {value: [element ids]}
+        self.build()
+
+    def read(self, definition):
+        values = self.definitions.get(definition.id())
+        if values is None:
+            values = self.definitions[definition.id()] = read_property_definition(definition)
+        return values
+
+    def build(self):
+        for rel in self.ifc_file.by_type("IfcRelDefinesByType"):
+            element_type = rel.RelatingType
+            if element_type.id() not in self.type_psets:
+                psets = {}
+                for definition in element_type.HasPropertySets or ():
+                    self.read(definition)
+                    psets[definition.Name] = definition.id()
+                self.type_psets[element_type.id()] = psets
+            for element in rel.RelatedObjects:
+                self.element_types[element.id()] = element_type.id()
+
+        for rel in self.ifc_file.by_type("IfcRelDefinesByProperties"):
+            for definition in property_definitions(rel):
+                if not definition.is_a("IfcPropertySetDefinition"):
+                    continue
+                self.read(definition)
+                for element in rel.RelatedObjects:
+                    self.occurrence_psets[element.id()][definition.Name] = definition.id()
+                    self.relations[element.id()][definition.Name].append(rel)
+
+    def element_ids(self):
+        return set(self.occurrence_psets) | set(self.element_types)
+
+    def get_psets(self, element):
+        """Returns {pset name: {property name: value}} for an element, including type psets."""
+        element = entity_id(element)
+        psets = {}
+        type_id = self.element_types.get(element)
+        if type_id is not None:
+            for pset_name, pset_id in self.type_psets[type_id].items():
+                psets[pset_name] = dict(self.definitions[pset_id])
+        for pset_name, pset_id in self.occurrence_psets.get(element, {}).items():
+            psets.setdefault(pset_name, {}).update(self.definitions[pset_id])
+        return psets
+
+    def get(self, element, prop_name, pset_name=None, default=None):
+        """Returns the value of a property, looking in every pset unless one is named."""
+        element = entity_id(element)
+        sources = [self.occurrence_psets.get(element, {})]
+        type_id = self.element_types.get(element)
+        if type_id is not None:
+            sources.append(self.type_psets[type_id])
+        for psets in sources:
+            for name, pset_id in psets.items():
+                if pset_name is not None and name != pset_name:
+                    continue
+                values = self.definitions[pset_id]
+                if prop_name in values:
+                    return values[prop_name]
+        return default
+
+    def get_relations(self, element, pset_name):
+        """Returns the IfcRelDefinesByProperties that attach a pset to the element directly."""
+        return self.relations.get(entity_id(element), {}).get(pset_name, [])
+
+    def group_ids_by(self, prop_name, pset_name=None):
+        key = (pset_name, prop_name)
+        groups = self.property_groups.get(key)
+        if groups is None:
+            groups = defaultdict(list)
+            for element in sorted(self.element_ids()):
+                value = self.get(element, prop_name, pset_name)
+                if value is not None:
+                    groups[value].append(element)
+            self.property_groups[key] = groups
+        return groups
+
+    def elements(self, element_ids, ifc_class=None):
+        elements = (self.ifc_file.by_id(element) for element in element_ids)
+        return [element for element in elements if ifc_class is None or element.is_a(ifc_class)]
+
+    def group_by(self, prop_name, pset_name=None, ifc_class=None):
+        """Returns {value: [elements]} for every element carrying the property."""
+        groups = {}
+        for value, element_ids in self.group_ids_by(prop_name, pset_name).items():
+            elements = self.elements(element_ids, ifc_class)
+            if elements:
+                groups[value] = elements
+        return groups
+
+    def where(self, prop_name, value, pset_name=None, ifc_class=None):
+        """Returns every element whose property equals value, e.g. all spaces where Brandabschnitt = X."""
+        return self.elements(self.group_ids_by(prop_name, pset_name).get(value, []), ifc_class)
+
+    def rebuild(self):
+        """Re-reads the model after its property relationships have been edited."""
+        self.definitions.clear()
+        self.occurrence_psets.clear()
+        self.relations.clear()
+        self.type_psets.clear()
+        self.element_types.clear()
+        self.property_groups.clear()
+        self.build()
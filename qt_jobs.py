@@ -0,0 +1,142 @@
+import traceback
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QProgressBar, QLabel, QPushButton
+
+# Background jobs for the PyQt tools. A job is a plain function taking the Job as its first
+# argument; it runs on a QThreadPool thread, reports progress with job.report(...) and stops at the
+# next report once cancel() was called. Results and errors arrive as signals on the GUI thread.
+#
+#     runner = JobRunner(panel)
+#     runner.running_changed.connect(lambda running: button.setEnabled(not running))
+#     runner.start(merge_files, paths, on_result=self.merge_done)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobSignals(QObject):
+    progress = pyqtSignal(int, str)  # percent (-1 if unknown), message
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class Job(QRunnable):
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+        self.is_cancelled = False
+        self.setAutoDelete(False)  # JobRunner holds the reference until the job finished
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def check_cancelled(self):
+        if self.is_cancelled:
+            raise JobCancelled()
+
+    def report(self, done=None, total=None, message=""):
+        """Emits progress and raises JobCancelled if the job was cancelled in the meantime."""
+        self.check_cancelled()
+        percent = int(100 * done / total) if total else -1
+        self.signals.progress.emit(percent, message)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.function(self, *self.args, **self.kwargs)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception:
+            self.signals.error.emit(traceback.format_exc())
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class JobPanel(QWidget):
+    """Progress bar, status text and cancel button for a JobRunner."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.progress_bar = QProgressBar()
+        self.status_label = QLabel()
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.cancel_button)
+        self.setLayout(layout)
+
+    def show_progress(self, percent, message):
+        if percent < 0:
+            self.progress_bar.setRange(0, 0)  # busy indicator
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(percent)
+        if message:
+            self.status_label.setText(message)
+
+    def show_running(self, running):
+        self.cancel_button.setEnabled(running)
+        if not running:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+
+
+class JobRunner(QObject):
+    """Starts jobs on the global QThreadPool and wires them to an optional JobPanel."""
+
+    running_changed = pyqtSignal(bool)  # True when the first job starts, False when the last one finished
+
+    def __init__(self, panel=None, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool.globalInstance()
+        self.panel = panel
+        self.jobs = set()  # keeps the Python side of running jobs alive
+        if panel is not None:
+            panel.cancel_button.clicked.connect(self.cancel_all)
+
+    def is_running(self):
+        return bool(self.jobs)
+
+    def start(self, function, *args, on_result=None, on_error=None, on_finished=None, **kwargs):
+        job = Job(function, *args, **kwargs)
+        if on_result is not None:
+            job.signals.result.connect(on_result)
+        job.signals.error.connect(on_error if on_error is not None else self.print_error)
+        if on_finished is not None:
+            job.signals.finished.connect(on_finished)
+        job.signals.finished.connect(lambda: self.job_finished(job))
+        if self.panel is not None:
+            job.signals.progress.connect(self.panel.show_progress)
+            job.signals.cancelled.connect(lambda: self.panel.status_label.setText('Cancelled'))
+            self.panel.show_running(True)
+        self.jobs.add(job)
+        if len(self.jobs) == 1:
+            self.running_changed.emit(True)
+        self.pool.start(job)
+        return job
+
+    def job_finished(self, job):
+        self.jobs.discard(job)
+        if not self.jobs:
+            if self.panel is not None:
+                self.panel.show_running(False)
+            self.running_changed.emit(False)
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    @staticmethod
+    def print_error(message):
+        print(f"Job failed:\n{message}")
@@ -0,0 +1,260 @@
+import math
+import sys
+
+import numpy as np
+import ifcopenshell
+import ifcopenshell.guid
+from ifcopenshell.util.unit import calculate_unit_scale
+
+from pset_index import property_definitions
+
+# Fills in missing volume quantities without meshing. Extrusions are computed analytically:
+# profile area (shoelace formula over all polygons at once) x depth x |z of the extrusion direction|.
+# Only elements whose body cannot be read this way (arcs, swept disks, breps, ...) are tessellated.
+
+QTO_NAME = "Qto_GeneratedBaseQuantities"
+
+
+def polyline_points(curve):
+    """Returns the 2D vertices of a straight-segment curve as an (n, 2) array, or None."""
+    if curve.is_a("IfcPolyline"):
+        return np.array([point.Coordinates[:2] for point in curve.Points], dtype=float)
+    if curve.is_a("IfcIndexedPolyCurve"):
+        coordinates = np.array(curve.Points.CoordList, dtype=float)[:, :2]
+        if not curve.Segments:
+            return coordinates
+        indices = []
+        for segment in curve.Segments:
+            if segment.is_a("IfcArcIndex"):
+                return None
+            segment_indices = list(segment.wrappedValue)
+            indices.extend(segment_indices[1:] if indices and indices[-1] == segment_indices[0] else segment_indices)
+        return coordinates[np.array(indices) - 1]
+    return None
+
+
+def profile_polygons(profile):
+    """
+    Returns (closed-form area, [(polygon, sign)]) for a profile. Polygons are summed with the
+    shoelace formula later; sign is -1 for voids. Returns None if the profile is not supported.
+    """
+    # Exact class names: subtypes (rounded corners, center line profiles, ...) have other areas
+    profile_type = profile.is_a()
+    if profile_type == "IfcRectangleHollowProfileDef":
+        t = profile.WallThickness
+        outer = profile.XDim * profile.YDim - (4 - math.pi) * (profile.OuterFilletRadius or 0.0) ** 2
+        inner = (profile.XDim - 2 * t) * (profile.YDim - 2 * t) - (4 - math.pi) * (profile.InnerFilletRadius or 0.0) ** 2
+        return outer - inner, []
+    if profile_type == "IfcRoundedRectangleProfileDef":
+        return profile.XDim * profile.YDim - (4 - math.pi) * profile.RoundingRadius ** 2, []
+    if profile_type == "IfcRectangleProfileDef":
+        return profile.XDim * profile.YDim, []
+    if profile_type == "IfcCircleHollowProfileDef":
+        inner = profile.Radius - profile.WallThickness
+        return math.pi * (profile.Radius ** 2 - inner ** 2), []
+    if profile_type == "IfcCircleProfileDef":
+        return math.pi * profile.Radius ** 2, []
+    if profile_type in ("IfcArbitraryClosedProfileDef", "IfcArbitraryProfileDefWithVoids"):
+        outer = polyline_points(profile.OuterCurve)
+        if outer is None:
+            return None
+        polygons = [(outer, 1.0)]
+        for inner_curve in getattr(profile, "InnerCurves", None) or ():
+            inner = polyline_points(inner_curve)
+            if inner is None:
+                return None
+            polygons.append((inner, -1.0))
+        return 0.0, polygons
+    return None
+
+
+def extrusions(item, scale=1.0):
+    """Yields (extrusion, scale, exact) for an extrusion, a boolean difference's first operand or a mapped item."""
+    if item.is_a("IfcExtrudedAreaSolid"):
+        yield item, scale, True
+    elif item.is_a("IfcBooleanResult") and item.Operator == "DIFFERENCE":
+        # Clipped extrusions only give the gross volume. Unions and intersections are meshed.
+        for extrusion, item_scale, _ in extrusions(item.FirstOperand, scale):
+            yield extrusion, item_scale, False
+    elif item.is_a("IfcMappedItem"):
+        operator = item.MappingTarget
+        if operator.is_a("IfcCartesianTransformationOperator3DnonUniform"):
+            yield None, None, False
+            return
+        item_scale = scale * (operator.Scale if operator.Scale is not None else 1.0)
+        for mapped_item in item.MappingSource.MappedRepresentation.Items:
+            yield from extrusions(mapped_item, item_scale)
+    else:
+        yield None, None, False
+
+
+def body_items(element):
+    if not element.Representation:
+        return []
+    items = []
+    for representation in element.Representation.Representations:
+        if representation.RepresentationIdentifier == "Body":
+            items.extend(representation.Items)
+    return items
+
+
+def shoelace_areas(polygons):
+    """Signed areas of many polygons at once: one reduceat over all vertices."""
+    if not polygons:
+        return np.zeros(0)
+    lengths = np.array([len(polygon) for polygon in polygons])
+    points = np.concatenate(polygons)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    # Index of the next vertex, wrapping around at the end of each polygon
+    following = np.arange(1, len(points) + 1)
+    following[starts + lengths - 1] = starts
+    cross = points[:, 0] * points[following, 1] - points[following, 0] * points[:, 1]
+    return 0.5 * np.add.reduceat(cross, starts)
+
+
+def analytic_quantities(elements):
+    """
+    Returns ({element id: (cross section area, volume, exact)}, [elements needing tessellation]).
+    Areas and volumes are in model length units squared and cubed.
+    """
+    profiles = {}  # profile id -> (closed-form area, first polygon, number of polygons), None if unsupported
+    polygons, signs = [], []
+    extrusion_rows = []  # (element id, profile id, scale, depth factor, exact)
+    fallback = []
+
+    for element in elements:
+        rows = []
+        items = body_items(element)
+        for item in items:
+            for extrusion, scale, exact in extrusions(item):
+                if extrusion is None:
+                    rows = None
+                    break
+                profile = extrusion.SweptArea
+                if profile.id() not in profiles:
+                    parsed = profile_polygons(profile)
+                    if parsed is None:
+                        profiles[profile.id()] = None
+                    else:
+                        area, profile_polygon_list = parsed
+                        profiles[profile.id()] = (area, len(polygons), len(profile_polygon_list))
+                        for polygon, sign in profile_polygon_list:
+                            polygons.append(polygon)
+                            signs.append(sign)
+                if profiles[profile.id()] is None:
+                    rows = None
+                    break
+                direction = np.array(extrusion.ExtrudedDirection.DirectionRatios, dtype=float)
+                depth_factor = extrusion.Depth * abs(direction[2]) / np.linalg.norm(direction)
+                rows.append((element.id(), profile.id(), scale, depth_factor, exact))
+            if rows is None:
+                break
+        if rows is None or not items:
+            fallback.append(element)
+        else:
+            # Openings are cut from the body, so only the gross volume is known
+            if getattr(element, "HasOpenings", None):
+                rows = [row[:4] + (False,) for row in rows]
+            extrusion_rows.extend(rows)
+
+    # Polygon areas for all profiles at once, then summed per profile
+    polygon_areas = np.abs(shoelace_areas(polygons)) * np.array(signs) if polygons else np.zeros(0)
+    profile_areas = {}
+    for profile_id, parsed in profiles.items():
+        if parsed is not None:
+            area, first, count = parsed
+            profile_areas[profile_id] = area + polygon_areas[first:first + count].sum()
+
+    quantities = {}
+    if extrusion_rows:
+        element_ids = np.array([row[0] for row in extrusion_rows], dtype=np.int64)
+        areas = np.array([profile_areas[row[1]] for row in extrusion_rows]) * np.array([row[2] for row in extrusion_rows]) ** 2
+        volumes = areas * np.array([row[3] for row in extrusion_rows]) * np.array([row[2] for row in extrusion_rows])
+        exact = np.array([row[4] for row in extrusion_rows])
+        unique_ids, inverse = np.unique(element_ids, return_inverse=True)
+        area_sums = np.bincount(inverse, weights=areas)
+        volume_sums = np.bincount(inverse, weights=volumes)
+        all_exact = np.bincount(inverse, weights=~exact) == 0
+        for element_id, area, volume, is_exact in zip(unique_ids.tolist(), area_sums.tolist(), volume_sums.tolist(), all_exact.tolist()):
+            quantities[element_id] = (area, volume, is_exact)
+    return quantities, fallback
+
+
+def tessellated_quantities(model, elements):
+    """Fallback for bodies that are not simple extrusions. Returns {element id: (None, volume, exact)}."""
+    from mesh_quantities import iterate_quantities
+
+    if not elements:
+        return {}
+    return {element_id: (None, quantities["Volume"], quantities["Closed"])
+            for element_id, _, quantities in iterate_quantities(model, elements)}
+
+
+def elements_with_volume(model):
+    """Ids of elements that already carry a volume quantity."""
+    element_ids = set()
+    for rel in model.by_type("IfcRelDefinesByProperties"):
+        for definition in property_definitions(rel):
+            if definition.is_a("IfcElementQuantity"):
+                if any(quantity.is_a("IfcQuantityVolume") for quantity in definition.Quantities or ()):
+                    element_ids.update(obj.id() for obj in rel.RelatedObjects)
+    return element_ids
+
+
+def generate_quantities(model, ifc_class="IfcElement", tessellate=True, precision=6):
+    """
+    Adds a shared IfcElementQuantity to every element without a volume quantity. Elements with
+    the same (rounded) values share one quantity set and one IfcRelDefinesByProperties.
+    """
+    length_scale = calculate_unit_scale(model)
+    area_scale = length_scale ** 2 / calculate_unit_scale(model, "AREAUNIT")
+    volume_scale = length_scale ** 3 / calculate_unit_scale(model, "VOLUMEUNIT")
+
+    existing = elements_with_volume(model)
+    elements = [element for element in model.by_type(ifc_class) if element.id() not in existing]
+    quantities, fallback = analytic_quantities(elements)
+    print(f"Computed {len(quantities)} elements analytically, {len(fallback)} need tessellation.")
+
+    if tessellate and fallback:
+        try:
+            tessellated = tessellated_quantities(model, fallback)
+        except Exception as e:
+            print(f"Tessellation failed: {e}")
+            tessellated = {}
+        # Tessellated volumes are in cubic meters
+        meter_to_model = 1.0 / length_scale ** 3
+        quantities.update({element_id: (None, volume * meter_to_model, exact) for element_id, (_, volume, exact) in tessellated.items()})
+
+    # Group elements by their values, so equal elements share one quantity set
+    groups = {}
+    for element_id, (area, volume, exact) in quantities.items():
+        key = (None if area is None else round(area * area_scale, precision), round(volume * volume_scale, precision), exact)
+        groups.setdefault(key, []).append(model.by_id(element_id))
+
+    owner_history = model.by_type("IfcOwnerHistory")
+    owner_history = owner_history[0] if owner_history else None
+    for (area, volume, exact), group in groups.items():
+        values = [model.create_entity("IfcQuantityVolume", Name="GrossVolume", VolumeValue=volume)]
+        if exact:
+            values.append(model.create_entity("IfcQuantityVolume", Name="NetVolume", VolumeValue=volume))
+        if area is not None:
+            values.append(model.create_entity("IfcQuantityArea", Name="CrossSectionArea", AreaValue=area))
+        quantity_set = model.create_entity(
+            "IfcElementQuantity", GlobalId=ifcopenshell.guid.new(), OwnerHistory=owner_history,
+            Name=QTO_NAME, MethodOfMeasurement="Generated", Quantities=values)
+        model.create_entity(
+            "IfcRelDefinesByProperties", GlobalId=ifcopenshell.guid.new(), OwnerHistory=owner_history,
+            RelatedObjects=group, RelatingPropertyDefinition=quantity_set)
+
+    print(f"Added quantities to {len(quantities)} elements using {len(groups)} shared quantity sets.")
+    return len(quantities)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python quantity_generator.py <input.ifc> <output.ifc>")
+        sys.exit(1)
+    model = ifcopenshell.open(sys.argv[1])
+    generate_quantities(model)
+    model.write(sys.argv[2])
+    print(f"IFC file saved as: {sys.argv[2]}")
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from pset_index import property_definitions
+
+
+def normalize_name(name):
+    return (name or "").strip().lower()
+
+
+def sub_quantity_value(complex_quantity, name="width"):
+    """Returns the value of a named IfcQuantityLength inside an IfcPhysicalComplexQuantity, or None."""
+    for sub_q in complex_quantity.HasQuantities or ():
+        if sub_q.is_a('IfcQuantityLength') and normalize_name(sub_q.Name) == name:
+            return sub_q.LengthValue
+    return None
+
+
+class QuantityIndex:
+    """
+    element id -> normalized quantity name -> [IfcPhysicalComplexQuantity], in order of appearance,
+    built in a single sweep over IfcRelDefinesByProperties. Duplicate names (e.g. two "Concrete"
+    layers) are kept as a list, so the n-th constituent with a name matches the n-th quantity.
+
+    Each IfcElementQuantity is read once, no matter how many elements share it.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.quantity_sets = {}  # element quantity id -> {name: [complex quantities]}
+        self.element_quantities = defaultdict(list)  # element id -> [element quantity ids]
+        self.build()
+
+    def build(self):
+        for rel in self.model.by_type('IfcRelDefinesByProperties'):
+            for definition in property_definitions(rel):
+                if not definition.is_a('IfcElementQuantity'):
+                    continue
+                if definition.id() not in self.quantity_sets:
+                    named = defaultdict(list)
+                    for quantity in definition.Quantities or ():
+                        if quantity.is_a('IfcPhysicalComplexQuantity'):
+                            named[normalize_name(quantity.Name)].append(quantity)
+                    self.quantity_sets[definition.id()] = named
+                for related in rel.RelatedObjects:
+                    self.element_quantities[related.id()].append(definition.id())
+
+    def complex_quantities(self, elements):
+        """Returns {normalized name: [complex quantities]} over one or more elements, in order."""
+        if not isinstance(elements, (list, tuple)):
+            elements = [elements]
+        named = defaultdict(list)
+        for element in elements:
+            element_id = element if isinstance(element, int) else element.id()
+            for definition_id in self.element_quantities.get(element_id, ()):
+                for name, quantities in self.quantity_sets[definition_id].items():
+                    named[name].extend(quantities)
+        return named
+
+    def constituent_widths(self, elements, constituents, sub_quantity="width"):
+        """
+        Returns the width of every constituent (None if no quantity matches), matching duplicate
+        constituent names by order of appearance.
+        """
+        named = self.complex_quantities(elements)
+        occurrences = defaultdict(int)
+        widths = []
+        for constituent in constituents:
+            name = normalize_name(constituent.Name or "Unnamed Constituent")
+            count = occurrences[name]
+            occurrences[name] += 1
+            quantities = named.get(name, [])
+            widths.append(sub_quantity_value(quantities[count], sub_quantity) if count < len(quantities) else None)
+        return widths
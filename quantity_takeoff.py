@@ -0,0 +1,204 @@
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import ifcopenshell
+from ifcopenshell.util.unit import calculate_unit_scale, get_unit_scale
+
+from material_index import MaterialIndex, material_fractions
+from pset_index import property_definitions
+
+# Quantity takeoff for LCA: every IfcElementQuantity value of every element, in SI units,
+# joined with the material fractions of the element. One row per element and material.
+
+# Quantity class -> (value attribute, unit type of the project unit)
+QUANTITY_KINDS = {
+    "IfcQuantityLength": ("LengthValue", "LENGTHUNIT"),
+    "IfcQuantityArea": ("AreaValue", "AREAUNIT"),
+    "IfcQuantityVolume": ("VolumeValue", "VOLUMEUNIT"),
+    "IfcQuantityWeight": ("WeightValue", "MASSUNIT"),
+    "IfcQuantityTime": ("TimeValue", "TIMEUNIT"),
+    "IfcQuantityCount": ("CountValue", None),
+}
+KIND_NAMES = list(QUANTITY_KINDS)
+
+# Volume used for the material volumes, in order of preference
+VOLUME_NAMES = ("netvolume", "grossvolume", "volume")
+
+
+def unit_scales(model):
+    """Scale to SI per quantity kind, from the project units."""
+    scales = np.ones(len(KIND_NAMES))
+    for kind, (_, unit_type) in enumerate(QUANTITY_KINDS.values()):
+        if unit_type is not None:
+            try:
+                scales[kind] = calculate_unit_scale(model, unit_type)
+            except Exception:
+                scales[kind] = 1.0
+    return scales
+
+
+def read_element_quantity(definition):
+    """Returns (column names, kinds, values, explicit unit scales) of one IfcElementQuantity."""
+    names, kinds, values, scales = [], [], [], []
+    for quantity in definition.Quantities or ():
+        kind = KIND_NAMES.index(quantity.is_a()) if quantity.is_a() in QUANTITY_KINDS else None
+        if kind is None:
+            continue
+        value = getattr(quantity, QUANTITY_KINDS[quantity.is_a()][0])
+        if value is None:
+            continue
+        names.append(f"{definition.Name}.{quantity.Name}")
+        kinds.append(kind)
+        values.append(float(value))
+        # A unit on the quantity itself overrides the project unit
+        scales.append(get_unit_scale(quantity.Unit) if quantity.Unit is not None else np.nan)
+    return names, kinds, values, scales
+
+
+def extract_quantities(model, element_ids):
+    """
+    Pulls all element quantities into a matrix (element row x quantity column) in one sweep over
+    IfcRelDefinesByProperties. Returns (column names, matrix), values in SI units, NaN if missing.
+    """
+    read = {}  # element quantity id -> parsed quantities, read once however many elements share it
+    rows, names, kinds, values, scales = [], [], [], [], []
+    for rel in model.by_type("IfcRelDefinesByProperties"):
+        quantity_sets = [definition for definition in property_definitions(rel) if definition.is_a("IfcElementQuantity")]
+        if not quantity_sets:
+            continue
+        related = np.array([obj.id() for obj in rel.RelatedObjects], dtype=np.int64)
+        positions = np.searchsorted(element_ids, related)
+        positions = positions[(positions < len(element_ids)) & (element_ids[np.minimum(positions, len(element_ids) - 1)] == related)]
+        for definition in quantity_sets:
+            if definition.id() not in read:
+                read[definition.id()] = read_element_quantity(definition)
+            quantity_names, quantity_kinds, quantity_values, quantity_scales = read[definition.id()]
+            for position in positions.tolist() if quantity_names else ():
+                rows.extend([position] * len(quantity_names))
+                names.extend(quantity_names)
+                kinds.extend(quantity_kinds)
+                values.extend(quantity_values)
+                scales.extend(quantity_scales)
+
+    columns = sorted(set(names))
+    column_index = {name: index for index, name in enumerate(columns)}
+    matrix = np.full((len(element_ids), len(columns)), np.nan)
+    if rows:
+        scales = np.array(scales)
+        scales = np.where(np.isnan(scales), unit_scales(model)[np.array(kinds)], scales)
+        matrix[np.array(rows), np.array([column_index[name] for name in names])] = np.array(values) * scales
+    return columns, matrix
+
+
+def element_volumes(columns, matrix):
+    """Picks one volume per element: NetVolume, then GrossVolume, then any other volume column."""
+    volume = np.full(len(matrix), np.nan)
+    for preferred in VOLUME_NAMES:
+        for index, name in enumerate(columns):
+            if name.rsplit(".", 1)[-1].lower() == preferred:
+                volume = np.where(np.isnan(volume), matrix[:, index], volume)
+    return volume
+
+
+def takeoff_model(file_path, ifc_class="IfcElement"):
+    """Runs the takeoff for one model and returns the table as {column name: NumPy array}."""
+    model = ifcopenshell.open(file_path)
+    material_index = MaterialIndex(model, ifc_class)
+    element_ids = material_index.element_ids
+    columns, matrix = extract_quantities(model, element_ids)
+    volumes = element_volumes(columns, matrix)
+
+    # One row per element and material; fractions are read once per material definition
+    fractions = {}
+    rows, materials, shares = [], [], []
+    for position, material_id in enumerate(material_index.material_ids.tolist()):
+        if material_id not in fractions:
+            fractions[material_id] = material_fractions(model.by_id(material_id)) if material_id >= 0 else []
+        for name, fraction in fractions[material_id] or [(None, np.nan)]:
+            rows.append(position)
+            materials.append(name)
+            shares.append(fraction)
+    rows = np.array(rows, dtype=np.int64)
+    shares = np.array(shares, dtype=float)
+
+    elements = [model.by_id(int(element_id)) for element_id in element_ids]
+    guids = np.array([element.GlobalId for element in elements], dtype=object)
+    classes = np.array([element.is_a() for element in elements], dtype=object)
+    element_names = np.array([element.Name for element in elements], dtype=object)
+
+    table = {
+        "File": np.full(len(rows), os.path.basename(file_path), dtype=object),
+        "GlobalId": guids[rows],
+        "IfcClass": classes[rows],
+        "Name": element_names[rows],
+        "Material": np.array(materials, dtype=object),
+        "Fraction": shares,
+        "Volume": volumes[rows],
+        "MaterialVolume": volumes[rows] * shares,
+    }
+    for index, name in enumerate(columns):
+        table[name] = matrix[rows, index]
+    print(f"{os.path.basename(file_path)}: {len(element_ids)} elements, {len(columns)} quantities, {len(rows)} rows")
+    return table
+
+
+def concat_tables(tables):
+    """Stacks tables; quantity columns missing in a model are filled with NaN."""
+    names = []
+    for table in tables:
+        names.extend(name for name in table if name not in names)
+    combined = {}
+    for name in names:
+        parts = []
+        for table in tables:
+            length = len(table["GlobalId"])
+            parts.append(table[name] if name in table else np.full(length, np.nan))
+        combined[name] = np.concatenate(parts) if parts else np.array([])
+    return combined
+
+
+def write_table(table, output_path):
+    if output_path.lower().endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            pq.write_table(pa.table({name: list(values) if values.dtype == object else values for name, values in table.items()}), output_path)
+            print(f"Takeoff saved as: {output_path}")
+            return output_path
+        except ImportError:
+            output_path = output_path[:-len(".parquet")] + ".csv"
+            print("pyarrow is not installed, writing CSV instead.")
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(list(table))
+        columns = [values.tolist() for values in table.values()]
+        for row in zip(*columns):
+            writer.writerow(["" if value is None or value != value else value for value in row])
+    print(f"Takeoff saved as: {output_path}")
+    return output_path
+
+
+def takeoff(input_path, output_path, workers=None):
+    """Takeoff of one model or of every .ifc file in a folder, with one worker process per model."""
+    if os.path.isdir(input_path):
+        file_paths = [os.path.join(input_path, name) for name in sorted(os.listdir(input_path)) if name.lower().endswith(".ifc")]
+    else:
+        file_paths = [input_path]
+
+    if len(file_paths) == 1:
+        tables = [takeoff_model(file_paths[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = list(executor.map(takeoff_model, file_paths))
+    return write_table(concat_tables(tables), output_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python quantity_takeoff.py <file.ifc | folder> <output.parquet | output.csv>")
+        sys.exit(1)
+    takeoff(sys.argv[1], sys.argv[2])
@@ -0,0 +1,231 @@
+import io
+import os
+import re
+import time
+import zipfile
+from collections import namedtuple
+
+# A single STEP statement as it appears on disk. `raw` includes any leading
+# whitespace, so writing every record's `raw` back out reproduces the file
+# byte for byte. `start` and `end` are byte offsets of `raw` in the file.
+StepRecord = namedtuple("StepRecord", ["id", "type", "raw", "start", "end"])
+
+record_head_regex = re.compile(rb'\s*#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*\(')
+keyword_regex = re.compile(rb'\s*([A-Za-z0-9_\-]+)')
+string_regex = re.compile(rb"'(?:[^']|'')*'")
+reference_regex = re.compile(rb'#(\d+)')
+statement_end_regex = re.compile(rb"[';]")
+token_regex = re.compile(rb"[',()]")
+
+
+def make_record(raw, start):
+    match = record_head_regex.match(raw)
+    if match:
+        return StepRecord(int(match.group(1)), match.group(2).decode("ascii").upper(), raw, start, start + len(raw))
+    match = keyword_regex.match(raw)
+    keyword = match.group(1).decode("ascii", "replace").upper() if match else ""
+    return StepRecord(None, keyword, raw, start, start + len(raw))
+
+
+def iter_records(file_path):
+    """Yield every statement of a STEP file without loading it into memory.
+
+    Entity instances (`#12=IFCWALL(...);`) come back with their integer id and
+    upper-cased type; header and section statements (`FILE_NAME(...)`,
+    `ENDSEC;`) have `id=None`. Records may span several lines and strings may
+    contain `;` - a statement only ends at a semicolon outside a string.
+    """
+    with open(file_path, "rb") as file:
+        pending = []
+        pending_start = 0
+        offset = 0
+        in_string = False
+        for line in file:
+            position = 0
+            for match in statement_end_regex.finditer(line):
+                if match.group() == b"'":
+                    in_string = not in_string
+                elif not in_string:
+                    pending.append(line[position:match.end()])
+                    raw = b"".join(pending)
+                    yield make_record(raw, pending_start)
+                    pending = []
+                    pending_start += len(raw)
+                    position = match.end()
+            pending.append(line[position:])
+            offset += len(line)
+        tail = b"".join(pending)
+        if tail:
+            yield StepRecord(None, "", tail, pending_start, offset)
+
+
+def record_params(raw):
+    """Return the bytes between the outer parentheses of a record."""
+    return raw[raw.index(b"(") + 1:raw.rindex(b")")]
+
+
+def split_attributes(params):
+    """Split a STEP attribute list on its top-level commas."""
+    attributes = []
+    depth = 0
+    in_string = False
+    position = 0
+    for match in token_regex.finditer(params):
+        token = match.group()
+        if token == b"'":
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif token == b"(":
+            depth += 1
+        elif token == b")":
+            depth -= 1
+        elif depth == 0:
+            attributes.append(params[position:match.start()].strip())
+            position = match.end()
+    attributes.append(params[position:].strip())
+    return attributes
+
+
+def references(value):
+    """Return the entity ids referenced by an attribute value, ignoring text inside strings."""
+    return [int(ref) for ref in reference_regex.findall(string_regex.sub(b"''", value))]
+
+
+# Writing
+
+class Ref(int):
+    """An entity id written as `#id`."""
+
+
+class Enum(str):
+    """An enumeration value written as `.VALUE.`."""
+
+
+class Raw(str):
+    """Written as is, e.g. `Raw("*")` for a derived attribute."""
+
+
+class Typed(namedtuple("Typed", ["type", "value"])):
+    """A typed value such as `IFCLABEL('text')`."""
+
+
+def format_string(text):
+    text = text.replace("\\", "\\\\").replace("'", "''")
+    if text.isascii():
+        return f"'{text}'"
+    encoded = []
+    for char in text:
+        if char.isascii():
+            encoded.append(char)
+        elif ord(char) <= 0xFFFF:
+            encoded.append(f"\\X2\\{ord(char):04X}\\X0\\")
+        else:
+            encoded.append(f"\\X4\\{ord(char):08X}\\X0\\")
+    return f"'{''.join(encoded)}'"
+
+
+def format_float(value):
+    text = repr(float(value)).upper()
+    mantissa, _, exponent = text.partition("E")
+    if "." not in mantissa:
+        mantissa += "."
+    return f"{mantissa}E{exponent}" if exponent else mantissa
+
+
+def format_value(value):
+    if value is None:
+        return "$"
+    if isinstance(value, Ref):
+        return f"#{int(value)}"
+    if isinstance(value, Enum):
+        return f".{value}."
+    if isinstance(value, Raw):
+        return str(value)
+    if isinstance(value, bool):
+        return ".T." if value else ".F."
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return format_float(value)
+    if isinstance(value, str):
+        return format_string(value)
+    if isinstance(value, Typed):
+        return f"{value.type.upper()}({format_value(value.value)})"
+    return "(" + ",".join(format_value(item) for item in value) + ")"
+
+
+class StepWriter:
+    """Write a STEP file record by record without keeping any entities in memory.
+
+    Ids come from a counter; `add` returns a `Ref` that can be used as an
+    attribute of later records. Files ending in `.ifczip` are written as a zip
+    archive holding a single `.ifc`, other files through a large write buffer.
+
+        with StepWriter("out.ifc", "IFC4") as writer:
+            point = writer.add("IfcCartesianPoint", (0.0, 0.0, 0.0))
+    """
+
+    def __init__(self, file_path, schema, name=None, author="", organization="", application="IfcOpenShell", buffer_size=1 << 22):
+        self.file_path = file_path
+        self.next_id = 1
+        base_name = os.path.splitext(os.path.basename(file_path))[0] + ".ifc"
+        if file_path.lower().endswith(".ifczip"):
+            self.archive = zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED)
+            self.file = io.BufferedWriter(self.archive.open(base_name, "w", force_zip64=True), buffer_size)
+        else:
+            self.archive = None
+            self.file = open(file_path, "wb", buffering=buffer_size)
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+        self.write_line("ISO-10303-21;")
+        self.write_line("HEADER;")
+        self.write_line("FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');")
+        self.write_line(f"FILE_NAME({format_string(name or base_name)},'{timestamp}',({format_string(author)}),"
+                        f"({format_string(organization)}),{format_string(application)},{format_string(application)},'');")
+        self.write_line(f"FILE_SCHEMA(('{schema}'));")
+        self.write_line("ENDSEC;")
+        self.write_line("DATA;")
+
+    def write_line(self, text):
+        self.file.write(text.encode("ascii") + b"\n")
+
+    def add(self, ifc_class, *attributes):
+        """Write one record and return its id."""
+        entity_id = self.next_id
+        self.next_id += 1
+        self.write_line(f"#{entity_id}={ifc_class.upper()}({','.join(format_value(value) for value in attributes)});")
+        return Ref(entity_id)
+
+    def add_with_list(self, ifc_class, before, ids, after=()):
+        """Write a record whose list attribute is given as an iterable of ids, so the list never has to be held in memory."""
+        entity_id = self.next_id
+        self.next_id += 1
+        self.file.write(f"#{entity_id}={ifc_class.upper()}(".encode("ascii"))
+        for value in before:
+            self.file.write((format_value(value) + ",").encode("ascii"))
+        self.file.write(b"(")
+        first = True
+        for value in ids:
+            self.file.write(f"#{int(value)}".encode("ascii") if first else f",#{int(value)}".encode("ascii"))
+            first = False
+        self.file.write(b")")
+        for value in after:
+            self.file.write(("," + format_value(value)).encode("ascii"))
+        self.file.write(b");\n")
+        return Ref(entity_id)
+
+    def close(self):
+        if self.file is None:
+            return
+        self.write_line("ENDSEC;")
+        self.write_line("END-ISO-10303-21;")
+        self.file.close()
+        if self.archive is not None:
+            self.archive.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+
+import numpy as np
+import ifcopenshell
+import ifcopenshell.geom
+import ifcopenshell.util.element
+from ifcopenshell.util.placement import get_local_placement
+from ifcopenshell.util.unit import calculate_unit_scale
+
+# On-disk, content-addressed mesh cache. The key of an element is the digest of its
+# representation sub-graph (independent of entity ids, so it survives re-exports), the
+# styles of its items, the element's materials, the openings cut into the element and the
+# geometry settings. Meshes are stored in local coordinates as .npy files that are opened
+# memory-mapped; the element placement is applied when a mesh is read back.
+#
+#   <cache directory>/<key[:2]>/<key>/verts.npy, faces.npy, materials.npy, colours.npy
+
+# A string literal (kept as it is) or a reference, so "#n" inside text is not taken for an entity
+token_regex = re.compile(r"'(?:[^']|'')*'|#(\d+)")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def material_colour(material):
+    """RGBA of a material returned by the geometry iterator."""
+    diffuse = material.diffuse
+    rgb = diffuse.components if hasattr(diffuse, "components") else diffuse
+    transparency = material.transparency if material.transparency == material.transparency else 0.0
+    return tuple(rgb[:3]) + (1.0 - (transparency or 0.0),)
+
+
+def material_colours(geometry):
+    return [material_colour(material) for material in geometry.materials]
+
+
+class TessellationCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, settings=None):
+        """settings: geometry settings as a dict, e.g. {"weld-vertices": True}."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.options = dict(settings or {})
+        self.options["use-world-coords"] = False
+        self.settings_key = json.dumps(self.options, sort_keys=True).encode('utf-8')
+        self.digests = {}  # entity id -> digest, per opened model
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def geometry_settings(self):
+        settings = ifcopenshell.geom.settings()
+        for name, value in self.options.items():
+            settings.set(name, value)
+        return settings
+
+    def entity_digest(self, model, entity):
+        """Digest of an entity and everything it references, with ids replaced by digests."""
+        entity_id = entity.id()
+        if entity_id in self.digests:
+            return self.digests[entity_id]
+        self.digests[entity_id] = "cycle"
+        text = entity.to_string()
+        text = text[text.index("=") + 1:]
+        text = token_regex.sub(lambda match: match.group(0) if match.group(1) is None
+                               else self.entity_digest(model, model.by_id(int(match.group(1)))), text)
+        if entity.is_a("IfcRepresentationItem"):
+            # Styles point at the item, so they are not reached through its attributes
+            text += "".join(sorted(self.entity_digest(model, styled) for styled in getattr(entity, "StyledByItem", None) or ()))
+        self.digests[entity_id] = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+        return self.digests[entity_id]
+
+    def materials_digest(self, model, element):
+        """Digest of the element's (or its type's) materials and their styles, used where items are not styled."""
+        digests = []
+        for material in ifcopenshell.util.element.get_materials(element):
+            digests.append(self.entity_digest(model, material))
+            digests.extend(self.entity_digest(model, representation) for representation in getattr(material, "HasRepresentation", None) or ())
+        return "".join(sorted(digests))
+
+    def openings_digest(self, model, element):
+        """Digest of the openings cut into the element: their shapes and placements relative to the element."""
+        openings = [rel.RelatedOpeningElement for rel in getattr(element, "HasOpenings", None) or ()]
+        if not openings:
+            return ""
+        to_element = np.linalg.inv(self.placement_matrix(element, 1.0))
+        digests = []
+        for opening in openings:
+            relative = np.round(to_element @ self.placement_matrix(opening, 1.0), 6) + 0.0  # no negative zeros
+            shape = self.entity_digest(model, opening.Representation) if opening.Representation else ""
+            digests.append(shape + hashlib.blake2b(relative.tobytes(), digest_size=16).hexdigest())
+        return "".join(sorted(digests))
+
+    def key(self, model, element):
+        if not element.Representation:
+            return None
+        # Openings are cut into the mesh and materials colour it, so both are part of the key
+        representation = (self.entity_digest(model, element.Representation) + self.materials_digest(model, element)
+                          + self.openings_digest(model, element))
+        return hashlib.blake2b(representation.encode('ascii') + self.settings_key, digest_size=16).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Returns (verts, faces, materials) as memory-mapped arrays, or None."""
+        path = self.path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            arrays = tuple(np.load(os.path.join(path, name + ".npy"), mmap_mode='r') for name in ("verts", "faces", "materials"))
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # mark as recently used
+        return arrays
+
+    def colours(self, key):
+        """Returns the RGBA colour of every material index of a cached mesh."""
+        path = os.path.join(self.path(key), "colours.npy")
+        return np.load(path, mmap_mode='r') if os.path.exists(path) else np.zeros((0, 4), dtype=np.float32)
+
+    def put(self, key, verts, faces, materials, colours=()):
+        path = self.path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"  # workers may write the same mesh at the same time
+        os.makedirs(temporary, exist_ok=True)
+        np.save(os.path.join(temporary, "verts.npy"), np.asarray(verts, dtype=np.float64).reshape(-1, 3))
+        np.save(os.path.join(temporary, "faces.npy"), np.asarray(faces, dtype=np.int32).reshape(-1, 3))
+        np.save(os.path.join(temporary, "materials.npy"), np.asarray(materials, dtype=np.int32))
+        np.save(os.path.join(temporary, "colours.npy"), np.asarray(colours, dtype=np.float32).reshape(-1, 4))
+        try:
+            os.replace(temporary, path)
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    def entries(self):
+        """Yields (last used, size in bytes, path) of every cached mesh."""
+        for prefix in os.listdir(self.directory):
+            prefix_path = os.path.join(self.directory, prefix)
+            if not os.path.isdir(prefix_path):
+                continue
+            for key in os.listdir(prefix_path):
+                path = os.path.join(prefix_path, key)
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                yield os.path.getmtime(path), size, path
+
+    def evict(self, keep=()):
+        """
+        Removes the least recently used meshes until the cache fits into max_bytes. Meshes whose
+        key is in keep (those of the model being read) are never removed.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) in keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def placement_matrix(self, element, unit_scale):
+        matrix = get_local_placement(element.ObjectPlacement) if element.ObjectPlacement else np.eye(4)
+        matrix = np.array(matrix, dtype=float)
+        matrix[:3, 3] *= unit_scale  # meshes are in meters
+        return matrix
+
+    def shapes(self, model, include=None, threads=None):
+        """
+        Yields (element, verts, faces, materials, matrix) for every element with a representation.
+        Only representations that are not cached yet are tessellated, each of them once.
+        """
+        self.digests = {}
+        elements = include if include is not None else model.by_type("IfcProduct")
+        unit_scale = calculate_unit_scale(model)
+        keys = {}
+        missing = {}  # key -> one element to tessellate it from
+        for element in elements:
+            key = self.key(model, element)
+            if key is None:
+                continue
+            keys[element.id()] = key
+            if key not in missing and not os.path.isdir(self.path(key)):
+                missing[key] = element
+
+        if missing:
+            iterator = ifcopenshell.geom.iterator(self.geometry_settings(), model, threads or multiprocessing.cpu_count(), include=list(missing.values()))
+            if iterator.initialize():
+                while True:
+                    shape = iterator.get()
+                    geometry = shape.geometry
+                    self.put(keys[shape.id], geometry.verts, geometry.faces, geometry.material_ids, material_colours(geometry))
+                    if not iterator.next():
+                        break
+            self.misses += len(missing)
+            self.evict(keep=set(keys.values()))
+
+        for element in elements:
+            key = keys.get(element.id())
+            cached = self.get(key) if key else None
+            if cached is None:
+                continue
+            if key not in missing:
+                self.hits += 1
+            yield (element,) + cached + (self.placement_matrix(element, unit_scale),)
+
+
+def world_vertices(verts, matrix):
+    return np.asarray(verts) @ matrix[:3, :3].T + matrix[:3, 3]
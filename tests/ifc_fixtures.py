@@ -0,0 +1,83 @@
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.guid
+
+# Small models built with the API, shared by the tests
+
+
+def empty_model():
+    model = ifcopenshell.api.run("project.create_file", version="IFC4")
+    ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcProject")
+    ifcopenshell.api.run("unit.assign_unit", model, length={"is_metric": True, "raw": "METERS"})
+    model_context = ifcopenshell.api.run("context.add_context", model, context_type="Model")
+    body = ifcopenshell.api.run("context.add_context", model, context_type="Model", context_identifier="Body",
+                                target_view="MODEL_VIEW", parent=model_context)
+    return model, body
+
+
+def surface_style(model, name, rgb):
+    style = ifcopenshell.api.run("style.add_style", model, name=name)
+    ifcopenshell.api.run("style.add_surface_style", model, style=style, ifc_class="IfcSurfaceStyleShading",
+                         attributes={"SurfaceColour": {"Name": None, "Red": rgb[0], "Green": rgb[1], "Blue": rgb[2]}})
+    return style
+
+
+def coloured_walls(colours, styled_by="item"):
+    """Identical walls, each coloured through an item style or through its material."""
+    model, body = empty_model()
+    walls = []
+    for index, rgb in enumerate(colours):
+        wall = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcWall")
+        matrix = np.eye(4)
+        matrix[1, 3] = 5.0 * index
+        ifcopenshell.api.run("geometry.edit_object_placement", model, product=wall, matrix=matrix)
+        representation = ifcopenshell.api.run("geometry.add_wall_representation", model, context=body,
+                                              length=4.0, height=3.0, thickness=0.2)
+        ifcopenshell.api.run("geometry.assign_representation", model, product=wall, representation=representation)
+        style = surface_style(model, f"Colour {index}", rgb)
+        if styled_by == "item":
+            ifcopenshell.api.run("style.assign_representation_styles", model, shape_representation=representation, styles=[style])
+        else:
+            material = ifcopenshell.api.run("material.add_material", model, name=f"Material {index}")
+            ifcopenshell.api.run("style.assign_material_style", model, material=material, style=style, context=body)
+            ifcopenshell.api.run("material.assign_material", model, products=[wall], material=material)
+        walls.append(wall)
+    return model, walls
+
+
+def walls_with_openings(opening_widths):
+    model, body = empty_model()
+    walls = []
+    for index, width in enumerate(opening_widths):
+        wall = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcWall")
+        matrix = np.eye(4)
+        matrix[1, 3] = 5.0 * index
+        ifcopenshell.api.run("geometry.edit_object_placement", model, product=wall, matrix=matrix)
+        representation = ifcopenshell.api.run("geometry.add_wall_representation", model, context=body,
+                                              length=4.0, height=3.0, thickness=0.2)
+        ifcopenshell.api.run("geometry.assign_representation", model, product=wall, representation=representation)
+        if width:
+            opening = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcOpeningElement")
+            matrix[0, 3] = 1.0
+            matrix[1, 3] -= 0.1
+            ifcopenshell.api.run("geometry.edit_object_placement", model, product=opening, matrix=matrix)
+            shape = ifcopenshell.api.run("geometry.add_wall_representation", model, context=body,
+                                         length=width, height=2.0, thickness=0.4)
+            ifcopenshell.api.run("geometry.assign_representation", model, product=opening, representation=shape)
+            ifcopenshell.api.run("feature.add_feature", model, feature=opening, element=wall)
+        walls.append(wall)
+    return model, walls
+
+
+def model_with_definition_set():
+    """A wall whose psets A and B are attached through one IfcPropertySetDefinitionSet."""
+    model = ifcopenshell.file(schema="IFC4")
+    wall = model.createIfcWall(ifcopenshell.guid.new())
+    psets = [model.createIfcPropertySet(ifcopenshell.guid.new(), None, name, None, [
+        model.createIfcPropertySingleValue(prop, None, model.createIfcLabel(value), None)])
+        for name, prop, value in (("A", "x", "1"), ("B", "y", "2"))]
+    # The API cannot create the select type set, so the relation is added to the STEP text
+    rel = f"#1000=IFCRELDEFINESBYPROPERTIES('{ifcopenshell.guid.new()}',$,$,$,(#{wall.id()}),(#{psets[0].id()},#{psets[1].id()}));\n"
+    model = ifcopenshell.file.from_string(model.to_string().replace("ENDSEC;\nEND-ISO", rel + "ENDSEC;\nEND-ISO", 1))
+    return model, model.by_type("IfcWall")[0]
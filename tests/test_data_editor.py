@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.guid
+import ifcopenshell.util.element
+
+pytest.importorskip("PyQt5")
+from data_editor import ColumnarData, clear_saved_edits, write_changes
+from ifc_fixtures import model_with_definition_set
+from pset_index import PropertyIndex
+
+
+def shared_pset_model(path):
+    model = ifcopenshell.file(schema="IFC4")
+    walls = [model.createIfcWall(ifcopenshell.guid.new(), None, f"Wall {i}") for i in range(2)]
+    pset = ifcopenshell.api.run("pset.add_pset", model, product=walls[0], name="P")
+    ifcopenshell.api.run("pset.edit_pset", model, pset=pset, properties={"X": "a", "IsExternal": True, "Count": 2})
+    ifcopenshell.api.run("pset.assign_pset", model, products=[walls[1]], pset=pset)
+    model.write(str(path))
+    return [wall.GlobalId for wall in walls]
+
+
+def read_pset(model, guid):
+    return ifcopenshell.util.element.get_pset(model.by_guid(guid), "P")
+
+
+def test_edit_of_shared_pset_leaves_other_elements(tmp_path):
+    path = tmp_path / "model.ifc"
+    first, second = shared_pset_model(path)
+
+    write_changes(str(path), {first: {"P": {"X": "b"}}})
+
+    model = ifcopenshell.open(str(path))
+    assert read_pset(model, first)["X"] == "b"
+    assert read_pset(model, second)["X"] == "a"
+
+
+def test_same_edit_on_all_elements_keeps_pset_shared(tmp_path):
+    path = tmp_path / "model.ifc"
+    first, second = shared_pset_model(path)
+
+    write_changes(str(path), {first: {"P": {"X": "b"}}, second: {"P": {"X": "b"}}})
+
+    model = ifcopenshell.open(str(path))
+    assert read_pset(model, first)["X"] == read_pset(model, second)["X"] == "b"
+    assert len(model.by_type("IfcPropertySet")) == 1
+
+
+def test_cell_text_is_parsed_into_the_property_type(tmp_path):
+    path = tmp_path / "model.ifc"
+    first, second = shared_pset_model(path)
+
+    edited, missing, rejected = write_changes(str(path), {
+        first: {"P": {"IsExternal": "False", "Count": "3"}},
+        second: {"P": {"IsExternal": "no", "Count": "3.5"}},
+    })
+
+    model = ifcopenshell.open(str(path))
+    assert read_pset(model, first)["IsExternal"] is False
+    assert read_pset(model, first)["Count"] == 3
+    assert read_pset(model, second)["IsExternal"] is True
+    assert read_pset(model, second)["Count"] == 2
+    assert sorted(rejected) == sorted([(second, "P", "IsExternal", "no"), (second, "P", "Count", "3.5")])
+
+
+def test_rejected_cells_stay_edited():
+    data = ColumnarData.from_rows([("a", {"guid": "1", "properties": {"P": {"X": 1}, "last": 0}}),
+                                   ("a", {"guid": "2", "properties": {"P": {"X": 1}, "last": 0}}),
+                                   ("b", {"guid": "3", "properties": {"P": {"X": 1}, "last": 0}})])
+    data.set_values([0, 1, 2], "P.X", "y")
+    results = {"/a.ifc": (2, [], [("2", "P", "X", "y")])}
+
+    remaining = clear_saved_edits(data, ["/a.ifc", "/b.ifc"], results)
+
+    assert np.array_equal(remaining["P.X"], [False, True, True])
+
+
+def test_property_set_definition_set(tmp_path):
+    model, wall = model_with_definition_set()
+    path = tmp_path / "model.ifc"
+    model.write(str(path))
+
+    write_changes(str(path), {wall.GlobalId: {"B": {"y": "3"}}})
+
+    model = ifcopenshell.open(str(path))
+    assert PropertyIndex(model).get_psets(model.by_guid(wall.GlobalId)) == {"A": {"x": "1"}, "B": {"y": "3"}}
+
+
+def test_shared_property_set_definition_set(tmp_path):
+    model, wall = model_with_definition_set()
+    other = model.createIfcWall(ifcopenshell.guid.new())
+    model.by_id(1000).RelatedObjects = [wall, other]
+    path = tmp_path / "model.ifc"
+    model.write(str(path))
+
+    write_changes(str(path), {wall.GlobalId: {"B": {"y": "3"}}})
+
+    model = ifcopenshell.open(str(path))
+    index = PropertyIndex(model)
+    assert index.get_psets(model.by_guid(wall.GlobalId)) == {"A": {"x": "1"}, "B": {"y": "3"}}
+    assert index.get_psets(model.by_guid(other.GlobalId)) == {"A": {"x": "1"}, "B": {"y": "2"}}
@@ -0,0 +1,16 @@
+from glb_converter import collect_meshes
+from tessellation_cache import TessellationCache
+from ifc_fixtures import coloured_walls
+
+
+def test_cached_colours_match_uncached(tmp_path):
+    model, _ = coloured_walls([(1.0, 0.0, 0.0), (0.0, 0.0, 1.0), (1.0, 0.0, 0.0)])
+
+    uncached = {colour: len(faces) for colour, _, faces in collect_meshes(model)}
+    cached = {colour: len(faces) for colour, _, faces in collect_meshes(model, cache=TessellationCache(str(tmp_path)))}
+    # Read back from the cache a second time
+    reread = {colour: len(faces) for colour, _, faces in collect_meshes(model, cache=TessellationCache(str(tmp_path)))}
+
+    assert sorted(uncached) == [(0.0, 0.0, 1.0, 1.0), (1.0, 0.0, 0.0, 1.0)]
+    assert cached == uncached
+    assert reread == uncached
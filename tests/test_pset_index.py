@@ -0,0 +1,10 @@
+from pset_index import PropertyIndex
+from ifc_fixtures import model_with_definition_set
+
+
+def test_property_set_definition_set():
+    model, wall = model_with_definition_set()
+    index = PropertyIndex(model)
+
+    assert index.get_psets(wall) == {"A": {"x": "1"}, "B": {"y": "2"}}
+    assert [rel.id() for rel in index.get_relations(wall, "B")] == [1000]
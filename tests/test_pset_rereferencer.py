@@ -0,0 +1,19 @@
+import ifcopenshell
+import ifcopenshell.guid
+from pset_index import PropertyIndex
+from Pset_ReReferencer import rereference_zone_psets
+
+
+def test_rel_shared_by_several_spaces():
+    model = ifcopenshell.file(schema="IFC4")
+    spaces = [model.createIfcSpace(ifcopenshell.guid.new(), None, f"Space {i}") for i in range(3)]
+    zone = model.createIfcZone(ifcopenshell.guid.new(), None, "Zone")
+    model.createIfcRelAssignsToGroup(ifcopenshell.guid.new(), None, None, None, spaces, None, zone)
+    pset = model.createIfcPropertySet(ifcopenshell.guid.new(), None, "CHIBB_SpatialZoneCommon", None, [
+        model.createIfcPropertySingleValue("Brandabschnitt", None, model.createIfcLabel("BA1"), None)])
+    rel = model.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), None, None, None, spaces, pset)
+
+    assert rereference_zone_psets(model, PropertyIndex(model)) == 1
+    assert rel in model
+    assert list(rel.RelatedObjects) == [zone]
+    assert len(model.by_type("IfcRelDefinesByProperties")) == 1
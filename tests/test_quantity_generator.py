@@ -0,0 +1,66 @@
+import math
+import ifcopenshell
+import ifcopenshell.api
+import pytest
+from quantity_generator import analytic_quantities, profile_polygons
+
+
+def extruded_element(model, body, profile):
+    element = ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcMember")
+    solid = model.createIfcExtrudedAreaSolid(profile, None, model.createIfcDirection((0.0, 0.0, 1.0)), 2.0)
+    representation = model.createIfcShapeRepresentation(body, "Body", "SweptSolid", [solid])
+    element.Representation = model.createIfcProductDefinitionShape(None, None, [representation])
+    return element
+
+
+@pytest.fixture
+def model_and_body():
+    model = ifcopenshell.api.run("project.create_file", version="IFC4")
+    ifcopenshell.api.run("root.create_entity", model, ifc_class="IfcProject")
+    model_context = ifcopenshell.api.run("context.add_context", model, context_type="Model")
+    body = ifcopenshell.api.run("context.add_context", model, context_type="Model", context_identifier="Body",
+                                target_view="MODEL_VIEW", parent=model_context)
+    return model, body
+
+
+def test_rectangle_subtypes(model_and_body):
+    model, body = model_and_body
+    rounded = model.createIfcRoundedRectangleProfileDef("AREA", None, None, 0.4, 0.2, 0.05)
+    hollow = model.createIfcRectangleHollowProfileDef("AREA", None, None, 0.4, 0.2, 0.02, 0.01, 0.03)
+    rectangle = model.createIfcRectangleProfileDef("AREA", None, None, 0.4, 0.2)
+
+    assert profile_polygons(rounded)[0] == pytest.approx(0.08 - (4 - math.pi) * 0.05 ** 2)
+    assert profile_polygons(hollow)[0] == pytest.approx((0.08 - (4 - math.pi) * 0.03 ** 2) - (0.36 * 0.16 - (4 - math.pi) * 0.01 ** 2))
+
+    elements = [extruded_element(model, body, profile) for profile in (rounded, hollow, rectangle)]
+    quantities, fallback = analytic_quantities(elements)
+    assert not fallback
+    assert [quantities[element.id()][1] for element in elements] == pytest.approx(
+        [2 * profile_polygons(profile)[0] for profile in (rounded, hollow, rectangle)])
+
+
+def test_other_subtypes_are_tessellated(model_and_body):
+    model, body = model_and_body
+    curve = model.createIfcPolyline([model.createIfcCartesianPoint(point) for point in ((0.0, 0.0), (1.0, 0.0), (1.0, 1.0))])
+    center_line = model.createIfcCenterLineProfileDef("AREA", None, curve, 0.1)
+
+    quantities, fallback = analytic_quantities([extruded_element(model, body, center_line)])
+    assert not quantities
+    assert len(fallback) == 1
+
+
+@pytest.mark.parametrize("operator, analytic", [("DIFFERENCE", True), ("UNION", False), ("INTERSECTION", False)])
+def test_boolean_results(model_and_body, operator, analytic):
+    model, body = model_and_body
+    element = extruded_element(model, body, model.createIfcRectangleProfileDef("AREA", None, None, 0.4, 0.2))
+    representation = element.Representation.Representations[0]
+    solid = representation.Items[0]
+    other = model.createIfcExtrudedAreaSolid(model.createIfcRectangleProfileDef("AREA", None, None, 0.2, 0.2), None,
+                                             model.createIfcDirection((0.0, 0.0, 1.0)), 3.0)
+    representation.Items = [model.createIfcBooleanResult(operator, solid, other)]
+
+    quantities, fallback = analytic_quantities([element])
+    assert (element.id() in quantities) is analytic
+    assert (fallback == [element]) is not analytic
+    if analytic:
+        assert quantities[element.id()] == pytest.approx((0.08, 0.16, False))
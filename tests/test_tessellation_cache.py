@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import pytest
+from tessellation_cache import TessellationCache
+from ifc_fixtures import coloured_walls, walls_with_openings
+
+
+def mesh_volume(verts, faces):
+    triangles = np.asarray(verts)[np.asarray(faces)]
+    return abs(np.einsum("ij,ij->i", triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum()) / 6.0
+
+
+def test_identical_walls_with_different_openings(tmp_path):
+    model, walls = walls_with_openings([0.0, 1.0, 2.0])
+    cache = TessellationCache(str(tmp_path))
+
+    keys = [cache.key(model, wall) for wall in walls]
+    assert len(set(keys)) == 3
+
+    volumes = {element.id(): mesh_volume(verts, faces) for element, verts, faces, _, _ in cache.shapes(model)
+               if element.is_a("IfcWall")}
+    assert np.allclose([volumes[wall.id()] for wall in walls], [2.4, 2.0, 1.6])
+
+
+def test_equal_openings_share_a_key(tmp_path):
+    model, walls = walls_with_openings([1.0, 1.0])
+    cache = TessellationCache(str(tmp_path))
+
+    assert cache.key(model, walls[0]) == cache.key(model, walls[1])
+
+
+@pytest.mark.parametrize("styled_by", ["item", "material"])
+def test_identical_bodies_in_different_colours(tmp_path, styled_by):
+    model, walls = coloured_walls([(1.0, 0.0, 0.0), (0.0, 0.0, 1.0)], styled_by)
+    cache = TessellationCache(str(tmp_path))
+
+    assert cache.key(model, walls[0]) != cache.key(model, walls[1])
+    colours = [tuple(cache.colours(cache.key(model, element))[0]) for element, *_ in cache.shapes(model)]
+    assert sorted(colours) == [(0.0, 0.0, 1.0, 1.0), (1.0, 0.0, 0.0, 1.0)]
+
+
+def test_reference_like_text_is_not_a_reference(tmp_path):
+    model, walls = coloured_walls([(1.0, 0.0, 0.0), (1.0, 0.0, 0.0)])
+    cache = TessellationCache(str(tmp_path))
+    walls[0].Representation.Representations[0].RepresentationIdentifier = "Body #99999"
+    walls[1].Representation.Representations[0].RepresentationIdentifier = f"Body #{walls[0].id()}"
+
+    assert cache.key(model, walls[0]) != cache.key(model, walls[1])
+
+
+def test_meshes_of_the_current_model_are_not_evicted(tmp_path):
+    model, walls = coloured_walls([(1.0, 0.0, 0.0), (0.0, 0.0, 1.0)])
+    stale = TessellationCache(str(tmp_path))
+    other, _ = walls_with_openings([1.0])
+    assert len(list(stale.shapes(other))) == 2
+
+    cache = TessellationCache(str(tmp_path), max_bytes=1)
+    assert [element for element, *_ in cache.shapes(model)] == walls
+    # The meshes of the other model were evicted, the ones just written were kept
+    assert sorted(os.path.basename(path) for _, _, path in cache.entries()) == sorted(cache.key(model, wall) for wall in walls)
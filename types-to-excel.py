@@ -1,21 +1,77 @@
 import sys
 import ifcopenshell
-import ifcopenshell.util.element
+import numpy as np
 import pandas as pd
 import os
-from collections import defaultdict
+from pset_index import PropertyIndex
+from qt_jobs import JobRunner, JobPanel
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QCheckBox, QScrollArea, QFormLayout, QLabel, QLineEdit, QHBoxLayout
+import matplotlib
+matplotlib.use('Agg')  # The heatmap is drawn on a worker thread and only saved to a file
 import matplotlib.pyplot as plt
 import seaborn as sns
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 
+def element_columns(model):
+    """
+    One row per typed element with its id, class, type name and storey name (None if it is not
+    contained in a storey), read from IfcRelDefinesByType and IfcRelContainedInSpatialStructure.
+    """
+    types = {}
+    for rel in model.by_type('IfcRelDefinesByType'):
+        type_name = rel.RelatingType.Name or ''
+        for element in rel.RelatedObjects:
+            types[element.id()] = (element.is_a(), type_name)
+    storeys = {}
+    for rel in model.by_type('IfcRelContainedInSpatialStructure'):
+        if rel.RelatingStructure.is_a('IfcBuildingStorey'):
+            storey_name = rel.RelatingStructure.Name
+            for element in rel.RelatedElements:
+                storeys[element.id()] = storey_name
+    ids = list(types)
+    return pd.DataFrame({
+        'Id': np.asarray(ids, dtype=np.int64),
+        'Entity': [types[element_id][0] for element_id in ids],
+        'Type': [types[element_id][1] for element_id in ids],
+        'Storey': [storeys.get(element_id) for element_id in ids],
+    })
+
+
+def storey_order(model):
+    storeys = sorted(model.by_type('IfcBuildingStorey'), key=lambda storey: storey.Elevation or 0.0)
+    return list(dict.fromkeys(storey.Name for storey in storeys))
+
+
+def type_table(elements, entity_types, storey_names, property_values=None, property_column=None):
+    """
+    Counts per (Entity, Type) and storey for the selected classes. property_values (aligned with
+    elements) adds a column with the sorted unique values of each type.
+    """
+    selected = elements['Entity'].isin(entity_types)
+    rows = elements[selected]
+    counted = rows.dropna(subset=['Storey'])
+    table = pd.crosstab([counted['Entity'], counted['Type']], counted['Storey'])
+    table = table.reindex(columns=storey_names, fill_value=0)
+    table.columns.name = None
+
+    if property_values is not None:
+        values = pd.Series(property_values, index=elements.index)[selected].dropna()
+        joined = values.groupby([rows.loc[values.index, 'Entity'], rows.loc[values.index, 'Type']]).agg(
+            lambda group: ', '.join(map(str, sorted(set(group)))))
+        table[property_column] = joined.reindex(table.index).fillna('')
+    return table.reset_index()
+
+
 class IFCEntitySelector(QWidget):
     def __init__(self):
         super().__init__()
 
+        # One loaded model per session, shared by the class list and every export
         self.ifc_file = None
-        self.entities_with_types = defaultdict(list)
+        self.model = None
+        self.elements = None
+        self.property_index = None
         self.initUI()
 
     def initUI(self):
@@ -51,6 +107,12 @@ class IFCEntitySelector(QWidget):
         self.export_button.setEnabled(False)
         layout.addWidget(self.export_button)
 
+        # Loading and exporting run in the background, one job at a time
+        self.job_panel = JobPanel(self)
+        layout.addWidget(self.job_panel)
+        self.runner = JobRunner(self.job_panel, self)
+        self.runner.running_changed.connect(self.set_buttons_enabled)
+
         self.setLayout(layout)
 
     def load_ifc_file(self):
@@ -58,29 +120,34 @@ class IFCEntitySelector(QWidget):
         file_name, _ = QFileDialog.getOpenFileName(self, "Open IFC File", "", "IFC Files (*.ifc);;All Files (*)", options=options)
         if file_name:
             self.ifc_file = file_name
-            model = ifcopenshell.open(self.ifc_file)
-            self.collect_entities_with_types(model)
-            self.populate_entity_checkboxes()
-
-    def collect_entities_with_types(self, model):
-        for entity in model:
-            if not entity.is_a().endswith('Type') and hasattr(entity, 'ContainedInStructure'):
-                element_type = ifcopenshell.util.element.get_type(entity)
-                if element_type:
-                    entity_type = entity.is_a()
-                    self.entities_with_types[entity_type].append(entity)
+            self.runner.start(self.load_model, file_name, on_result=self.model_loaded)
+
+    def set_buttons_enabled(self, running):
+        self.load_button.setEnabled(not running)
+        self.export_button.setEnabled(not running and self.model is not None)
+
+    def load_model(self, job, file_name):
+        # Runs on a worker thread
+        job.report(None, None, f'Loading {os.path.basename(file_name)}')
+        model = ifcopenshell.open(file_name)
+        job.report(None, None, 'Collecting typed elements')
+        return model, element_columns(model)
+
+    def model_loaded(self, result):
+        self.model, self.elements = result
+        self.property_index = None
+        self.populate_entity_checkboxes()
+        self.job_panel.status_label.setText(f'{len(self.elements)} typed elements')
 
     def populate_entity_checkboxes(self):
         for i in reversed(range(self.scroll_layout.count())):
             self.scroll_layout.itemAt(i).widget().setParent(None)
 
         self.checkboxes = {}
-        for entity_type in sorted(self.entities_with_types.keys()):
+        for entity_type in sorted(self.elements['Entity'].unique()):
             checkbox = QCheckBox(entity_type)
             self.scroll_layout.addRow(checkbox)
             self.checkboxes[entity_type] = checkbox
-        
-        self.export_button.setEnabled(True)
 
     def export_to_excel(self):
         selected_entity_types = [etype for etype, cb in self.checkboxes.items() if cb.isChecked()]
@@ -90,57 +157,33 @@ class IFCEntitySelector(QWidget):
         options = QFileDialog.Options()
         save_path, _ = QFileDialog.getSaveFileName(self, "Save Excel File", "", "Excel Files (*.xlsx);;All Files (*)", options=options)
         if save_path:
-            self.process_and_export(selected_entity_types, save_path)
-
-    def process_and_export(self, entity_types, output_file):
-        model = ifcopenshell.open(self.ifc_file)
-        
-        type_data = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-        property_data = defaultdict(lambda: defaultdict(set))  # Using set to store unique values
-        storeys = {storey.GlobalId: storey for storey in model.by_type('IfcBuildingStorey')}
-        storeys_sorted = sorted(storeys.values(), key=lambda storey: storey.Elevation)
-        storey_names = [storey.Name for storey in storeys_sorted]
-
-        pset_name = self.pset_input.text()
-        prop_name = self.prop_input.text()
-
-        for entity_type in entity_types:
-            entities = self.entities_with_types[entity_type]
-            for entity in entities:
-                element_type = ifcopenshell.util.element.get_type(entity)
-                if element_type:
-                    relating_type_name = element_type.Name
-                    for struct in entity.ContainedInStructure:
-                        storey = struct.RelatingStructure
-                        if storey.GlobalId in storeys:
-                            storey_name = storeys[storey.GlobalId].Name
-                            type_data[entity_type][relating_type_name][storey_name] += 1
-
-                    # Extract the property value if pset_name and prop_name are provided
-                    if pset_name and prop_name:
-                        for definition in entity.IsDefinedBy:
-                            if definition.is_a('IfcRelDefinesByProperties'):
-                                prop_set = definition.RelatingPropertyDefinition
-                                if prop_set.is_a('IfcPropertySet') and prop_set.Name == pset_name:
-                                    for prop in prop_set.HasProperties:
-                                        if prop.Name == prop_name:
-                                            property_data[entity_type][relating_type_name].add(prop.NominalValue.wrappedValue)
-
-        rows = []
-        for entity_type in sorted(type_data.keys()):
-            for type_name in sorted(type_data[entity_type].keys()):
-                row = [entity_type, type_name]
-                for storey_name in storey_names:
-                    row.append(type_data[entity_type][type_name].get(storey_name, 0))
-                if pset_name and prop_name:
-                    prop_values = ', '.join(map(str, sorted(property_data[entity_type][type_name])))  # Convert set to sorted list and join
-                    row.append(prop_values)
-                rows.append(row)
-
-        columns = ['Entity', 'Type'] + storey_names
+            # Widgets and session state are read here, the job itself only works on its arguments
+            self.runner.start(self.process_and_export, self.model, self.elements, self.property_index,
+                              selected_entity_types, save_path, self.pset_input.text(), self.prop_input.text(),
+                              on_result=self.export_done)
+
+    def export_done(self, result):
+        message, model, property_index = result
+        # Keep the property index for later exports, unless another model was loaded meanwhile
+        if model is self.model and property_index is not None:
+            self.property_index = property_index
+        self.job_panel.status_label.setText(message)
+
+    @staticmethod
+    def process_and_export(job, model, elements, property_index, entity_types, output_file, pset_name, prop_name):
+        # Runs on a worker thread. Returns (message, model, property index built or reused for model).
+        storey_names = storey_order(model)
+        property_values, property_column = None, None
         if pset_name and prop_name:
-            columns.append(f'{pset_name}::{prop_name}')
-        df = pd.DataFrame(rows, columns=columns)
+            if property_index is None:
+                job.report(None, None, 'Indexing properties')
+                property_index = PropertyIndex(model)
+            property_column = f'{pset_name}::{prop_name}'
+            property_values = [property_index.get(element_id, prop_name, pset_name) for element_id in elements['Id'].tolist()]
+
+        job.report(None, None, 'Counting types per storey')
+        df = type_table(elements, entity_types, storey_names, property_values, property_column)
+        job.report(None, None, 'Writing Excel file')
 
         with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
             df.to_excel(writer, sheet_name='Type Counts', index=False)
@@ -164,6 +207,7 @@ class IFCEntitySelector(QWidget):
             worksheet.add_image(img, 'A1')
 
         print(f'Successfully saved the data to {output_file}')
+        return f'Saved to {output_file}', model, property_index
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)